@@ -0,0 +1,82 @@
+import asyncio
+
+from app import metrics
+
+
+class HotTokenWatcher:
+    """Цикл поиска горячих токенов.
+
+    NOTIFY token_activity (триггер на infl_buys) будит цикл сразу после новой покупки, и проверяются
+    только токены с новыми покупками (get_changed_hot_tokens_with_wallets снимает с них dirty).
+    Раз в reconcile_interval - полная сверка на случай потерянных уведомлений.
+
+    process(rows) рассылает оповещения и возвращает токены, которые обработать не удалось: им
+    возвращается dirty, и они проверяются снова не позже чем через poll_interval.
+    Пока подписки нет (не удалось подписаться или соединение LISTEN оборвалось), токены проверяются
+    раз в poll_interval и с той же частотой повторяется подписка; после переподписки - полная сверка"""
+
+    def __init__(self, db, process, window, reconcile_interval=300, poll_interval=60, channel='token_activity'):
+        self.db = db
+        self.process = process
+        self.window = window
+        self.reconcile_interval = reconcile_interval
+        self.poll_interval = poll_interval
+        self.channel = channel
+        self._activity = asyncio.Event()
+
+    async def _listen(self):
+        try:
+            return await self.db.listen(self.channel, lambda payload: self._activity.set(), on_close=self._activity.set)
+        except Exception as e:
+            print(f"Не удалось подписаться на {self.channel}, проверяем токены раз в {self.poll_interval} секунд: {e}")
+            return None
+
+    async def _scan(self, reconcile):
+        """Один проход; True, если часть токенов не обработана и их нужно проверить ещё раз"""
+        scan_kind = 'reconcile' if reconcile else 'changed'
+        with metrics.ALERT_SCAN_DURATION.labels(scan_kind).time():
+            if reconcile:
+                rows = await self.db.get_hot_tokens_with_wallets(self.window)
+            else:
+                rows = await self.db.get_changed_hot_tokens_with_wallets(self.window)
+            failed = await self.process(rows)
+        if failed:
+            await self.db.mark_tokens_dirty(failed)
+        return bool(failed)
+
+    async def run(self):
+        listener = None
+        missed = False
+        loop = asyncio.get_running_loop()
+        next_reconcile = loop.time()
+        try:
+            while True:
+                if listener is not None and listener.is_closed():
+                    print(f"Соединение LISTEN {self.channel} оборвалось, переподписываемся")
+                    listener, missed = None, True
+                if listener is None:
+                    listener = await self._listen()
+                    if listener is not None and missed:
+                        # Уведомления, пока подписки не было, потеряны
+                        next_reconcile, missed = loop.time(), False
+
+                self._activity.clear()
+                retry = False
+                try:
+                    reconcile = loop.time() >= next_reconcile
+                    if reconcile:
+                        next_reconcile = loop.time() + self.reconcile_interval
+                    retry = await self._scan(reconcile)
+                except Exception as e:
+                    print(f"Общая ошибка в поиске горячих токенов: {e}")
+
+                timeout = max(0, next_reconcile - loop.time())
+                if retry or listener is None or listener.is_closed():
+                    timeout = min(timeout, self.poll_interval)
+                try:
+                    await asyncio.wait_for(self._activity.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if listener is not None:
+                await listener.close()
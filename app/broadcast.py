@@ -0,0 +1,93 @@
+import asyncio
+import time
+from dataclasses import dataclass
+
+from aiogram.exceptions import TelegramRetryAfter, TelegramForbiddenError, TelegramBadRequest
+
+from app import metrics
+from app.ratelimit import TokenBucket
+
+
+@dataclass
+class BroadcastStats:
+    delivered: int = 0
+    failed: int = 0
+    throttled: int = 0
+
+
+class Broadcaster:
+    """Рассылка сообщений пулом воркеров с учётом лимитов Telegram.
+
+    Глобальный лимит бота держит TokenBucket, лимит на чат - время последней отправки в чат.
+    На TelegramRetryAfter весь бот ставится на паузу, сообщение отправляется повторно."""
+
+    def __init__(self, bot, rate, workers, chat_interval=1.0, group_interval=3.0, max_retries=3):
+        self.bot = bot
+        self.workers = workers
+        self.chat_interval = chat_interval
+        self.group_interval = group_interval
+        self.max_retries = max_retries
+        self.limiter = TokenBucket(rate)
+        self._chat_last_sent = {}
+
+    async def broadcast(self, messages, **kwargs):
+        """messages - список пар (chat_id, text), kwargs передаются в bot.send_message"""
+        self._forget_idle_chats()
+        stats = BroadcastStats()
+        queue = asyncio.Queue()
+        for chat_id, text in messages:
+            queue.put_nowait((chat_id, text))
+
+        workers = [
+            asyncio.create_task(self._worker(queue, stats, kwargs))
+            for _ in range(min(self.workers, queue.qsize()))
+        ]
+        await asyncio.gather(*workers)
+        return stats
+
+    def _forget_idle_chats(self):
+        """Чаты, в которые не писали дольше самого длинного интервала, уже ничем не ограничены -
+        убираем их, чтобы словарь не рос с каждым когда-либо полученным сообщением"""
+        expired_before = time.monotonic() - max(self.chat_interval, self.group_interval)
+        for chat_id in [chat_id for chat_id, last_sent in self._chat_last_sent.items() if last_sent < expired_before]:
+            del self._chat_last_sent[chat_id]
+
+    async def _worker(self, queue, stats, kwargs):
+        while True:
+            try:
+                chat_id, text = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await self._send(chat_id, text, stats, kwargs)
+
+    async def _wait_chat(self, chat_id):
+        interval = self.group_interval if chat_id < 0 else self.chat_interval
+        last_sent = self._chat_last_sent.get(chat_id)
+        if last_sent is not None:
+            delay = last_sent + interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        self._chat_last_sent[chat_id] = time.monotonic()
+
+    async def _send(self, chat_id, text, stats, kwargs):
+        for attempt in range(self.max_retries + 1):
+            await self._wait_chat(chat_id)
+            await self.limiter.acquire()
+            try:
+                await self.bot.send_message(chat_id, text, **kwargs)
+                stats.delivered += 1
+                metrics.BROADCAST_MESSAGES.labels('delivered').inc()
+                return
+            except TelegramRetryAfter as e:
+                stats.throttled += 1
+                metrics.BROADCAST_MESSAGES.labels('throttled').inc()
+                self.limiter.penalize(e.retry_after)
+                await asyncio.sleep(e.retry_after)
+            except (TelegramForbiddenError, TelegramBadRequest) as e:
+                print(f"Ошибка при отправке уведомления пользователю {chat_id}: {e}")
+                break
+            except Exception as e:
+                print(f"Ошибка при отправке уведомления пользователю {chat_id}, попытка {attempt + 1}: {e}")
+                await asyncio.sleep(2 ** attempt)
+        stats.failed += 1
+        metrics.BROADCAST_MESSAGES.labels('failed').inc()
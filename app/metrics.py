@@ -0,0 +1,99 @@
+import functools
+import inspect
+import time
+from contextlib import contextmanager
+
+from aiogram import BaseMiddleware
+from aiohttp import web
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest, start_http_server
+
+HANDLER_LATENCY = Histogram(
+    'bot_handler_seconds', 'Время обработки апдейта хендлером', ['handler']
+)
+DB_QUERY_LATENCY = Histogram(
+    'db_method_seconds', 'Время выполнения метода AsyncDatabase', ['method']
+)
+DB_POOL_WAIT = Histogram(
+    'db_pool_wait_seconds', 'Ожидание свободного соединения в пуле',
+    buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+)
+DB_POOL_TIMEOUTS = Counter(
+    'db_pool_timeouts_total', 'Не дождались свободного соединения за отведённое время'
+)
+DB_BROKEN_CONNECTIONS = Counter(
+    'db_broken_connections_total', 'Соединения, отброшенные из пула как нерабочие'
+)
+EXTERNAL_LATENCY = Histogram(
+    'external_request_seconds', 'Время запроса к внешнему API', ['service']
+)
+EXTERNAL_ERRORS = Counter(
+    'external_request_errors_total', 'Ошибки запросов к внешнему API', ['service']
+)
+ALERT_SCAN_DURATION = Histogram(
+    'alert_scan_seconds', 'Длительность поиска и рассылки горячих токенов', ['kind']
+)
+BROADCAST_MESSAGES = Counter(
+    'broadcast_messages_total', 'Сообщения рассылки по результату', ['result']
+)
+WORKER_RESTARTS = Counter(
+    'worker_task_restarts_total', 'Перезапуски задач воркера после падения или завершения', ['task']
+)
+
+
+@contextmanager
+def track_request(service):
+    """Замер запроса к внешнему API; исключение внутри блока считается ошибкой сервиса"""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        EXTERNAL_ERRORS.labels(service).inc()
+        raise
+    finally:
+        EXTERNAL_LATENCY.labels(service).observe(time.perf_counter() - started)
+
+
+def timed_methods(histogram, exclude=()):
+    """Декоратор класса: каждая публичная корутина класса пишет своё время в histogram с меткой-именем метода.
+    exclude - методы, которые не замеряем (например, помощники, через которые идут остальные методы)"""
+    def decorate(cls):
+        for name, method in list(vars(cls).items()):
+            if name.startswith('_') or name in exclude or not inspect.iscoroutinefunction(method):
+                continue
+            setattr(cls, name, _timed(method, histogram.labels(name)))
+        return cls
+    return decorate
+
+
+def _timed(method, observer):
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await method(*args, **kwargs)
+        finally:
+            observer.observe(time.perf_counter() - started)
+    return wrapper
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """Время работы хендлера; метка - имя функции хендлера (команда или колбэк)"""
+
+    async def __call__(self, handler, event, data):
+        handler_object = data.get('handler')
+        name = handler_object.callback.__name__ if handler_object is not None else 'unknown'
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            HANDLER_LATENCY.labels(name).observe(time.perf_counter() - started)
+
+
+async def metrics_handler(request):
+    return web.Response(body=generate_latest(), headers={'Content-Type': CONTENT_TYPE_LATEST})
+
+
+def start_metrics_server(port):
+    """Отдельный HTTP-сервер с /metrics для процессов без своего aiohttp-приложения"""
+    if port:
+        start_http_server(int(port))
@@ -0,0 +1,36 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Асинхронный token bucket: rate токенов в секунду, не больше capacity за раз"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    async def acquire(self, tokens=1):
+        """Ждём, пока в ведре не наберётся нужное количество токенов"""
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate + max(0.0, self._updated - time.monotonic())
+                await asyncio.sleep(wait)
+
+    def penalize(self, seconds):
+        """Опустошаем ведро и замораживаем пополнение на seconds (например, после 429/RetryAfter)"""
+        self._tokens = 0
+        self._updated = max(self._updated, time.monotonic() + seconds)
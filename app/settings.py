@@ -0,0 +1,91 @@
+"""Настройки со значениями по умолчанию поверх app/config.py,
+чтобы старые config.py продолжали работать без новых полей"""
+import datetime
+
+from app import config as cfg
+
+# Подключение к Postgres (имя базы, пользователь и пароль - в config.py: dbname, user, password)
+DB_HOST = getattr(cfg, 'DB_HOST', 'rc1d-xiuvu9wy0xvcpdxn.mdb.yandexcloud.net')
+DB_PORT = getattr(cfg, 'DB_PORT', '6432')
+
+# Пулы соединений: у каждого процесса свой, в сумме они не должны превышать лимит кластера.
+# DB_STATEMENT_CACHE_SIZE = 0 - если между ботом и базой pgbouncer в режиме transaction
+DB_MINCONN = getattr(cfg, 'DB_MINCONN', 1)
+BOT_DB_MAXCONN = getattr(cfg, 'BOT_DB_MAXCONN', 10)
+TRANS_DB_MAXCONN = getattr(cfg, 'TRANS_DB_MAXCONN', 10)
+WORKER_DB_MAXCONN = getattr(cfg, 'WORKER_DB_MAXCONN', 15)
+HOLDERS_DB_MAXCONN = getattr(cfg, 'HOLDERS_DB_MAXCONN', 5)
+DB_POOL_OPTIONS = dict(
+    acquire_timeout=getattr(cfg, 'DB_ACQUIRE_TIMEOUT', 10),
+    command_timeout=getattr(cfg, 'DB_COMMAND_TIMEOUT', 30),
+    statement_cache_size=getattr(cfg, 'DB_STATEMENT_CACHE_SIZE', 100),
+    max_inactive_lifetime=getattr(cfg, 'DB_MAX_INACTIVE_LIFETIME', 300),
+    healthcheck_idle=getattr(cfg, 'DB_HEALTHCHECK_IDLE', 30),
+    connect_retries=getattr(cfg, 'DB_CONNECT_RETRIES', 5),
+)
+
+# Внешние API: Bot API (None - api.telegram.org, иначе свой Bot API сервер), DexScreener, Solana RPC
+TELEGRAM_API_URL = getattr(cfg, 'TELEGRAM_API_URL', None)
+DEXSCREENER_API_URL = getattr(cfg, 'DEXSCREENER_API_URL', "https://api.dexscreener.com/latest/dex/tokens/")
+SOLANA_RPC_URL = getattr(cfg, 'SOLANA_RPC_URL', "https://api.mainnet-beta.solana.com")
+
+# Рассылка оповещений (лимиты Telegram: ~30 сообщений/сек на бота, 1/сек в личку, 20/мин в группу)
+BROADCAST_WORKERS = getattr(cfg, 'BROADCAST_WORKERS', 20)
+BROADCAST_RATE = getattr(cfg, 'BROADCAST_RATE', 25)
+BROADCAST_CHAT_INTERVAL = getattr(cfg, 'BROADCAST_CHAT_INTERVAL', 1.0)
+BROADCAST_GROUP_INTERVAL = getattr(cfg, 'BROADCAST_GROUP_INTERVAL', 3.0)
+BROADCAST_MAX_RETRIES = getattr(cfg, 'BROADCAST_MAX_RETRIES', 3)
+
+# Опрос Helius (trans.py): лимит запросов в секунду по тарифу, параллельность и период опроса кошелька
+HELIUS_API_URL = getattr(cfg, 'HELIUS_API_URL', "https://api.helius.xyz/v0")
+HELIUS_RPS = getattr(cfg, 'HELIUS_RPS', 10)
+HELIUS_CONCURRENCY = getattr(cfg, 'HELIUS_CONCURRENCY', 5)
+HELIUS_POLL_INTERVAL = getattr(cfg, 'HELIUS_POLL_INTERVAL', 60)
+HELIUS_PAGE_LIMIT = getattr(cfg, 'HELIUS_PAGE_LIMIT', 100)
+HELIUS_MAX_PAGES = getattr(cfg, 'HELIUS_MAX_PAGES', 10)
+
+# Скользящее окно покупок: фильтр при загрузке свапов, очистка infl_buys и поиск горячих токенов
+BUYS_WINDOW = datetime.timedelta(hours=getattr(cfg, 'BUYS_WINDOW_HOURS', 12))
+
+# Webhook-режим: включается, если задан WEBHOOK_URL (публичный адрес, на который Telegram шлёт апдейты)
+WEBHOOK_URL = getattr(cfg, 'WEBHOOK_URL', None)
+WEBHOOK_PATH = getattr(cfg, 'WEBHOOK_PATH', "/webhook")
+WEBHOOK_SECRET = getattr(cfg, 'WEBHOOK_SECRET', None)
+WEBHOOK_HOST = getattr(cfg, 'WEBHOOK_HOST', "0.0.0.0")
+WEBHOOK_PORT = getattr(cfg, 'WEBHOOK_PORT', 8080)
+WEBHOOK_SHUTDOWN_TIMEOUT = getattr(cfg, 'WEBHOOK_SHUTDOWN_TIMEOUT', 30)
+
+# Redis для FSM и общего состояния между репликами; без REDIS_URL всё хранится в памяти процесса
+REDIS_URL = getattr(cfg, 'REDIS_URL', None)
+FSM_STATE_TTL = getattr(cfg, 'FSM_STATE_TTL', 3600)
+FSM_DATA_TTL = getattr(cfg, 'FSM_DATA_TTL', 3600)
+# Сколько помним применённые оплаченные счета (повторная проверка счёта не продлевает подписку)
+PAID_INVOICE_TTL = getattr(cfg, 'PAID_INVOICE_TTL', 365 * 86400)
+
+# Справочник инфлов в памяти: полная перезагрузка по таймеру, плюс сразу по NOTIFY sol_wallet_changed
+DIRECTORY_REFRESH_INTERVAL = getattr(cfg, 'DIRECTORY_REFRESH_INTERVAL', 300)
+
+# Кэш профилей пользователей: время жизни записи и период сброса отложенных записей в users
+USER_CACHE_TTL = getattr(cfg, 'USER_CACHE_TTL', 600)
+USER_FLUSH_INTERVAL = getattr(cfg, 'USER_FLUSH_INTERVAL', 5)
+
+# Поиск горячих токенов: сразу по NOTIFY token_activity после новой покупки,
+# плюс полная сверка раз в ALERT_RECONCILE_INTERVAL (и опрос раз в ALERT_POLL_INTERVAL, если LISTEN недоступен)
+ALERT_RECONCILE_INTERVAL = getattr(cfg, 'ALERT_RECONCILE_INTERVAL', 300)
+ALERT_POLL_INTERVAL = getattr(cfg, 'ALERT_POLL_INTERVAL', 60)
+
+# Метрики Prometheus (/metrics): в webhook-режиме бот отдаёт их на WEBHOOK_PORT,
+# в polling-режиме и у воркеров - на своём порту (None - не поднимать)
+METRICS_PORT = getattr(cfg, 'METRICS_PORT', None)
+TRANS_METRICS_PORT = getattr(cfg, 'TRANS_METRICS_PORT', None)
+HOLDERS_METRICS_PORT = getattr(cfg, 'HOLDERS_METRICS_PORT', None)
+WORKER_METRICS_PORT = getattr(cfg, 'WORKER_METRICS_PORT', None)
+
+# Холдинги (holders_1.py): период обхода всех кошельков
+HOLDERS_INTERVAL = getattr(cfg, 'HOLDERS_INTERVAL', 120)
+
+# Процесс воркеров (worker.py): упавшая задача перезапускается с паузой WORKER_RESTART_DELAY,
+# удваивая её до WORKER_RESTART_MAX_DELAY; после WORKER_STABLE_RUN секунд нормальной работы пауза сбрасывается
+WORKER_RESTART_DELAY = getattr(cfg, 'WORKER_RESTART_DELAY', 1)
+WORKER_RESTART_MAX_DELAY = getattr(cfg, 'WORKER_RESTART_MAX_DELAY', 60)
+WORKER_STABLE_RUN = getattr(cfg, 'WORKER_STABLE_RUN', 300)
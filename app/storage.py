@@ -0,0 +1,116 @@
+import json
+import time
+
+from aiogram.fsm.storage.memory import MemoryStorage
+
+
+def create_redis(redis_url):
+    """Клиент Redis по URL или None, если Redis не настроен"""
+    if not redis_url:
+        return None
+    from redis.asyncio import Redis
+    return Redis.from_url(redis_url)
+
+
+def create_fsm_storage(redis=None, state_ttl=None, data_ttl=None):
+    """Хранилище FSM: в Redis (общее для всех реплик, переживает рестарт, с TTL
+    на простаивающие состояния) или в памяти процесса, если Redis не настроен"""
+    if redis is None:
+        return MemoryStorage()
+    from aiogram.fsm.storage.redis import RedisStorage
+    return RedisStorage(
+        redis=redis,
+        state_ttl=state_ttl,
+        data_ttl=data_ttl
+    )
+
+
+def create_shared_state(redis=None, prefix="fabu"):
+    if redis is None:
+        return MemorySharedState()
+    return RedisSharedState(redis, prefix=prefix)
+
+
+class RedisSharedState:
+    """Общие для всех реплик кэши и множества дедупликации в Redis"""
+
+    def __init__(self, redis, prefix="fabu"):
+        self.redis = redis
+        self.prefix = prefix
+
+    def _key(self, key):
+        return f"{self.prefix}:{key}"
+
+    async def get(self, key):
+        value = await self.redis.get(self._key(key))
+        return json.loads(value) if value is not None else None
+
+    async def set(self, key, value, ttl=None):
+        await self.redis.set(self._key(key), json.dumps(value), ex=ttl)
+
+    async def delete(self, key):
+        await self.redis.delete(self._key(key))
+
+    async def claim(self, key, ttl):
+        """Атомарно занимаем ключ на ttl секунд. True - только у первой реплики, которая успела"""
+        return bool(await self.redis.set(self._key(key), 1, ex=ttl, nx=True))
+
+    async def add_to_set(self, name, *members, ttl=None):
+        """Добавляем элементы в множество, возвращаем сколько из них новых"""
+        key = self._key(name)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.sadd(key, *members)
+            if ttl:
+                pipe.expire(key, ttl)
+            added, *_ = await pipe.execute()
+        return added
+
+    async def is_member(self, name, member):
+        return bool(await self.redis.sismember(self._key(name), member))
+
+
+class MemorySharedState:
+    """То же, что RedisSharedState, в памяти процесса - для запуска в одну реплику"""
+
+    def __init__(self):
+        self._values = {}
+        self._sets = {}
+
+    def _alive(self, storage, key):
+        entry = storage.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at < time.monotonic():
+            del storage[key]
+            return None
+        return value
+
+    @staticmethod
+    def _expires_at(ttl):
+        return time.monotonic() + ttl if ttl else None
+
+    async def get(self, key):
+        return self._alive(self._values, key)
+
+    async def set(self, key, value, ttl=None):
+        self._values[key] = (self._expires_at(ttl), value)
+
+    async def delete(self, key):
+        self._values.pop(key, None)
+
+    async def claim(self, key, ttl):
+        if self._alive(self._values, key) is not None:
+            return False
+        self._values[key] = (self._expires_at(ttl), 1)
+        return True
+
+    async def add_to_set(self, name, *members, ttl=None):
+        members_set = self._alive(self._sets, name) or set()
+        added = len(set(members) - members_set)
+        members_set.update(members)
+        self._sets[name] = (self._expires_at(ttl), members_set)
+        return added
+
+    async def is_member(self, name, member):
+        return member in (self._alive(self._sets, name) or set())
@@ -0,0 +1,31 @@
+import asyncio
+import time
+import traceback
+
+from app import metrics
+
+
+async def supervise(name, factory, delay=1, max_delay=60, stable_run=300):
+    """Запускает корутину factory() и перезапускает её, если она упала или завершилась.
+
+    Пауза перед перезапуском удваивается от delay до max_delay и сбрасывается,
+    если задача перед падением проработала не меньше stable_run секунд.
+    Отмена supervise отменяет и саму задачу"""
+    backoff = delay
+    while True:
+        started = time.monotonic()
+        try:
+            await factory()
+            print(f"Задача {name} завершилась")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Задача {name} упала: {e}")
+            traceback.print_exc()
+
+        metrics.WORKER_RESTARTS.labels(name).inc()
+        if time.monotonic() - started >= stable_run:
+            backoff = delay
+        print(f"Перезапуск {name} через {backoff} сек")
+        await asyncio.sleep(backoff)
+        backoff = min(backoff * 2, max_delay)
@@ -0,0 +1,41 @@
+from aiohttp import web
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+
+from app.metrics import metrics_handler
+
+
+async def health(request):
+    return web.json_response({"status": "ok"})
+
+
+def create_app(dispatcher, bot, path, secret_token=None, health_path="/healthz", metrics_path="/metrics", **data):
+    """aiohttp-приложение для webhook-режима бота.
+
+    Апдейты обрабатываются внутри HTTP-запроса (handle_in_background=False), поэтому при остановке
+    aiohttp дожидается уже принятых апдейтов (shutdown_timeout в web.run_app).
+    Shutdown диспетчера и закрытие сессии бота висят на on_cleanup, а не на on_shutdown
+    (как в setup_application): on_shutdown aiohttp вызывает ещё до того, как дождётся запросов"""
+    app = web.Application()
+    handler = SimpleRequestHandler(
+        dispatcher=dispatcher,
+        bot=bot,
+        secret_token=secret_token,
+        handle_in_background=False,
+        **data
+    )
+    app.router.add_post(path, handler.handle)
+    app.router.add_get(health_path, health)
+    app.router.add_get(metrics_path, metrics_handler)
+
+    workflow_data = {"app": app, "dispatcher": dispatcher, "bot": bot, **dispatcher.workflow_data, **data}
+
+    async def on_startup(app):
+        await dispatcher.emit_startup(**workflow_data)
+
+    async def on_cleanup(app):
+        await dispatcher.emit_shutdown(**workflow_data)
+        await handler.close()
+
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    return app
@@ -0,0 +1,377 @@
+"""Микробенчмарк методов AsyncDatabase на реалистичных объёмах.
+
+    python -m bench.db_bench --json db.json
+    python -m bench.db_bench --scale 0.1 --compare db.json
+
+Временный Postgres (bench/postgres.py) с миграциями заполняется данными: 10k кошельков в sol_wallet
+и data_wallet, 2M строк infl_buys за два окна BUYS_WINDOW (token_buyers/token_activity считаются так же,
+как в миграции 0008), 100k строк token_data, 50k пользователей. Объёмы задаются флагами и --scale.
+
+Для каждого метода три замера:
+  cold - первый вызов на новом пуле: свежий backend, пустой кэш подготовленных выражений asyncpg
+         и каталожные кэши сервера (shared_buffers и page cache ОС остаются тёплыми);
+  warm - --repeat последовательных вызовов после прогрева;
+  contention - --concurrency параллельных вызывающих на пуле из --pool-size соединений,
+         в задержку входит ожидание свободного соединения.
+Записывающие методы идут после читающих, удаляющие (delete_old_transaction, remove_expired_users) -
+в самом конце: первый их вызов удаляет всё вышедшее за окно, следующие меряют пустой проход.
+
+--compare сравнивает warm p50 с прошлым JSON и завершается с кодом 1, если метод замедлился
+больше чем в --threshold раз (и больше чем на --min-delta-ms)"""
+import argparse
+import asyncio
+import contextlib
+import datetime
+import io
+import itertools
+import json
+import random
+import subprocess
+import sys
+import time
+
+import asyncpg
+
+from bench import report
+from bench.postgres import ThrowawayPostgres
+from db.async_database import AsyncDatabase
+
+USER_ID_BASE = 10_000
+FRESH_HOT_TOKENS = 20
+DIRTY_TOKENS = 50
+
+SEED_QUERIES = [
+    # Кошельки: каждый четвёртый SMART, остальные INFLUENCER у 500 инфлов
+    """
+    INSERT INTO sol_wallet (wallet, "user", link, wallet_type)
+    SELECT 'W' || lpad(i::text, 43, '0'),
+           CASE WHEN i % 4 = 3 THEN 'smart_degen' ELSE 'infl' || (i % 500) END,
+           'https://t.me/infl' || (i % 500),
+           (CASE WHEN i % 4 = 3 THEN 'SMART' ELSE 'INFLUENCER' END)::wallet_type_enum
+    FROM generate_series(0, $1 - 1) AS i
+    """,
+    """
+    INSERT INTO data_wallet (wallet, pnl, wr)
+    SELECT wallet, round((random() * 350 - 50)::numeric, 1), round((random() * 70 + 20)::numeric, 0)
+    FROM sol_wallet
+    """,
+    # Холдинги: token_address из пула в половину объёма, чтобы у токенов было по несколько держателей
+    """
+    INSERT INTO token_data (wallet, token_address, token_name, token_amount, total_in_sol)
+    SELECT 'W' || lpad((i % $1)::text, 43, '0'),
+           'T' || lpad(((i * 7919) % ($2 / 2))::text, 43, '0'),
+           'Token' || ((i * 7919) % ($2 / 2)),
+           round((random() * 500000)::numeric, 2),
+           round((random() * 50)::numeric, 4)
+    FROM generate_series(0, $2 - 1) AS i
+    ON CONFLICT DO NOTHING
+    """,
+    # Покупки: степенное распределение по токенам - немного популярных, длинный хвост редких
+    """
+    INSERT INTO infl_buys (wallet, token, amount_token, timestamp, operation_type)
+    SELECT 'W' || lpad(floor(random() * $1)::int::text, 43, '0'),
+           'M' || lpad(floor(power(random(), 4) * $3)::int::text, 43, '0'),
+           (random() * 1000000)::real,
+           NOW() - random() * $4::interval,
+           'BUY'
+    FROM generate_series(1, $2)
+    ON CONFLICT DO NOTHING
+    """,
+    """
+    INSERT INTO users (user_id, payment_status, payment_date, notify_infl, notify_smart)
+    SELECT $2 + i, 'paid', NOW() - random() * interval '150 days', i % 3 <> 0, i % 5 = 0
+    FROM generate_series(0, $1 - 1) AS i
+    """,
+]
+
+BACKFILL_QUERIES = [
+    """
+    INSERT INTO token_buyers (token, wallet, wallet_type, first_buy, last_buy)
+    SELECT b.token, b.wallet, s.wallet_type, MIN(b.timestamp), MAX(b.timestamp)
+    FROM infl_buys b
+    LEFT JOIN sol_wallet s ON s.wallet = b.wallet
+    GROUP BY b.token, b.wallet, s.wallet_type
+    """,
+    """
+    INSERT INTO token_activity (
+        token, buyers, influencer_buyers, smart_buyers, whale_buyers, insider_buyers, first_buy, last_buy, dirty
+    )
+    SELECT token, COUNT(*),
+           COUNT(*) FILTER (WHERE wallet_type = 'INFLUENCER'),
+           COUNT(*) FILTER (WHERE wallet_type = 'SMART'),
+           COUNT(*) FILTER (WHERE wallet_type = 'WHALE'),
+           COUNT(*) FILTER (WHERE wallet_type = 'INSIDER'),
+           MIN(first_buy), MAX(last_buy), FALSE
+    FROM token_buyers
+    GROUP BY token
+    """,
+    # Как в проде: почти все горячие токены уже разосланы, свежих и dirty - единицы
+    f"""
+    INSERT INTO notified_tokens (token)
+    SELECT token FROM token_activity WHERE buyers > 2
+    ORDER BY last_buy
+    OFFSET {FRESH_HOT_TOKENS}
+    """,
+    f"""
+    UPDATE token_activity SET dirty = TRUE
+    WHERE token IN (SELECT token FROM token_activity ORDER BY last_buy DESC LIMIT {DIRTY_TOKENS})
+    """,
+]
+
+
+async def seed(pg, args):
+    conn = await asyncpg.connect(**pg.connect_kwargs())
+    try:
+        started = time.perf_counter()
+        await conn.execute(SEED_QUERIES[0], args.wallets)
+        await conn.execute(SEED_QUERIES[1])
+        await conn.execute(SEED_QUERIES[2], args.wallets, args.token_data)
+        # Триггер token_activity построчно слишком медленный для миллионов строк - агрегаты считаются разом
+        await conn.execute("ALTER TABLE infl_buys DISABLE TRIGGER infl_buys_token_activity")
+        await conn.execute(SEED_QUERIES[3], args.wallets, args.buys, args.tokens, args.window * 2)
+        await conn.execute("ALTER TABLE infl_buys ENABLE TRIGGER infl_buys_token_activity")
+        await conn.execute(SEED_QUERIES[4], args.users, USER_ID_BASE)
+        for query in BACKFILL_QUERIES:
+            await conn.execute(query)
+        await conn.execute("VACUUM ANALYZE")
+
+        sample = {
+            'wallets': [row[0] for row in await conn.fetch(
+                "SELECT wallet FROM sol_wallet ORDER BY random() LIMIT 1000")],
+            'tokens': [row[0] for row in await conn.fetch(
+                "SELECT DISTINCT token_address FROM token_data ORDER BY 1 LIMIT 1000")],
+            'bought_tokens': [row[0] for row in await conn.fetch(
+                "SELECT token FROM token_activity ORDER BY buyers DESC LIMIT 1000")],
+            'influencers': [row[0] for row in await conn.fetch('SELECT DISTINCT "user" FROM sol_wallet')],
+            'server_version': conn.get_server_version().major,
+        }
+        print(f"Данные загружены за {time.perf_counter() - started:.1f} с")
+        return sample
+    finally:
+        await conn.close()
+
+
+def make_cases(sample, args, rng):
+    """{метод: функция(db) -> корутина}; аргументы каждого вызова выбираются из реальных данных"""
+    wallet = lambda: rng.choice(sample['wallets'])
+    token = lambda: rng.choice(sample['tokens'])
+    bought = lambda: rng.choice(sample['bought_tokens'])
+    user_id = lambda: USER_ID_BASE + rng.randrange(args.users)
+    new_ids = itertools.count()
+    new_address = lambda prefix: f"{prefix}{next(new_ids):043d}"
+
+    def holdings(db):
+        tokens = [(address, 'Token', rng.uniform(1, 500000), rng.uniform(0, 50))
+                  for address in rng.sample(sample['tokens'], 10)]
+        return db.sync_wallet_tokens(wallet(), tokens)
+
+    # Пакеты без повторов ключа (иначе ON CONFLICT DO UPDATE падает) и в порядке ключа:
+    # параллельные upsert в разном порядке взаимно блокируются
+    def stats(count):
+        return [(address, f"{rng.uniform(-50, 300):.1f}%", f"{rng.uniform(20, 90):.0f}%")
+                for address in sorted(rng.sample(sample['wallets'], min(count, len(sample['wallets']))))]
+
+    def statuses(count):
+        user_ids = sorted(rng.sample(range(USER_ID_BASE, USER_ID_BASE + args.users), min(count, args.users)))
+        return [(user, 'paid', datetime.datetime.now()) for user in user_ids]
+
+    return {
+        # Чтение
+        'get_sol_wallets': lambda db: db.get_sol_wallets(),
+        'get_wallets': lambda db: db.get_wallets(),
+        'get_user_wallets': lambda db: db.get_user_wallets(rng.choice(sample['influencers'])),
+        'check_row': lambda db: db.check_row(wallet()),
+        'count_wallets': lambda db: db.count_wallets(rng.choice(sample['influencers'])),
+        'check_infl': lambda db: db.check_infl(rng.choice(sample['influencers'])),
+        'get_influencers': lambda db: db.get_influencers(),
+        'get_influencer': lambda db: db.get_influencer(wallet()),
+        'get_tokens_for_wallet': lambda db: db.get_tokens_for_wallet(wallet()),
+        'get_wallets_by_token': lambda db: db.get_wallets_by_token(token()),
+        'get_token_name_by_address': lambda db: db.get_token_name_by_address(token()),
+        'get_payment_status': lambda db: db.get_payment_status(user_id()),
+        'get_user_settings': lambda db: db.get_user_settings(user_id()),
+        'is_payment_valid': lambda db: db.is_payment_valid(user_id()),
+        'get_notify_flags': lambda db: db.get_notify_flags(user_id()),
+        'get_users_with_notifications': lambda db: db.get_users_with_notifications(),
+        'get_users_notify_flags': lambda db: db.get_users_notify_flags(),
+        'get_wallet_cursor': lambda db: db.get_wallet_cursor(wallet()),
+        'get_tokens_with_time_for_wallet': lambda db: db.get_tokens_with_time_for_wallet(wallet()),
+        'get_tokens_with_more_than_5_unique_wallets': lambda db: db.get_tokens_with_more_than_5_unique_wallets(),
+        'get_unique_wallets_for_token': lambda db: db.get_unique_wallets_for_token(bought()),
+        'get_hot_tokens_with_wallets': lambda db: db.get_hot_tokens_with_wallets(args.window),
+        'get_changed_hot_tokens_with_wallets': lambda db: db.get_changed_hot_tokens_with_wallets(args.window),
+        'is_token_notified': lambda db: db.is_token_notified(bought()),
+        'get_data': lambda db: db.get_data(wallet()),
+        'get_wallets_data': lambda db: db.get_wallets_data([wallet() for _ in range(20)]),
+        # Запись
+        'add_row': lambda db: db.add_row(new_address('N'), 'bench', 'https://t.me/bench', 'INFLUENCER'),
+        'save_new_token': lambda db: db.save_new_token(wallet(), new_address('S'), 'Token', 1000.0, 1.0),
+        'update_token_info': lambda db: db.update_token_info(wallet(), token(), 'Token', 1000.0, 1.0),
+        'remove_token': lambda db: db.remove_token(wallet(), token()),
+        'sync_wallet_tokens': holdings,
+        'update_payment_status': lambda db: db.update_payment_status(user_id(), 'paid'),
+        'update_payment_statuses': lambda db: db.update_payment_statuses(statuses(100)),
+        'toggle_notify_infl': lambda db: db.toggle_notify_infl(user_id()),
+        'toggle_notify_smart': lambda db: db.toggle_notify_smart(user_id()),
+        'update_notify_infl_status': lambda db: db.update_notify_infl_status(user_id(), True),
+        'update_notify_smart_status': lambda db: db.update_notify_smart_status(user_id(), False),
+        'add_transaction': lambda db: db.add_transaction(wallet(), bought(), 1000, time.time(), 'BUY'),
+        'update_wallet_cursor': lambda db: db.update_wallet_cursor(wallet(), new_address('X'), 300_000_000),
+        'add_transactions': lambda db: db.add_transactions(
+            [(wallet(), bought(), 1000, time.time(), 'SWAP') for _ in range(50)]),
+        'add_notified_token': lambda db: db.add_notified_token(new_address('A')),
+        'claim_notified_token': lambda db: db.claim_notified_token(new_address('C')),
+        'add_or_update_row': lambda db: db.add_or_update_row(wallet(), '12.5%', '60%'),
+        'import_wallets_stats': lambda db: db.import_wallets_stats(stats(1000)),
+        # Удаление
+        'delete_old_transaction': lambda db: db.delete_old_transaction(args.window),
+        'remove_expired_users': lambda db: db.remove_expired_users(),
+    }
+
+
+def new_db(pg, pool_size):
+    return AsyncDatabase(pool_size, pool_size, pg.dbname, pg.user, '', host=pg.host, port=pg.port)
+
+
+async def timed(call):
+    started = time.perf_counter()
+    await call()
+    return time.perf_counter() - started
+
+
+async def bench_method(pg, case, args):
+    """cold/warm/contention для одного метода. Ошибки AsyncDatabase печатает, а не бросает -
+    они считаются по выводу"""
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        db = await new_db(pg, 1).connect()
+        try:
+            cold = await timed(lambda: case(db))
+        finally:
+            await db.close_all_connections()
+
+        db = await new_db(pg, args.pool_size).connect()
+        try:
+            for _ in range(args.warmup):
+                await case(db)
+            warm = [await timed(lambda: case(db)) for _ in range(args.repeat)]
+
+            async def caller():
+                return [await timed(lambda: case(db)) for _ in range(args.repeat)]
+
+            started = time.perf_counter()
+            results = await asyncio.gather(*(caller() for _ in range(args.concurrency)))
+            elapsed = time.perf_counter() - started
+        finally:
+            await db.close_all_connections()
+
+    contention = [value for values in results for value in values]
+    return {
+        'cold_ms': round(cold * 1000, 2),
+        'warm': report.summarize(warm),
+        'contention': dict(report.summarize(contention), calls_per_second=round(len(contention) / elapsed, 1)),
+        'errors': output.getvalue().count("An error occurred"),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """Методы, у которых warm p50 вырос больше чем в threshold раз: [(метод, было, стало)]"""
+    regressions = []
+    for name, stats in results['methods'].items():
+        before = baseline.get('methods', {}).get(name)
+        if not before or before['warm']['p50_ms'] is None or stats['warm']['p50_ms'] is None:
+            continue
+        was, now = before['warm']['p50_ms'], stats['warm']['p50_ms']
+        if now > was * threshold and now - was > min_delta_ms:
+            regressions.append((name, was, now))
+    return regressions
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    pg = ThrowawayPostgres(bin_dir=args.pg_bin).start()
+    try:
+        await pg.create_database()
+        sample = await seed(pg, args)
+        cases = make_cases(sample, args, rng)
+        selected = [name for name in cases if not args.only or name in args.only]
+
+        methods = {}
+        for name in selected:
+            methods[name] = await bench_method(pg, cases[name], args)
+            print(f"{name}: cold {methods[name]['cold_ms']} ms, warm p50 {methods[name]['warm']['p50_ms']} ms")
+        return {
+            'meta': {
+                'commit': git_commit(),
+                'date': datetime.datetime.now().isoformat(timespec='seconds'),
+                'postgres': sample['server_version'],
+                'volumes': {
+                    'wallets': args.wallets, 'buys': args.buys, 'tokens': args.tokens,
+                    'token_data': args.token_data, 'users': args.users,
+                },
+                'repeat': args.repeat, 'concurrency': args.concurrency, 'pool_size': args.pool_size,
+            },
+            'methods': methods,
+        }
+    finally:
+        pg.stop()
+
+
+def print_results(results):
+    methods = results['methods']
+    print(f"\nОбъёмы: {results['meta']['volumes']}")
+    print(f"{'':<44}{'cold, ms':>10}{'warm p50':>10}{'warm p99':>10}"
+          f"{'cont p50':>10}{'cont p99':>10}{'вызовов/с':>11}{'ошибок':>8}")
+    for name, stats in methods.items():
+        values = (stats['cold_ms'], stats['warm']['p50_ms'], stats['warm']['p99_ms'],
+                  stats['contention']['p50_ms'], stats['contention']['p99_ms'])
+        print(f"{name:<44}" + ''.join(f"{value:>10.2f}" for value in values)
+              + f"{stats['contention']['calls_per_second']:>11}{stats['errors']:>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Микробенчмарк методов AsyncDatabase")
+    parser.add_argument('--wallets', type=int, default=10_000)
+    parser.add_argument('--buys', type=int, default=2_000_000, help="строк infl_buys")
+    parser.add_argument('--tokens', type=int, default=50_000, help="разных токенов в infl_buys")
+    parser.add_argument('--token-data', type=int, default=100_000, help="строк token_data")
+    parser.add_argument('--users', type=int, default=50_000)
+    parser.add_argument('--scale', type=float, default=1.0, help="множитель всех объёмов")
+    parser.add_argument('--repeat', type=int, default=50, help="замеров warm и вызовов на каждого конкурента")
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--concurrency', type=int, default=50, help="параллельных вызывающих")
+    parser.add_argument('--pool-size', type=int, default=10)
+    parser.add_argument('--window-hours', type=float, default=12, help="окно покупок, как BUYS_WINDOW_HOURS")
+    parser.add_argument('--only', nargs='+', help="только эти методы")
+    parser.add_argument('--pg-bin', help="каталог с initdb/pg_ctl")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help="куда записать результаты в JSON")
+    parser.add_argument('--compare', help="JSON прошлого прогона для сравнения")
+    parser.add_argument('--threshold', type=float, default=1.5, help="допустимый рост warm p50, раз")
+    parser.add_argument('--min-delta-ms', type=float, default=1.0, help="меньший рост не считается регрессией")
+    args = parser.parse_args()
+    args.window = datetime.timedelta(hours=args.window_hours)
+    for volume in ('wallets', 'buys', 'tokens', 'token_data', 'users'):
+        setattr(args, volume, max(1, int(getattr(args, volume) * args.scale)))
+
+    results = asyncio.run(run(args))
+    print_results(results)
+    if args.json:
+        report.write_json(args.json, results)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('meta', {}).get('volumes') != results['meta']['volumes']:
+            print(f"Внимание: объёмы отличаются от {args.compare}, сравнение неточное")
+        regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+        for name, was, now in regressions:
+            print(f"Регрессия {name}: warm p50 {was} -> {now} ms")
+        if regressions:
+            sys.exit(1)
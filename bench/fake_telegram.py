@@ -0,0 +1,64 @@
+import asyncio
+import itertools
+import time
+
+from aiohttp import web
+
+from bench.stubs import start_app
+
+BOT_USER = {'id': 42, 'is_bot': True, 'first_name': 'Bench', 'username': 'bench_bot'}
+
+# Методы, которые в ответ возвращают отправленное/изменённое сообщение
+MESSAGE_METHODS = {'sendMessage', 'sendPhoto', 'editMessageText', 'editMessageReplyMarkup', 'editMessageCaption'}
+
+
+class FakeTelegram:
+    """Локальный Bot API: принимает запросы бота (/bot<token>/<method>), отвечает валидными объектами
+    и запоминает отправленные сообщения. latency - искусственная задержка каждого ответа"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.sent = []
+        self.calls = 0
+        self.listeners = []
+        self.base_url = None
+        self._runner = None
+        self._message_id = itertools.count(1)
+
+    async def handle(self, request):
+        method = request.match_info['method']
+        data = await request.post()
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if method == 'getMe':
+            return web.json_response({'ok': True, 'result': BOT_USER})
+        if method not in MESSAGE_METHODS:
+            return web.json_response({'ok': True, 'result': True})
+
+        chat_id = int(data.get('chat_id', 0))
+        text = data.get('text') or data.get('caption') or ''
+        message = {
+            'message_id': int(data.get('message_id') or next(self._message_id)),
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private' if chat_id > 0 else 'group'},
+            'from': BOT_USER,
+            'text': text,
+        }
+        if method == 'sendMessage':
+            sent_at = time.monotonic()
+            self.sent.append((sent_at, chat_id, text))
+            for listener in self.listeners:
+                listener(sent_at, chat_id, text)
+        return web.json_response({'ok': True, 'result': message})
+
+    async def start(self):
+        app = web.Application(client_max_size=32 * 1024 ** 2)
+        app.router.add_post('/bot{token}/{method}', self.handle)
+        self._runner, self.base_url = await start_app(app)
+        return self
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
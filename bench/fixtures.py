@@ -0,0 +1,55 @@
+"""Синтетические ответы внешних API по записанным образцам из bench/data/*.json.
+
+В образцах подставляются поля вида {wallet}, {mint}; числовые поля (slot, timestamp, суммы)
+задаются явно в функциях ниже"""
+import copy
+import json
+import random
+from pathlib import Path
+
+FIXTURES_DIR = Path(__file__).parent / 'data'
+BASE58_ALPHABET = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+
+
+def _load(name):
+    with open(FIXTURES_DIR / name, encoding='utf-8') as f:
+        return json.load(f)
+
+
+HELIUS_SWAP = _load('helius_swap.json')
+DEX_PAIR = _load('dex_pair.json')
+RPC_TOKEN_ACCOUNT = _load('rpc_token_account.json')
+
+
+def _fill(template, **fields):
+    if isinstance(template, dict):
+        return {key: _fill(value, **fields) for key, value in template.items()}
+    if isinstance(template, list):
+        return [_fill(value, **fields) for value in template]
+    if isinstance(template, str):
+        for key, value in fields.items():
+            template = template.replace('{' + key + '}', str(value))
+    return template
+
+
+def address(rng: random.Random, length=44):
+    """Случайный base58-адрес в формате Solana"""
+    return ''.join(rng.choice(BASE58_ALPHABET) for _ in range(length))
+
+
+def helius_swap(wallet, mint, signature, slot, timestamp, pool='BenchPoo1111111111111111111111111111111111'):
+    tx = _fill(HELIUS_SWAP, wallet=wallet, mint=mint, signature=signature, pool=pool)
+    tx['slot'], tx['timestamp'] = slot, int(timestamp)
+    return tx
+
+
+def dex_pair(mint, symbol, pair):
+    return _fill(DEX_PAIR, mint=mint, name=f"{symbol} Token", symbol=symbol, pair=pair)
+
+
+def rpc_token_account(wallet, mint, account, ui_amount):
+    token_account = _fill(RPC_TOKEN_ACCOUNT, wallet=wallet, mint=mint, account=account)
+    token_amount = copy.deepcopy(token_account['account']['data']['parsed']['info']['tokenAmount'])
+    token_amount.update(uiAmount=ui_amount, uiAmountString=str(ui_amount), amount=str(int(ui_amount * 10 ** 6)))
+    token_account['account']['data']['parsed']['info']['tokenAmount'] = token_amount
+    return token_account
@@ -0,0 +1,124 @@
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+
+import asyncpg
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / 'db' / 'migrations'
+
+
+def migration_up(path):
+    """Секция -- +goose Up файла миграции"""
+    text = Path(path).read_text(encoding='utf-8')
+    up = re.split(r'^-- \+goose Down.*$', text, maxsplit=1, flags=re.M)[0]
+    return up.split('-- +goose Up', 1)[-1]
+
+
+def split_statements(sql):
+    """Операторы миграции по отдельности, как их делит goose: по ';' в конце строки,
+    блок между StatementBegin и StatementEnd - один оператор"""
+    statements, current, in_block = [], [], False
+    for line in sql.splitlines():
+        if line.startswith('-- +goose StatementBegin'):
+            in_block = True
+            continue
+        if line.startswith('-- +goose StatementEnd'):
+            in_block = False
+            statements.append('\n'.join(current))
+            current = []
+            continue
+        current.append(line)
+        if not in_block and line.rstrip().endswith(';'):
+            statements.append('\n'.join(current))
+            current = []
+    return [statement for statement in statements if statement.strip()]
+
+
+async def apply_migrations(conn, migrations_dir=MIGRATIONS_DIR):
+    for path in sorted(Path(migrations_dir).glob('*.sql')):
+        up = migration_up(path)
+        if re.search(r'^-- \+goose NO TRANSACTION', Path(path).read_text(encoding='utf-8'), flags=re.M):
+            # CREATE INDEX CONCURRENTLY нельзя выполнять в транзакции, а несколько операторов
+            # в одном execute Postgres выполняет как одну транзакцию
+            for statement in split_statements(up):
+                await conn.execute(statement)
+        else:
+            await conn.execute(up)
+
+
+class ThrowawayPostgres:
+    """Временный Postgres без докера: initdb + pg_ctl во временном каталоге, доступ только через
+    unix-сокет. Каталог с бинарниками - bin_dir, BENCH_PG_BIN, PATH или pg_config --bindir.
+    initdb не запускается от root - тогда, если установлен pgserver, сервер поднимается через него"""
+
+    def __init__(self, bin_dir=None, dbname='fabu_bench', user='postgres'):
+        self.bin_dir = bin_dir or os.environ.get('BENCH_PG_BIN') or self._find_bin_dir()
+        self.dbname = dbname
+        self.user = user
+        self.host = None
+        self.port = 5432
+        self._tmp = None
+        self._pgserver = None
+
+    @staticmethod
+    def _find_bin_dir():
+        initdb = shutil.which('initdb')
+        if initdb:
+            return str(Path(initdb).parent)
+        pg_config = shutil.which('pg_config')
+        if pg_config:
+            return subprocess.run([pg_config, '--bindir'], capture_output=True, text=True, check=True).stdout.strip()
+        return None
+
+    def _run(self, name, *args):
+        subprocess.run([str(Path(self.bin_dir) / name), *args], check=True, capture_output=True)
+
+    def start(self):
+        self._tmp = tempfile.mkdtemp(prefix='fabu-bench-pg-')
+        os.chmod(self._tmp, 0o755)
+        if self.bin_dir and os.geteuid() != 0:
+            data_dir = os.path.join(self._tmp, 'data')
+            self._run('initdb', '-D', data_dir, '-U', self.user, '-A', 'trust', '--no-sync')
+            self._run(
+                'pg_ctl', '-D', data_dir, '-w', '-l', os.path.join(self._tmp, 'postgres.log'),
+                '-o', f"-k {self._tmp} -c listen_addresses='' -c fsync=off -c synchronous_commit=off",
+                'start'
+            )
+            self.host = self._tmp
+        else:
+            try:
+                import pgserver
+            except ImportError:
+                raise RuntimeError("Нужны initdb/pg_ctl (не от root) или пакет pgserver") from None
+            self._pgserver = pgserver.get_server(os.path.join(self._tmp, 'data'), cleanup_mode='delete')
+            self.host = str(self._pgserver.pgdata)
+        return self
+
+    def stop(self):
+        if self._pgserver is not None:
+            self._pgserver.cleanup()
+        elif self.host is not None:
+            self._run('pg_ctl', '-D', os.path.join(self._tmp, 'data'), '-m', 'immediate', 'stop')
+        if self._tmp is not None:
+            shutil.rmtree(self._tmp, ignore_errors=True)
+
+    def connect_kwargs(self, database=None):
+        return dict(host=self.host, port=self.port, user=self.user, database=database or self.dbname)
+
+    async def create_database(self):
+        """Создаёт пустую базу dbname и накатывает на неё все миграции"""
+        conn = await asyncpg.connect(**self.connect_kwargs('postgres'))
+        try:
+            await conn.execute(f'DROP DATABASE IF EXISTS "{self.dbname}"')
+            await conn.execute(f'CREATE DATABASE "{self.dbname}"')
+        finally:
+            await conn.close()
+
+        conn = await asyncpg.connect(**self.connect_kwargs())
+        try:
+            await apply_migrations(conn)
+        finally:
+            await conn.close()
@@ -0,0 +1,42 @@
+import json
+import math
+
+
+def percentile(values, p):
+    """Перцентиль по ближайшему рангу; None для пустого списка"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(values):
+    return {
+        'count': len(values),
+        'p50_ms': _ms(percentile(values, 50)),
+        'p99_ms': _ms(percentile(values, 99)),
+        'max_ms': _ms(max(values) if values else None),
+    }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+def print_table(title, rows):
+    """rows - {имя: summarize(...)}"""
+    print(f"\n{title}")
+    print(f"{'':<28}{'count':>8}{'p50, ms':>12}{'p99, ms':>12}{'max, ms':>12}")
+    for name, stats in rows.items():
+        print(f"{name:<28}{stats['count']:>8}"
+              + ''.join(f"{_fmt(stats[key]):>12}" for key in ('p50_ms', 'p99_ms', 'max_ms')))
+
+
+def _fmt(value):
+    return '-' if value is None else f"{value:.2f}"
+
+
+def write_json(path, results):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,358 @@
+"""Нагрузочный прогон бота и воркеров на локальных заглушках.
+
+    python -m bench.run --users 200 --wallets 50 --hot-tokens 5 --json bench.json
+
+Поднимает временный Postgres (bench/postgres.py) с миграциями, фейковый Bot API (bench/fake_telegram.py)
+и заглушки Helius/DexScreener/Solana RPC (bench/stubs.py), подкладывает app.config с их адресами и
+прогоняет три фазы:
+  1. handlers - N пользователей параллельно проходят /start, /menu, настройки уведомлений и /check
+     через Dispatcher из main.py: задержка каждого хендлера и пропускная способность;
+  2. holders - цикл holders_1.process_wallets по M кошелькам;
+  3. alerts - HeliusPoller из trans.py находит новые свапы, бот замечает горячий токен и рассылает
+     оповещение: задержка от появления свапа (и от его выдачи заглушкой) до первого сообщения
+     и время полной рассылки."""
+import argparse
+import asyncio
+import contextlib
+import io
+import itertools
+import logging
+import random
+import sys
+import time
+import types
+from collections import defaultdict
+
+import aiohttp
+import asyncpg
+
+from bench import fixtures, report
+from bench.fake_telegram import FakeTelegram
+from bench.postgres import ThrowawayPostgres
+from bench.stubs import ApiStubs
+
+USER_ID_BASE = 10_000
+TOKENS_PER_WALLET = 5
+
+
+def install_config(pg, stubs, telegram, args):
+    """app/config.py для прогона: временная база, адреса заглушек и ускоренный опрос Helius"""
+    config = types.ModuleType('app.config')
+    config.__dict__.update(
+        token='42:BENCH',
+        TOKEN_CRYPTO_BOT='bench',
+        API='bench',
+        HELIUM_API='bench',
+        MY_ID=0,
+        TG_ID='@bench',
+        ref_tgc='https://t.me/bench',
+        ref_tgchat='https://t.me/bench_chat',
+        ref_sup='https://t.me/bench_support',
+        dbname=pg.dbname,
+        user=pg.user,
+        password='',
+        DB_HOST=pg.host,
+        DB_PORT=pg.port,
+        TELEGRAM_API_URL=telegram.base_url,
+        HELIUS_API_URL=stubs.helius_url,
+        DEXSCREENER_API_URL=stubs.dexscreener_url,
+        SOLANA_RPC_URL=stubs.rpc_url,
+        HELIUS_POLL_INTERVAL=args.poll_interval,
+        HELIUS_RPS=1000,
+        HELIUS_CONCURRENCY=20,
+        BROADCAST_RATE=args.broadcast_rate,
+    )
+    sys.modules['app.config'] = config
+
+
+async def seed(pg, rng, args):
+    """M кошельков (каждый четвёртый - smart_degen) со статистикой и N оплативших пользователей"""
+    wallets = []
+    for i in range(args.wallets):
+        smart = i % 4 == 3
+        user = 'smart_degen' if smart else f'infl{i % 10}'
+        wallets.append((fixtures.address(rng), user, f'https://t.me/{user}', 'SMART' if smart else 'INFLUENCER'))
+
+    conn = await asyncpg.connect(**pg.connect_kwargs())
+    try:
+        await conn.executemany(
+            'INSERT INTO sol_wallet (wallet, "user", link, wallet_type) VALUES ($1, $2, $3, $4)', wallets
+        )
+        await conn.executemany(
+            "INSERT INTO data_wallet (wallet, pnl, wr) VALUES ($1, parse_percent($2), parse_percent($3))",
+            [(wallet[0], f"{rng.uniform(-50, 300):.1f}%", f"{rng.uniform(20, 90):.0f}%") for wallet in wallets]
+        )
+        await conn.executemany(
+            "INSERT INTO users (user_id, payment_status, payment_date) VALUES ($1, 'paid', NOW())",
+            [(USER_ID_BASE + i,) for i in range(args.users)]
+        )
+    finally:
+        await conn.close()
+    return wallets
+
+
+class Updates:
+    """Синтетические апдейты Telegram от пользователей"""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self._ids = itertools.count(1)
+
+    def _user(self, user_id):
+        return {'id': user_id, 'is_bot': False, 'first_name': f'User{user_id}'}
+
+    def message(self, user_id, text):
+        update_id = next(self._ids)
+        data = {
+            'update_id': update_id,
+            'message': {
+                'message_id': update_id,
+                'date': int(time.time()),
+                'chat': {'id': user_id, 'type': 'private'},
+                'from': self._user(user_id),
+                'text': text,
+            },
+        }
+        if text.startswith('/'):
+            data['message']['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(text)}]
+        return self._validate(data)
+
+    def callback(self, user_id, callback_data):
+        update_id = next(self._ids)
+        return self._validate({
+            'update_id': update_id,
+            'callback_query': {
+                'id': str(update_id),
+                'from': self._user(user_id),
+                'chat_instance': str(user_id),
+                'data': callback_data,
+                'message': {
+                    'message_id': update_id,
+                    'date': int(time.time()),
+                    'chat': {'id': user_id, 'type': 'private'},
+                    'text': 'menu',
+                },
+            },
+        })
+
+    def _validate(self, data):
+        from aiogram.types import Update
+        return Update.model_validate(data, context={'bot': self.bot})
+
+
+def user_scenario(updates, user_id, wallets, rng):
+    """Путь пользователя: (метка хендлера, апдейт)"""
+    wallet, influencer = rng.choice(wallets), rng.choice([w[1] for w in wallets if w[1] != 'smart_degen'])
+    return [
+        ('/start', updates.message(user_id, '/start')),
+        ('/menu', updates.message(user_id, '/menu')),
+        ('spy', updates.callback(user_id, 'spy')),
+        ('infl_notify', updates.callback(user_id, 'infl_notify')),
+        ('infl_notify', updates.callback(user_id, 'infl_notify')),
+        ('/check', updates.message(user_id, '/check')),
+        ('check wallet', updates.message(user_id, wallet[0])),
+        ('/check', updates.message(user_id, '/check')),
+        ('check influencer', updates.message(user_id, influencer)),
+    ]
+
+
+async def handlers_phase(main, wallets, rng, args):
+    updates = Updates(main.bot)
+    latencies = defaultdict(list)
+    errors = 0
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def run_user(user_id):
+        nonlocal errors
+        async with semaphore:
+            for label, update in user_scenario(updates, user_id, wallets, rng):
+                started = time.perf_counter()
+                try:
+                    await main.dp.feed_update(main.bot, update)
+                except Exception as e:
+                    errors += 1
+                    print(f"Ошибка хендлера {label}: {e}", file=sys.stderr)
+                latencies[label].append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run_user(USER_ID_BASE + i) for i in range(args.users)))
+    elapsed = time.perf_counter() - started
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    return {
+        'updates': len(all_latencies),
+        'errors': errors,
+        'seconds': round(elapsed, 3),
+        'updates_per_second': round(len(all_latencies) / elapsed, 1),
+        'all': report.summarize(all_latencies),
+        'handlers': {label: report.summarize(values) for label, values in latencies.items()},
+    }
+
+
+async def holders_phase(holders_1, db, session, dex, stubs, wallets, rng, args):
+    mints = [fixtures.address(rng) for _ in range(args.wallets * 2)]
+    for wallet in wallets:
+        stubs.set_holdings(wallet[0], rng.sample(mints, TOKENS_PER_WALLET))
+
+    cycles = []
+    for _ in range(args.holders_rounds):
+        started = time.perf_counter()
+        await holders_1.process_wallets(db, session, dex)
+        cycles.append(time.perf_counter() - started)
+    return {
+        'wallets': len(wallets),
+        'cycle': report.summarize(cycles),
+        'wallets_per_second': round(len(wallets) / report.percentile(cycles, 50), 1),
+    }
+
+
+async def alerts_phase(trans, db, session, stubs, telegram, wallets, rng, args):
+    # Старый свап за пределами окна: первый опрос только выставит курсоры кошельков
+    for wallet in wallets:
+        stubs.add_swap(wallet[0], fixtures.address(rng), timestamp=time.time() - 3 * 86400)
+
+    poller = trans.HeliusPoller(
+        db, session, 'bench',
+        rate=1000, concurrency=20, interval=args.poll_interval, base_url=stubs.helius_url
+    )
+    poller_task = asyncio.create_task(poller.run([wallet[0] for wallet in wallets]))
+    while stubs.requests['helius'] < len(wallets):
+        await asyncio.sleep(0.05)
+    await asyncio.sleep(args.poll_interval)
+
+    deliveries = defaultdict(list)
+
+    def on_message(sent_at, chat_id, text):
+        if '<code>' in text:
+            token = text.split('<code>', 1)[1].split('</code>', 1)[0]
+            deliveries[token].append(sent_at)
+
+    telegram.listeners.append(on_message)
+
+    influencer_wallets = [wallet[0] for wallet in wallets if wallet[3] == 'INFLUENCER']
+    injected, signatures = {}, {}
+    for _ in range(args.hot_tokens):
+        mint = fixtures.address(rng)
+        signatures[mint] = [stubs.add_swap(wallet, mint) for wallet in rng.sample(influencer_wallets, 3)]
+        injected[mint] = time.monotonic()
+        await asyncio.sleep(args.alert_spacing)
+
+    deadline = time.monotonic() + args.alert_timeout
+    while time.monotonic() < deadline and any(len(deliveries[mint]) < args.users for mint in injected):
+        await asyncio.sleep(0.05)
+
+    poller_task.cancel()
+    await asyncio.gather(poller_task, return_exceptions=True)
+    telegram.listeners.remove(on_message)
+
+    to_first, served_to_first, fanout = [], [], []
+    for mint, injected_at in injected.items():
+        sent = sorted(deliveries[mint])
+        if not sent:
+            continue
+        served_at = max(stubs.served.get(signature, injected_at) for signature in signatures[mint])
+        to_first.append(sent[0] - injected_at)
+        served_to_first.append(sent[0] - served_at)
+        fanout.append(sent[-1] - sent[0])
+
+    delivered = sum(len(deliveries[mint]) for mint in injected)
+    return {
+        'hot_tokens': len(injected),
+        'alerted_tokens': len(to_first),
+        'messages_delivered': delivered,
+        'swap_to_first_message': report.summarize(to_first),
+        'served_to_first_message': report.summarize(served_to_first),
+        'fanout': report.summarize(fanout),
+    }
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    pg = ThrowawayPostgres(bin_dir=args.pg_bin).start()
+    stubs = await ApiStubs(rng, latency=args.api_latency).start()
+    telegram = await FakeTelegram(latency=args.telegram_latency).start()
+    try:
+        await pg.create_database()
+        wallets = await seed(pg, rng, args)
+        install_config(pg, stubs, telegram, args)
+
+        output = io.StringIO() if not args.verbose else sys.stdout
+        with contextlib.redirect_stdout(output):
+            import main
+            import trans
+            import holders_1
+            import worker
+            from dex_parse import DexScreenerClient
+            logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+
+            await main.on_startup(main.bot)
+            results = {'users': args.users, 'wallets': args.wallets}
+            try:
+                results['handlers'] = await handlers_phase(main, wallets, rng, args)
+
+                db = await worker.create_database().connect()
+                try:
+                    async with aiohttp.ClientSession() as session:
+                        dex = DexScreenerClient(session=session, base_url=stubs.dexscreener_url)
+                        results['holders'] = await holders_phase(holders_1, db, session, dex, stubs, wallets, rng, args)
+                        results['alerts'] = await alerts_phase(trans, db, session, stubs, telegram, wallets, rng, args)
+                finally:
+                    await db.close_all_connections()
+            finally:
+                await main.on_shutdown()
+                await main.bot.session.close()
+        results['requests'] = dict(stubs.requests, telegram=telegram.calls)
+        return results
+    finally:
+        await telegram.close()
+        await stubs.close()
+        pg.stop()
+
+
+def print_results(results):
+    handlers = results['handlers']
+    print(f"Пользователей: {results['users']}, кошельков: {results['wallets']}")
+    print(f"\nХендлеры: {handlers['updates']} апдейтов за {handlers['seconds']} с, "
+          f"{handlers['updates_per_second']} апд/с, ошибок: {handlers['errors']}")
+    report.print_table("Задержка хендлеров", {'все': handlers['all'], **handlers['handlers']})
+
+    holders = results['holders']
+    report.print_table(f"holders_1: цикл по {holders['wallets']} кошелькам ({holders['wallets_per_second']} кош/с)",
+                       {'цикл': holders['cycle']})
+
+    alerts = results['alerts']
+    report.print_table(
+        f"Оповещения: {alerts['alerted_tokens']} из {alerts['hot_tokens']} токенов, "
+        f"сообщений: {alerts['messages_delivered']}",
+        {
+            'свап -> первое сообщение': alerts['swap_to_first_message'],
+            'выдача -> первое сообщение': alerts['served_to_first_message'],
+            'полная рассылка': alerts['fanout'],
+        }
+    )
+    print(f"\nЗапросы к заглушкам: {results['requests']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Нагрузочный прогон бота на локальных заглушках")
+    parser.add_argument('--users', type=int, default=100, help="синтетических пользователей (N)")
+    parser.add_argument('--wallets', type=int, default=30, help="отслеживаемых кошельков (M)")
+    parser.add_argument('--hot-tokens', type=int, default=3, help="горячих токенов в фазе оповещений")
+    parser.add_argument('--concurrency', type=int, default=50, help="пользователей одновременно")
+    parser.add_argument('--holders-rounds', type=int, default=3)
+    parser.add_argument('--poll-interval', type=float, default=1.0, help="период опроса Helius, с")
+    parser.add_argument('--broadcast-rate', type=float, default=25, help="лимит рассылки, сообщений/с")
+    parser.add_argument('--alert-spacing', type=float, default=0.5, help="пауза между горячими токенами, с")
+    parser.add_argument('--alert-timeout', type=float, default=120)
+    parser.add_argument('--api-latency', type=float, default=0.0, help="задержка ответов заглушек API, с")
+    parser.add_argument('--telegram-latency', type=float, default=0.0, help="задержка ответов Bot API, с")
+    parser.add_argument('--pg-bin', help="каталог с initdb/pg_ctl")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help="куда записать результаты в JSON")
+    parser.add_argument('--verbose', action='store_true', help="не глушить вывод бота")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print_results(results)
+    if args.json:
+        report.write_json(args.json, results)
@@ -0,0 +1,114 @@
+import asyncio
+import itertools
+import random
+import time
+from collections import Counter
+
+from aiohttp import web
+
+from bench import fixtures
+
+
+async def start_app(app, host='127.0.0.1'):
+    """Запуск aiohttp-приложения на свободном порту, возвращает (runner, base_url)"""
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host, 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://{host}:{port}"
+
+
+class ApiStubs:
+    """Заглушки Helius (enhanced transactions), DexScreener и Solana RPC на одном локальном сервере.
+
+    Ответы собираются из образцов bench/data, состояние (свапы кошельков, балансы) задаёт сценарий"""
+
+    def __init__(self, rng: random.Random, latency=0.0):
+        self.rng = rng
+        self.latency = latency
+        self.transactions = {}
+        self.holdings = {}
+        self.served = {}
+        self.requests = Counter()
+        self.base_url = None
+        self._runner = None
+        self._slot = itertools.count(300_000_000)
+
+    @property
+    def helius_url(self):
+        return self.base_url + '/helius'
+
+    @property
+    def dexscreener_url(self):
+        return self.base_url + '/dex/'
+
+    @property
+    def rpc_url(self):
+        return self.base_url + '/rpc'
+
+    def add_swap(self, wallet, mint, timestamp=None):
+        """Новый свап кошелька - попадёт в ответ Helius на следующем опросе. Возвращает signature"""
+        signature = fixtures.address(self.rng, 88)
+        tx = fixtures.helius_swap(wallet, mint, signature, next(self._slot), timestamp or time.time())
+        self.transactions.setdefault(wallet, []).insert(0, tx)
+        return signature
+
+    def set_holdings(self, wallet, mints):
+        self.holdings[wallet] = [
+            fixtures.rpc_token_account(wallet, mint, fixtures.address(self.rng), round(self.rng.uniform(1000, 500000), 2))
+            for mint in mints
+        ]
+
+    async def _delay(self):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def helius_transactions(self, request):
+        self.requests['helius'] += 1
+        await self._delay()
+        transactions = self.transactions.get(request.match_info['wallet'], [])
+        signatures = [tx['signature'] for tx in transactions]
+        start, end = 0, len(transactions)
+        if request.query.get('until') in signatures:
+            end = signatures.index(request.query['until'])
+        if request.query.get('before') in signatures:
+            start = signatures.index(request.query['before']) + 1
+        page = transactions[start:end][:int(request.query.get('limit', 100))]
+
+        now = time.monotonic()
+        for tx in page:
+            self.served.setdefault(tx['signature'], now)
+        return web.json_response(page)
+
+    async def dexscreener_tokens(self, request):
+        self.requests['dexscreener'] += 1
+        await self._delay()
+        pairs = [
+            fixtures.dex_pair(mint, mint[:4].upper(), fixtures.address(self.rng))
+            for mint in request.match_info['addresses'].split(',')
+        ]
+        return web.json_response({'schemaVersion': '1.0.0', 'pairs': pairs})
+
+    async def solana_rpc(self, request):
+        self.requests['solana_rpc'] += 1
+        await self._delay()
+        payload = await request.json()
+        wallet = payload['params'][0]
+        return web.json_response({
+            'jsonrpc': '2.0',
+            'id': payload.get('id'),
+            'result': {'context': {'slot': next(self._slot)}, 'value': self.holdings.get(wallet, [])}
+        })
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/helius/addresses/{wallet}/transactions', self.helius_transactions)
+        app.router.add_get('/dex/{addresses}', self.dexscreener_tokens)
+        app.router.add_post('/rpc', self.solana_rpc)
+        self._runner, self.base_url = await start_app(app)
+        return self
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
@@ -0,0 +1,775 @@
+import asyncio
+import copy
+import datetime
+import time
+from contextlib import asynccontextmanager
+from typing import Optional, List
+
+import asyncpg
+
+from app import metrics
+
+
+# execute_* вызываются из остальных методов - иначе каждый запрос попадал бы в метрику дважды
+@metrics.timed_methods(metrics.DB_QUERY_LATENCY, exclude=(
+    'connect', 'listen', 'close_all_connections',
+    'execute_read_many_query', 'execute_read_one_query', 'execute_write_query', 'execute_many_query',
+))
+class AsyncDatabase:
+    """Асинхронный аналог Database (db/database.py) поверх пула asyncpg.
+
+    Пул создаётся в connect(), т.к. asyncpg привязан к event loop. Соединение, простоявшее в пуле
+    дольше healthcheck_idle секунд, перед выдачей проверяется SELECT 1 и при ошибке заменяется новым.
+    Свободного соединения ждём не дольше acquire_timeout, запрос - не дольше command_timeout.
+    SELECT, оборвавшийся из-за соединения, повторяется один раз на другом соединении.
+    statement_cache_size=0 нужен за pgbouncer в режиме transaction"""
+
+    # Ошибки, после которых соединение больше не годится
+    CONNECTION_ERRORS = (
+        OSError,
+        asyncpg.exceptions.ConnectionDoesNotExistError,
+        asyncpg.exceptions.PostgresConnectionError,
+        asyncpg.exceptions.AdminShutdownError,
+        asyncpg.exceptions.CannotConnectNowError,
+    )
+
+    def __init__(self, minconn, maxconn, dbname, user, password, host='rc1d-xiuvu9wy0xvcpdxn.mdb.yandexcloud.net', port='6432',
+                 acquire_timeout=10, command_timeout=30, statement_cache_size=100, max_inactive_lifetime=300,
+                 healthcheck_idle=30, connect_retries=5):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.dbname = dbname
+        self.user = user
+        self.password = password
+        self.host = host
+        self.port = port
+        self.acquire_timeout = acquire_timeout
+        self.command_timeout = command_timeout
+        self.statement_cache_size = statement_cache_size
+        self.max_inactive_lifetime = max_inactive_lifetime
+        self.healthcheck_idle = healthcheck_idle
+        self.connect_retries = connect_retries
+        self.connection_pool: Optional[asyncpg.Pool] = None
+        self._last_used = {}
+        # Соединение единицы работы (см. transaction()); None - каждый запрос берёт своё из пула
+        self._connection = None
+
+    def _connect_kwargs(self):
+        return dict(
+            database=self.dbname,
+            user=self.user,
+            password=self.password,
+            host=self.host,
+            port=int(self.port)
+        )
+
+    async def connect(self):
+        """Создание пула; пока база недоступна - до connect_retries попыток с растущей паузой"""
+        for attempt in range(self.connect_retries):
+            if self.connection_pool is not None:
+                break
+            try:
+                self.connection_pool = await asyncpg.create_pool(
+                    min_size=self.minconn,
+                    max_size=self.maxconn,
+                    command_timeout=self.command_timeout,
+                    statement_cache_size=self.statement_cache_size,
+                    max_inactive_connection_lifetime=self.max_inactive_lifetime,
+                    **self._connect_kwargs()
+                )
+            except (asyncio.TimeoutError, *self.CONNECTION_ERRORS) as e:
+                if attempt == self.connect_retries - 1:
+                    raise
+                delay = min(2 ** attempt, 30)
+                print(f"Нет соединения с базой: {e}. Повтор через {delay} с")
+                await asyncio.sleep(delay)
+        return self
+
+    async def listen(self, channel, callback, on_close=None):
+        """LISTEN channel на отдельном соединении (не из пула), callback(payload) на каждое уведомление,
+        on_close() - при обрыве соединения (после него подписку нужно создать заново, см. is_closed()).
+        Возвращает соединение - его нужно закрыть, когда подписка больше не нужна"""
+        conn = await asyncpg.connect(**self._connect_kwargs())
+        if on_close is not None:
+            conn.add_termination_listener(lambda connection: on_close())
+        await conn.add_listener(channel, lambda connection, pid, channel_name, payload: callback(payload))
+        return conn
+
+    @asynccontextmanager
+    async def transaction(self):
+        """Единица работы: несколько вызовов на одном соединении в одной транзакции.
+
+            async with db.transaction() as tx:
+                if await tx.claim_notified_token(token):
+                    await tx.add_transactions(rows)
+
+        tx - копия AsyncDatabase, привязанная к соединению, с теми же методами. Внутри блока ошибки
+        запросов не печатаются, а пробрасываются и откатывают всю транзакцию; вложенный transaction()
+        становится точкой сохранения"""
+        async with self._acquire() as conn:
+            async with conn.transaction():
+                tx = copy.copy(self)
+                tx._connection = conn
+                yield tx
+
+    @asynccontextmanager
+    async def _acquire(self):
+        """Проверенное соединение из пула с замером времени ожидания.
+        Если за acquire_timeout свободного соединения нет - asyncio.TimeoutError"""
+        if self._connection is not None:
+            yield self._connection
+            return
+        started = time.perf_counter()
+        deadline = time.monotonic() + self.acquire_timeout
+        while True:
+            try:
+                conn = await self.connection_pool.acquire(timeout=max(deadline - time.monotonic(), 0))
+            except asyncio.TimeoutError:
+                metrics.DB_POOL_TIMEOUTS.inc()
+                raise
+            pid = conn.get_server_pid()
+            try:
+                healthy = await self._check_connection(conn, pid)
+            except BaseException:
+                await self.connection_pool.release(conn)
+                raise
+            if healthy:
+                break
+            await self.connection_pool.release(conn)
+        metrics.DB_POOL_WAIT.observe(time.perf_counter() - started)
+        try:
+            yield conn
+        finally:
+            self._last_used[pid] = time.monotonic()
+            await self.connection_pool.release(conn)
+
+    @staticmethod
+    def _is_closed(conn):
+        try:
+            return conn.is_closed()
+        except asyncpg.exceptions.InterfaceError:
+            # Закрывшееся соединение пул сам отвязывает от выданного прокси
+            return True
+
+    @staticmethod
+    def _discard(conn):
+        """Закрыть соединение - пул откроет вместо него новое. Нужно и уже закрытому: после обрыва
+        посреди запроса asyncpg может не освободить его место в пуле сам"""
+        try:
+            conn.terminate()
+        except asyncpg.exceptions.InterfaceError:
+            pass
+
+    async def _check_connection(self, conn, pid):
+        """Пинг соединения, давно не бывшего в работе; нерабочее закрывается"""
+        last_used = self._last_used.get(pid)
+        if last_used is not None and time.monotonic() - last_used < self.healthcheck_idle:
+            return True
+        try:
+            await conn.fetchval("SELECT 1", timeout=min(self.acquire_timeout, 5))
+            return True
+        except Exception as e:
+            print(f"Соединение с базой не отвечает: {e}")
+            metrics.DB_BROKEN_CONNECTIONS.inc()
+            self._last_used.pop(pid, None)
+            self._discard(conn)
+            return False
+
+    async def _execute(self, method, query, params):
+        """conn.<method>(query, *params). Если оборвалось соединение, повторяется только чистое чтение:
+        INSERT ... RETURNING и UPDATE ... RETURNING тоже идут через fetch, но могли успеть выполниться"""
+        retry = self._connection is None and query.lstrip().upper().startswith('SELECT')
+        for attempt in range(2 if retry else 1):
+            async with self._acquire() as conn:
+                try:
+                    return await getattr(conn, method)(query, *params)
+                except Exception as e:
+                    # Обрыв посреди запроса asyncpg иногда сообщает не ошибкой соединения, но оно уже закрыто
+                    if self._connection is not None or not (self._is_closed(conn) or isinstance(e, self.CONNECTION_ERRORS)):
+                        raise
+                    metrics.DB_BROKEN_CONNECTIONS.inc()
+                    self._discard(conn)
+                    if not retry or attempt:
+                        raise
+                    print(f"Соединение с базой оборвалось: {e}. Повтор запроса")
+
+    async def close_all_connections(self):
+        if self.connection_pool is not None:
+            await self.connection_pool.close()
+            self.connection_pool = None
+            self._last_used.clear()
+
+    async def execute_read_many_query(self, query, *params):
+        result = None
+        try:
+            result = await self._execute('fetch', query, params)
+        except Exception as e:
+            if self._connection is not None:
+                raise
+            print(f"An error occurred: {e}")
+        return result
+
+    async def execute_read_one_query(self, query, *params):
+        result = None
+        try:
+            result = await self._execute('fetchrow', query, params)
+        except Exception as e:
+            if self._connection is not None:
+                raise
+            print(f"An error occurred: {e}")
+        return result
+
+    async def execute_write_query(self, query, *params):
+        """Возвращает True, если запрос выполнен без ошибок. После обрыва соединения не повторяется:
+        неизвестно, успел ли он выполниться"""
+        try:
+            await self._execute('execute', query, params)
+            return True
+        except Exception as e:
+            if self._connection is not None:
+                raise
+            print(f"An error occurred: {e}")
+            return False
+
+    async def execute_many_query(self, query, rows):
+        """Один запрос на каждую строку rows (executemany - одним обменом с сервером и одной транзакцией).
+        Возвращает True, если выполнено без ошибок"""
+        if not rows:
+            return True
+        try:
+            await self._execute('executemany', query, (rows,))
+            return True
+        except Exception as e:
+            if self._connection is not None:
+                raise
+            print(f"An error occurred: {e}")
+            return False
+
+    """Функции SQL для таблицы sol_wallet"""
+
+    async def add_row(self, wallet, user, link, wallet_type):
+        """Добавление нового кошелька одним запросом. False - кошелёк уже есть или запись не удалась"""
+        insert_query = """
+            INSERT INTO sol_wallet(wallet, "user", link, wallet_type)
+            VALUES ($1, $2, $3, $4)
+            ON CONFLICT (wallet) DO NOTHING
+            RETURNING wallet
+        """
+        return await self.execute_read_one_query(insert_query, wallet, user, link, wallet_type) is not None
+
+    async def get_sol_wallets(self):
+        """Весь справочник кошельков инфлов: wallet, user, link, wallet_type"""
+        query = """SELECT wallet, "user", link, wallet_type FROM sol_wallet ORDER BY id;"""
+        return await self.execute_read_many_query(query)
+
+    async def get_user_wallets(self, user):
+        """Получаем список кошельков пользователя"""
+        query = """SELECT wallet FROM sol_wallet WHERE "user" = $1;"""
+        result = await self.execute_read_many_query(query, user)
+        return result
+
+    async def get_wallets(self):
+        """Получение списка всех кошельков"""
+        query = "SELECT wallet FROM sol_wallet;"
+        result = await self.execute_read_many_query(query)
+        wallets = [row[0] for row in result]
+        return wallets
+
+    async def check_row(self, wallet):
+        """Проверка существования кошелька и возвращение данных"""
+        exists_query = """SELECT "user", link FROM sol_wallet WHERE wallet = $1;"""
+        exists_result = await self.execute_read_one_query(exists_query, wallet)
+        return exists_result
+
+    async def count_wallets(self, user):
+        """Проверка, сколько кошельков у инфла"""
+        count_query = """SELECT COUNT(*) FROM sol_wallet WHERE "user" = $1;"""
+        count_result = await self.execute_read_one_query(count_query, user)
+        return count_result[0]
+
+    async def check_infl(self, user):
+        """Проверка на наличие инфла в базе"""
+        infl_query = """SELECT wallet FROM sol_wallet WHERE "user" = $1"""
+        infl_result: List[asyncpg.Record] = await self.execute_read_many_query(infl_query, user)
+        if len(infl_result) == 0:
+            return False
+        return infl_result
+
+    async def get_influencers(self):
+        """Получение списка всех уникальных инфлюенсеров (пользователей)"""
+        infl_query = """SELECT DISTINCT "user" FROM sol_wallet"""
+        infl_result: List[asyncpg.Record] = await self.execute_read_many_query(infl_query)
+        return [row[0] for row in infl_result]
+
+    async def get_influencer(self, wallet):
+        """Получение информации о пользователе по кошельку"""
+        infl_query = """SELECT "user", link FROM sol_wallet WHERE wallet = $1"""
+        return await self.execute_read_one_query(infl_query, wallet)
+
+    """Функции SQL для таблицы token_data"""
+
+    async def update_token_info(self, wallet, token_address, token_name, token_balance, total_in_sol):
+        """Обновление информации о токене, включая название"""
+        update_query = """
+            UPDATE token_data
+            SET token_name = $1, token_amount = $2, total_in_sol = $3
+            WHERE wallet = $4 AND token_address = $5
+        """
+        await self.execute_write_query(update_query, token_name, token_balance, total_in_sol, wallet, token_address)
+
+    async def save_new_token(self, wallet, token_address, token_name, token_balance, total_in_sol):
+        """Добавление нового токена в базу с названием"""
+        save_token_query = """
+            INSERT INTO token_data (wallet, token_address, token_name, token_amount, total_in_sol)
+            VALUES ($1, $2, $3, $4, $5)
+        """
+        await self.execute_write_query(save_token_query, wallet, token_address, token_name, token_balance, total_in_sol)
+
+    async def remove_token(self, wallet, token_address):
+        """Удаление токена из базы"""
+        remove_token_query = "DELETE FROM token_data WHERE wallet = $1 AND token_address = $2"
+        await self.execute_write_query(remove_token_query, wallet, token_address)
+
+    async def sync_wallet_tokens(self, wallet, tokens):
+        """Применение снимка холдингов кошелька одним запросом (и одной транзакцией):
+        upsert всех токенов из tokens и удаление тех, которых в снимке нет.
+
+        tokens - список (token_address, token_name, token_amount, total_in_sol); у кошелька может быть
+        несколько токен-аккаунтов одного минта, такие строки складываются в одну.
+        Возвращает адреса удалённых токенов"""
+        token_addresses = [token[0] for token in tokens]
+        sync_query = """
+            WITH upserted AS (
+                INSERT INTO token_data (wallet, token_address, token_name, token_amount, total_in_sol)
+                SELECT $1, t.token_address, max(t.token_name), sum(t.token_amount), sum(t.total_in_sol)
+                FROM unnest($2::text[], $3::text[], $4::float8[], $5::float8[])
+                    AS t(token_address, token_name, token_amount, total_in_sol)
+                GROUP BY t.token_address
+                ON CONFLICT (wallet, token_address) DO UPDATE
+                SET token_name = EXCLUDED.token_name,
+                    token_amount = EXCLUDED.token_amount,
+                    total_in_sol = EXCLUDED.total_in_sol
+            )
+            DELETE FROM token_data
+            WHERE wallet = $1 AND NOT (token_address = ANY($2::text[]))
+            RETURNING token_address
+        """
+        removed = await self.execute_read_many_query(
+            sync_query,
+            wallet,
+            token_addresses,
+            [token[1] for token in tokens],
+            [token[2] for token in tokens],
+            [token[3] for token in tokens]
+        )
+        return [row[0] for row in removed or []]
+
+    async def get_tokens_for_wallet(self, wallet):
+        """Получение всех токенов для кошелька"""
+        get_tokens_query = "SELECT token_address FROM token_data WHERE wallet = $1"
+        get_tokens_result = await self.execute_read_many_query(get_tokens_query, wallet)
+        return {row[0] for row in get_tokens_result}
+
+    async def get_wallets_by_token(self, token_address):
+        """Получение всех кошельков, которые владеют указанным токеном"""
+        get_wallets_query = """
+            SELECT sol_wallet.wallet, token_data.total_in_sol
+            FROM token_data
+            JOIN sol_wallet ON sol_wallet.wallet = token_data.wallet
+            WHERE token_data.token_address = $1
+        """
+        return await self.execute_read_many_query(get_wallets_query, token_address)
+
+    async def get_token_name_by_address(self, token_address):
+        """Получение имени токена по его адресу"""
+        get_token_query = "SELECT token_name FROM token_data WHERE token_address = $1"
+        get_token_result = await self.execute_read_one_query(get_token_query, token_address)
+        return get_token_result[0] if get_token_result else None
+
+    """Функции SQL для таблицы users"""
+
+    async def get_payment_status(self, user_id):
+        """Метод для получения статуса оплаты пользователя по user_id"""
+        status_query = 'SELECT payment_status FROM users WHERE user_id = $1'
+        result_status = await self.execute_read_one_query(status_query, user_id)
+        return result_status[0] if result_status else None
+
+    async def update_payment_status(self, user_id, status):
+        """Обновление статуса оплаты с записью даты"""
+        payment_date = datetime.datetime.now()
+        update_query = '''
+                INSERT INTO users (user_id, payment_status, payment_date)
+                VALUES ($1, $2, $3)
+                ON CONFLICT(user_id)
+                DO UPDATE SET
+                    payment_status = EXCLUDED.payment_status,
+                    payment_date = EXCLUDED.payment_date;
+            '''
+        await self.execute_write_query(update_query, user_id, status, payment_date)
+
+    async def update_payment_statuses(self, statuses):
+        """Пакетный вариант update_payment_status: statuses - список (user_id, status, payment_date)"""
+        update_query = """
+            INSERT INTO users (user_id, payment_status, payment_date)
+            SELECT * FROM unnest($1::bigint[], $2::varchar[], $3::timestamp[])
+            ON CONFLICT(user_id)
+            DO UPDATE SET
+                payment_status = EXCLUDED.payment_status,
+                payment_date = EXCLUDED.payment_date
+        """
+        return await self.execute_write_query(
+            update_query,
+            [row[0] for row in statuses],
+            [row[1] for row in statuses],
+            [row[2] for row in statuses]
+        )
+
+    async def get_user_settings(self, user_id):
+        """Статус оплаты и оба флага уведомлений пользователя одним запросом"""
+        settings_query = """
+            SELECT payment_status, payment_date, notify_infl, notify_smart
+            FROM users
+            WHERE user_id = $1
+        """
+        return await self.execute_read_one_query(settings_query, user_id)
+
+    async def is_payment_valid(self, user_id):
+        """Проверяет, действительна ли оплата (30 дней с момента оплаты)"""
+        status_payment_query = 'SELECT payment_date FROM users WHERE user_id = $1'
+        result_status_payment = await self.execute_read_one_query(status_payment_query, user_id)
+
+        if result_status_payment and result_status_payment[0]:
+            time_diff = datetime.datetime.now() - result_status_payment[0]
+            return time_diff.total_seconds() <= 2592000
+        return False
+
+    async def remove_expired_users(self):
+        """Удаляет пользователей, чья оплата истекла более 120 дней назад"""
+        expiration_date = datetime.datetime.now() - datetime.timedelta(days=120)
+        remove_user = 'DELETE FROM users WHERE payment_date < $1'
+        await self.execute_write_query(remove_user, expiration_date)
+
+    async def get_notify_infl(self, user_id):
+        notify_status_query = "SELECT notify_infl FROM users WHERE user_id = $1"
+        result_notify_status = await self.execute_read_one_query(notify_status_query, user_id)
+        return result_notify_status[0] if result_notify_status else False
+
+    async def get_notify_smart(self, user_id):
+        notify_status_query = "SELECT notify_smart FROM users WHERE user_id = $1"
+        result_notify_status = await self.execute_read_one_query(notify_status_query, user_id)
+        return result_notify_status[0] if result_notify_status else False
+
+    async def get_notify_flags(self, user_id):
+        """Оба флага уведомлений одним запросом: (notify_infl, notify_smart)"""
+        notify_flags_query = "SELECT notify_infl, notify_smart FROM users WHERE user_id = $1"
+        result_notify_flags = await self.execute_read_one_query(notify_flags_query, user_id)
+        return tuple(result_notify_flags) if result_notify_flags else (False, False)
+
+    async def toggle_notify_infl(self, user_id):
+        """Атомарное переключение notify_infl, возвращает новые (notify_infl, notify_smart).
+        Если строки пользователя ещё нет, она создаётся с переключённым значением по умолчанию"""
+        toggle_query = """
+            INSERT INTO users (user_id, notify_infl)
+            VALUES ($1, FALSE)
+            ON CONFLICT (user_id) DO UPDATE SET notify_infl = NOT users.notify_infl
+            RETURNING notify_infl, notify_smart
+        """
+        return await self.execute_read_one_query(toggle_query, user_id)
+
+    async def toggle_notify_smart(self, user_id):
+        """Атомарное переключение notify_smart, возвращает новые (notify_infl, notify_smart)"""
+        toggle_query = """
+            INSERT INTO users (user_id, notify_smart)
+            VALUES ($1, FALSE)
+            ON CONFLICT (user_id) DO UPDATE SET notify_smart = NOT users.notify_smart
+            RETURNING notify_infl, notify_smart
+        """
+        return await self.execute_read_one_query(toggle_query, user_id)
+
+    async def update_notify_infl_status(self, user_id, new_status):
+        update_query = "UPDATE users SET notify_infl = $1 WHERE user_id = $2"
+        await self.execute_write_query(update_query, new_status, user_id)
+
+    async def update_notify_smart_status(self, user_id, new_status):
+        update_query = "UPDATE users SET notify_smart = $1 WHERE user_id = $2"
+        await self.execute_write_query(update_query, new_status, user_id)
+
+    async def get_users_with_notifications(self):
+        not_notify_status_query = "SELECT user_id FROM users WHERE notify_smart = TRUE OR notify_infl = TRUE"
+        result_notify_status: List[asyncpg.Record] = await self.execute_read_many_query(not_notify_status_query)
+        return [row[0] for row in result_notify_status]
+
+    async def get_users_notify_flags(self):
+        """Все подписчики вместе с флагами notify_infl и notify_smart одним запросом"""
+        flags_query = """
+            SELECT user_id, notify_infl, notify_smart
+            FROM users
+            WHERE notify_smart = TRUE OR notify_infl = TRUE
+        """
+        result = await self.execute_read_many_query(flags_query)
+        return result or []
+
+    """Транзакции"""
+
+    async def add_transaction(self, wallet, token, amount_token, timestamp, operation_type):
+        add_trans_query = """
+            INSERT INTO infl_buys (wallet, token, amount_token, timestamp, operation_type)
+            VALUES ($1, $2, $3, to_timestamp($4), $5)
+            ON CONFLICT (wallet, token, timestamp) DO NOTHING
+        """
+        await self.execute_write_query(add_trans_query, wallet, token, float(amount_token), float(timestamp), operation_type)
+
+    async def add_transactions(self, transactions):
+        """Пакетный вариант add_transaction: transactions - список (wallet, token, amount_token, timestamp, operation_type).
+        Строки идут в порядке токена: триггер на infl_buys блокирует строки token_activity, и параллельные
+        пакеты, берущие их в разном порядке, взаимно блокировались бы"""
+        add_trans_query = """
+            INSERT INTO infl_buys (wallet, token, amount_token, timestamp, operation_type)
+            VALUES ($1, $2, $3, to_timestamp($4), $5)
+            ON CONFLICT (wallet, token, timestamp) DO NOTHING
+        """
+        return await self.execute_many_query(add_trans_query, [
+            (wallet, token, float(amount_token), float(timestamp), operation_type)
+            for wallet, token, amount_token, timestamp, operation_type
+            in sorted(transactions, key=lambda row: (row[1], row[0]))
+        ])
+
+    async def get_wallet_cursor(self, wallet):
+        """Последняя обработанная транзакция кошелька: (last_signature, last_slot) или None"""
+        cursor_query = "SELECT last_signature, last_slot FROM wallet_cursors WHERE wallet = $1"
+        return await self.execute_read_one_query(cursor_query, wallet)
+
+    async def update_wallet_cursor(self, wallet, signature, slot):
+        """Сдвиг курсора кошелька на самую новую обработанную транзакцию"""
+        cursor_query = """
+            INSERT INTO wallet_cursors (wallet, last_signature, last_slot, updated_at)
+            VALUES ($1, $2, $3, NOW())
+            ON CONFLICT (wallet) DO UPDATE
+            SET last_signature = EXCLUDED.last_signature,
+                last_slot = EXCLUDED.last_slot,
+                updated_at = EXCLUDED.updated_at
+        """
+        await self.execute_write_query(cursor_query, wallet, signature, slot)
+
+    async def delete_old_transaction(self, window: datetime.timedelta):
+        """Удаление покупок, вышедших за скользящее окно, и вычитание их покупателей из token_activity"""
+        delete_query = """
+            DELETE FROM infl_buys
+            WHERE timestamp < NOW() - $1::interval
+        """
+        prune_buyers_query = """
+            WITH pruned AS (
+                DELETE FROM token_buyers
+                WHERE last_buy < NOW() - $1::interval
+                RETURNING token, wallet_type
+            ), shrunk AS (
+                SELECT
+                    token,
+                    COUNT(*) AS buyers,
+                    COUNT(*) FILTER (WHERE wallet_type = 'INFLUENCER') AS influencer_buyers,
+                    COUNT(*) FILTER (WHERE wallet_type = 'SMART') AS smart_buyers,
+                    COUNT(*) FILTER (WHERE wallet_type = 'WHALE') AS whale_buyers,
+                    COUNT(*) FILTER (WHERE wallet_type = 'INSIDER') AS insider_buyers
+                FROM pruned
+                GROUP BY token
+            )
+            UPDATE token_activity a
+            SET buyers = a.buyers - s.buyers,
+                influencer_buyers = a.influencer_buyers - s.influencer_buyers,
+                smart_buyers = a.smart_buyers - s.smart_buyers,
+                whale_buyers = a.whale_buyers - s.whale_buyers,
+                insider_buyers = a.insider_buyers - s.insider_buyers
+            FROM shrunk s
+            WHERE a.token = s.token
+        """
+        delete_empty_query = "DELETE FROM token_activity WHERE buyers <= 0"
+        await self.execute_write_query(delete_query, window)
+        await self.execute_write_query(prune_buyers_query, window)
+        await self.execute_write_query(delete_empty_query)
+
+    async def get_tokens_with_time_for_wallet(self, wallet):
+        """Получение всех токенов с их временем для кошелька"""
+        get_tokens_query = "SELECT token, timestamp FROM infl_buys WHERE wallet = $1"
+        result_tokens: List[asyncpg.Record] = await self.execute_read_many_query(get_tokens_query, wallet)
+        return {(row[0], row[1]) for row in result_tokens}
+
+    async def get_tokens_with_more_than_5_unique_wallets(self):
+        """Запрос, который возвращает токены, купленные более чем 5 уникальными кошельками"""
+        get_unique_tokens_query = """
+            SELECT token
+            FROM infl_buys
+            GROUP BY token
+            HAVING COUNT(DISTINCT wallet) > 2
+        """
+        result_unique_tokens: List[asyncpg.Record] = await self.execute_read_many_query(get_unique_tokens_query)
+        return [row[0] for row in result_unique_tokens]
+
+    async def get_unique_wallets_for_token(self, token):
+        """Запрос, который возвращает уникальные кошельки, купившие данный токен"""
+        get_unique_wallets_query = """
+            SELECT DISTINCT wallet
+            FROM infl_buys
+            WHERE token = $1
+        """
+        result_wallets: List[asyncpg.Record] = await self.execute_read_many_query(get_unique_wallets_query, token)
+        return [row[0] for row in result_wallets]
+
+    """Покупатели горячих токенов берутся из token_buyers (триггер на infl_buys, миграция 0008):
+    одна строка на пару токен/кошелёк, без COUNT(DISTINCT) по всей infl_buys"""
+
+    HOT_TOKENS_SELECT = """
+            hot AS (
+                SELECT tb.token
+                FROM token_buyers tb
+                JOIN candidates c ON c.token = tb.token
+                WHERE tb.last_buy >= NOW() - $1::interval
+                GROUP BY tb.token
+                HAVING COUNT(*) > 2
+            )
+            SELECT b.token, b.wallet, s."user", s.link, s.wallet_type, d.pnl, d.wr, d.pnl_positive, d.wr_high
+            FROM hot
+            JOIN token_buyers b ON b.token = hot.token AND b.last_buy >= NOW() - $1::interval
+            JOIN sol_wallet s ON s.wallet = b.wallet
+            JOIN data_wallet d ON d.wallet = b.wallet AND d.pnl IS NOT NULL AND d.wr IS NOT NULL
+            WHERE NOT EXISTS (SELECT 1 FROM notified_tokens n WHERE n.token = hot.token)
+            ORDER BY b.token, b.wallet
+        """
+
+    async def get_hot_tokens_with_wallets(self, window: datetime.timedelta):
+        """Одним запросом: ещё не упомянутые токены, купленные за окно window более чем 2 уникальными
+        кошельками, вместе с кошельками покупателей, инфлом, ссылкой, типом кошелька и pnl/wr"""
+        get_hot_tokens_query = """
+            WITH candidates AS (
+                SELECT token FROM token_activity WHERE buyers > 2
+            ),
+        """ + self.HOT_TOKENS_SELECT
+        result = await self.execute_read_many_query(get_hot_tokens_query, window)
+        return result or []
+
+    async def get_changed_hot_tokens_with_wallets(self, window: datetime.timedelta):
+        """То же, что get_hot_tokens_with_wallets, но только среди токенов, у которых были покупки
+        с прошлого вызова: флаг dirty снимается в том же запросе"""
+        get_changed_tokens_query = """
+            WITH candidates AS (
+                UPDATE token_activity
+                SET dirty = FALSE
+                WHERE dirty
+                RETURNING token
+            ),
+        """ + self.HOT_TOKENS_SELECT
+        result = await self.execute_read_many_query(get_changed_tokens_query, window)
+        return result or []
+
+    async def mark_tokens_dirty(self, tokens):
+        """Вернуть токенам флаг dirty, если их обработка после get_changed_hot_tokens_with_wallets не удалась"""
+        mark_query = "UPDATE token_activity SET dirty = TRUE WHERE token = ANY($1::text[])"
+        return await self.execute_write_query(mark_query, list(tokens))
+
+    async def is_token_notified(self, token):
+        """Проверка, был ли токен уже упомянут"""
+        notified_query = "SELECT token FROM notified_tokens WHERE token = $1"
+        return bool(await self.execute_read_one_query(notified_query, token))
+
+    async def add_notified_token(self, token):
+        """Добавление токена в таблицу упомянутых"""
+        add_notified_token_query = """
+            INSERT INTO notified_tokens (token)
+            VALUES ($1)
+        """
+        await self.execute_write_query(add_notified_token_query, token)
+
+    async def claim_notified_token(self, token):
+        """Атомарно помечает токен упомянутым. True - пометил этот вызов и оповещение рассылает он;
+        False - токен уже был упомянут (в том числе другой репликой) или запись не удалась"""
+        claim_query = """
+            INSERT INTO notified_tokens (token)
+            VALUES ($1)
+            ON CONFLICT (token) DO NOTHING
+            RETURNING token
+        """
+        return await self.execute_read_one_query(claim_query, token) is not None
+
+    async def add_or_update_row(self, wallet, pnl, wr):
+        """Добавление или обновление записи для кошелька. pnl и wr - числа или строки вида '12.5%'"""
+        upsert_query = """
+            INSERT INTO data_wallet (wallet, pnl, wr, updated_at)
+            VALUES ($1, parse_percent($2), parse_percent($3), NOW())
+            ON CONFLICT (wallet) DO UPDATE
+            SET pnl = EXCLUDED.pnl,
+                wr = EXCLUDED.wr,
+                updated_at = EXCLUDED.updated_at
+        """
+        await self.execute_write_query(upsert_query, wallet, str(pnl), str(wr))
+
+    async def import_wallets_stats(self, records, lock_timeout='5s'):
+        """Загрузка выгрузки pnl/wr: records (итерируемое (wallet, pnl, wr) строками) потоком идут COPY
+        во временную таблицу, затем одним запросом сливаются в data_wallet.
+
+        Строки без кошелька или с нечитаемыми pnl/wr пропускаются (хорошая статистика не затирается NULL),
+        из повторов кошелька берётся последняя строка выгрузки, строки без изменений не переписываются.
+        Возвращает (загружено, добавлено, обновлено, без изменений, пропущено) или None при ошибке"""
+        merge_query = """
+            WITH parsed AS (
+                SELECT lineno, wallet, parse_percent(pnl) AS pnl, parse_percent(wr) AS wr
+                FROM data_wallet_import
+            ), valid AS (
+                SELECT * FROM parsed
+                WHERE wallet IS NOT NULL AND wallet <> '' AND pnl IS NOT NULL AND wr IS NOT NULL
+            ), src AS (
+                SELECT DISTINCT ON (wallet) wallet, pnl, wr
+                FROM valid
+                ORDER BY wallet, lineno DESC
+            ), merged AS (
+                INSERT INTO data_wallet (wallet, pnl, wr, updated_at)
+                SELECT wallet, pnl, wr, NOW() FROM src
+                ON CONFLICT (wallet) DO UPDATE
+                SET pnl = EXCLUDED.pnl,
+                    wr = EXCLUDED.wr,
+                    updated_at = EXCLUDED.updated_at
+                WHERE data_wallet.pnl IS DISTINCT FROM EXCLUDED.pnl
+                   OR data_wallet.wr IS DISTINCT FROM EXCLUDED.wr
+                RETURNING (xmax = 0) AS inserted
+            )
+            SELECT
+                (SELECT COUNT(*) FROM merged WHERE inserted),
+                (SELECT COUNT(*) FROM merged WHERE NOT inserted),
+                (SELECT COUNT(*) FROM src) - (SELECT COUNT(*) FROM merged),
+                (SELECT COUNT(*) FROM parsed) - (SELECT COUNT(*) FROM valid)
+        """
+        try:
+            async with self._acquire() as conn:
+                async with conn.transaction():
+                    # Не ждём блокировок data_wallet дольше lock_timeout - бот в это время читает таблицу
+                    await conn.execute("SELECT set_config('lock_timeout', $1, true)", str(lock_timeout))
+                    await conn.execute("""
+                        CREATE TEMP TABLE data_wallet_import (lineno BIGINT, wallet TEXT, pnl TEXT, wr TEXT) ON COMMIT DROP
+                    """)
+                    copy_status = await conn.copy_records_to_table(
+                        'data_wallet_import',
+                        records=((lineno, *record) for lineno, record in enumerate(records, 1)),
+                        columns=['lineno', 'wallet', 'pnl', 'wr']
+                    )
+                    inserted, updated, unchanged, skipped = await conn.fetchrow(merge_query)
+            return int(copy_status.split()[-1]), inserted, updated, unchanged, skipped
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            return None
+
+    async def get_data(self, wallet):
+        """pnl, wr и признаки pnl_positive/wr_high для кошелька или None, если статистики нет"""
+        query = """
+            SELECT pnl, wr, pnl_positive, wr_high
+            FROM data_wallet
+            WHERE wallet = $1 AND pnl IS NOT NULL AND wr IS NOT NULL
+        """
+        return await self.execute_read_one_query(query, wallet)
+
+    async def get_wallets_data(self, wallets):
+        """То же, что get_data, сразу для списка кошельков: {wallet: запись}"""
+        query = """
+            SELECT wallet, pnl, wr, pnl_positive, wr_high
+            FROM data_wallet
+            WHERE wallet = ANY($1::text[]) AND pnl IS NOT NULL AND wr IS NOT NULL
+        """
+        result = await self.execute_read_many_query(query, list(wallets))
+        return {row['wallet']: row for row in result or []}
@@ -1,85 +1,190 @@
+import copy
 import datetime
 import sqlite3
+import threading
+from contextlib import contextmanager
 from typing import Tuple, List
 
-from psycopg2 import pool
+import psycopg2
+from psycopg2 import extras, pool
+
+from app import metrics
 
 
 class Database:
-    def __init__(self, minconn, maxconn, dbname, user, password, host='rc1d-xiuvu9wy0xvcpdxn.mdb.yandexcloud.net', port='6432'):
-        self.connection_pool = pool.SimpleConnectionPool(
+    """Синхронный доступ к базе через ThreadedConnectionPool.
+
+    Свободного соединения ждём не дольше acquire_timeout (потом PoolError), закрытое соединение
+    при выдаче заменяется новым, а после ошибки соединения (OperationalError/InterfaceError)
+    оно не возвращается в пул, а закрывается. Keepalive TCP позволяет заметить оборванные соединения"""
+
+    def __init__(self, minconn, maxconn, dbname, user, password, host='rc1d-xiuvu9wy0xvcpdxn.mdb.yandexcloud.net', port='6432',
+                 acquire_timeout=10, connect_timeout=10):
+        self.connection_pool = pool.ThreadedConnectionPool(
             minconn,
             maxconn,
             dbname=dbname,
             user=user,
             password=password,
             host=host,
-            port=port
+            port=port,
+            connect_timeout=connect_timeout,
+            keepalives=1,
+            keepalives_idle=30,
+            keepalives_interval=10,
+            keepalives_count=3
         )
+        self.acquire_timeout = acquire_timeout
+        # getconn() у пула psycopg2 не ждёт, а сразу падает на исчерпанном пуле - очередь держит семафор
+        self._slots = threading.BoundedSemaphore(maxconn)
+        # Соединение единицы работы (см. transaction()); None - каждый запрос берёт своё из пула
+        self._tx_connection = None
 
     def get_connection(self):
-        return self.connection_pool.getconn()
-
-    def release_connection(self, conn):
-        self.connection_pool.putconn(conn)
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            metrics.DB_POOL_TIMEOUTS.inc()
+            raise pool.PoolError(f"no free connection in {self.acquire_timeout} s")
+        try:
+            conn = self.connection_pool.getconn()
+            if conn.closed:
+                metrics.DB_BROKEN_CONNECTIONS.inc()
+                self.connection_pool.putconn(conn, close=True)
+                conn = self.connection_pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+        return conn
+
+    def release_connection(self, conn, broken=False):
+        """Возврат соединения в пул (незавершённая транзакция откатывается пулом); broken - закрыть его"""
+        broken = broken or bool(conn.closed)
+        if broken:
+            metrics.DB_BROKEN_CONNECTIONS.inc()
+        try:
+            self.connection_pool.putconn(conn, close=broken)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def transaction(self):
+        """Единица работы: несколько вызовов на одном соединении в одной транзакции.
+
+            with db.transaction() as tx:
+                tx.add_row(...)
+                tx.add_or_update_row(...)
+
+        tx - копия Database, привязанная к соединению. Коммит - в конце блока; ошибка любого запроса
+        пробрасывается наружу и откатывает всю транзакцию. Вложенный transaction() - та же транзакция"""
+        if self._tx_connection is not None:
+            yield self
+            return
+        with self._connection() as conn:
+            tx = copy.copy(self)
+            tx._tx_connection = conn
+            try:
+                yield tx
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+
+    @contextmanager
+    def _connection(self):
+        if self._tx_connection is not None:
+            yield self._tx_connection
+            return
+        conn = self.get_connection()
+        broken = False
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        finally:
+            self.release_connection(conn, broken)
 
     def close_all_connections(self):
         self.connection_pool.closeall()
 
     def execute_read_many_query(self, query, params=None):
-        conn = self.get_connection()
         result = None
         try:
-            with conn.cursor() as cursor:
+            with self._connection() as conn, conn.cursor() as cursor:
                 cursor.execute(query, params)
                 if cursor.description:
                     result = cursor.fetchall()
         except Exception as e:
+            if self._tx_connection is not None:
+                raise
             print(f"An error occurred: {e}")
-        finally:
-            self.release_connection(conn)
         return result
 
     def execute_read_one_query(self, query, params=None):
-        conn = self.get_connection()
         result = None
         try:
-            with conn.cursor() as cursor:
+            with self._connection() as conn, conn.cursor() as cursor:
                 cursor.execute(query, params)
                 if cursor.description:
                     result = cursor.fetchone()
         except Exception as e:
+            if self._tx_connection is not None:
+                raise
             print(f"An error occurred: {e}")
-        finally:
-            self.release_connection(conn)
         return result
 
     def execute_write_query(self, query, params=None):
-        conn = self.get_connection()
         try:
-            with conn.cursor() as cursor:
+            with self._connection() as conn, conn.cursor() as cursor:
                 cursor.execute(query, params)
-                conn.commit()
+                if self._tx_connection is None:
+                    conn.commit()
         except Exception as e:
+            if self._tx_connection is not None:
+                raise
+            print(f"An error occurred: {e}")
+
+    def execute_write_returning_query(self, query, params=None):
+        """Запись с RETURNING: коммитит (вне transaction()) и возвращает первую строку результата или None"""
+        result = None
+        try:
+            with self._connection() as conn, conn.cursor() as cursor:
+                cursor.execute(query, params)
+                result = cursor.fetchone()
+                if self._tx_connection is None:
+                    conn.commit()
+        except Exception as e:
+            if self._tx_connection is not None:
+                raise
+            print(f"An error occurred: {e}")
+            result = None
+        return result
+
+    def execute_values_query(self, query, rows, template=None, page_size=1000):
+        """Пакетная запись через execute_values: query с единственным VALUES %s, rows - список кортежей.
+        Строки уходят по page_size в одном запросе, всё - одной транзакцией"""
+        if not rows:
+            return
+        try:
+            with self._connection() as conn, conn.cursor() as cursor:
+                extras.execute_values(cursor, query, rows, template=template, page_size=page_size)
+                if self._tx_connection is None:
+                    conn.commit()
+        except Exception as e:
+            if self._tx_connection is not None:
+                raise
             print(f"An error occurred: {e}")
-        finally:
-            self.release_connection(conn)
 
     """Функции SQL для таблицы sol_wallet"""
 
     def add_row(self, wallet, user, link, wallet_type):
-        """Добавление нового кошелька"""
-        exists_query = "SELECT EXISTS(SELECT 1 FROM sol_wallet WHERE wallet = %s);"
-        exists_result: Tuple[bool] = self.execute_read_one_query(exists_query, params=(wallet,))
-        if exists_result[0] is True:
-            return False
-
+        """Добавление нового кошелька одним запросом. False - кошелёк уже есть или запись не удалась"""
         insert_query = """
             INSERT INTO sol_wallet(wallet, "user", link, wallet_type)
-            VALUES (%s, %s, %s, %s);
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (wallet) DO NOTHING
+            RETURNING wallet
         """
-        self.execute_write_query(insert_query, (wallet, user, link, wallet_type))
-        return True
+        return self.execute_write_returning_query(insert_query, (wallet, user, link, wallet_type)) is not None
 
     def get_user_wallets(self, user):
         """Получаем список кошельков пользователя"""
@@ -264,6 +369,17 @@ class Database:
         """
         self.execute_write_query(add_trans_query, params=(wallet, token, amount_token, timestamp, operation_type))
 
+    def add_transactions(self, transactions):
+        """Пакетный вариант add_transaction: transactions - список (wallet, token, amount_token, timestamp, operation_type).
+        Строки идут в порядке токена, чтобы параллельные пакеты не блокировали друг друга в триггере на infl_buys"""
+        add_trans_query = """
+            INSERT INTO infl_buys (wallet, token, amount_token, timestamp, operation_type)
+            VALUES %s
+            ON CONFLICT (wallet, token, timestamp) DO NOTHING
+        """
+        self.execute_values_query(add_trans_query, sorted(transactions, key=lambda row: (row[1], row[0])),
+                                  template="(%s, %s, %s, to_timestamp(%s), %s)")
+
     # МЕТКАААААААА
     def delete_old_transaction(self):
         delete_query = """
@@ -312,27 +428,27 @@ class Database:
         """
         self.execute_write_query(add_notified_token_query, params=(token,))
 
+    def claim_notified_token(self, token):
+        """Атомарно помечает токен упомянутым: True - пометил этот вызов, False - уже был упомянут"""
+        claim_query = """
+            INSERT INTO notified_tokens (token)
+            VALUES (%s)
+            ON CONFLICT (token) DO NOTHING
+            RETURNING token
+        """
+        return self.execute_write_returning_query(claim_query, params=(token,)) is not None
+
     def add_or_update_row(self, wallet, pnl, wr):
-        """Добавление или обновление записи для кошелька."""
-        # Проверяем, существует ли кошелек
-        check_wallet_query = "SELECT wallet FROM data_wallet WHERE wallet = %s"
-        wallet_exists = self.execute_read_one_query(check_wallet_query, params=(wallet,))
-
-        if wallet_exists:
-            # Если кошелек уже существует, обновляем запись
-            update_query = """
-                UPDATE data_wallet
-                SET pnl = %s, wr = %s
-                WHERE wallet = %s
-            """
-            self.execute_write_query(update_query, params=(pnl, wr, wallet))
-        else:
-            # Если кошелька нет, добавляем новую запись
-            insert_query = """
-                INSERT INTO data_wallet (wallet, pnl, wr)
-                VALUES (%s, %s, %s)
-            """
-            self.execute_write_query(insert_query, params=(wallet, pnl, wr))
+        """Добавление или обновление записи для кошелька одним запросом"""
+        upsert_query = """
+            INSERT INTO data_wallet (wallet, pnl, wr, updated_at)
+            VALUES (%s, parse_percent(%s), parse_percent(%s), NOW())
+            ON CONFLICT (wallet) DO UPDATE
+            SET pnl = EXCLUDED.pnl,
+                wr = EXCLUDED.wr,
+                updated_at = EXCLUDED.updated_at
+        """
+        self.execute_write_query(upsert_query, params=(wallet, str(pnl), str(wr)))
 
     def get_data(self, wallet):
         """Получение pnl и wr для указанного кошелька."""
@@ -0,0 +1,73 @@
+"""Ежедневная загрузка pnl/wr кошельков в data_wallet.
+
+Запуск:
+    python -m db.import_stats stats.csv
+    python -m db.import_stats stats.db --format sqlite
+
+CSV - с заголовком, в котором есть колонки wallet, pnl, wr (значения вида 12.5 или '12.5%').
+Строки с нечитаемыми pnl/wr пропускаются, из повторов кошелька берётся последняя.
+SQLite - выгрузка в формате ImportDB (таблица data_wallet с колонками wallet, pnl, wr).
+Импорт идёт отдельным процессом со своим соединением и не занимает пул бота."""
+import argparse
+import asyncio
+import csv
+import sqlite3
+import time
+
+from app import config as cfg
+from app import settings
+from db.async_database import AsyncDatabase
+
+
+def _as_text(value):
+    return None if value is None else str(value).strip()
+
+
+def read_csv(path, delimiter=','):
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        for row in csv.DictReader(f, delimiter=delimiter):
+            yield _as_text(row.get('wallet')), _as_text(row.get('pnl')), _as_text(row.get('wr'))
+
+
+def read_sqlite(path):
+    connection = sqlite3.connect(path)
+    try:
+        for wallet, pnl, wr in connection.execute("SELECT wallet, pnl, wr FROM data_wallet"):
+            yield _as_text(wallet), _as_text(pnl), _as_text(wr)
+    finally:
+        connection.close()
+
+
+async def import_stats(db, records):
+    started = time.perf_counter()
+    result = await db.import_wallets_stats(records)
+    elapsed = time.perf_counter() - started
+    if result is None:
+        print(f"Импорт не выполнен ({elapsed:.2f} с)")
+        return False
+    loaded, inserted, updated, unchanged, skipped = result
+    print(f"Загружено строк: {loaded}, добавлено: {inserted}, обновлено: {updated}, "
+          f"без изменений: {unchanged}, пропущено: {skipped}, время: {elapsed:.2f} с")
+    return True
+
+
+async def main(args):
+    records = read_sqlite(args.path) if args.format == 'sqlite' else read_csv(args.path, args.delimiter)
+    # Загрузка большого файла идёт одним COPY - без ограничения времени на запрос
+    options = dict(settings.DB_POOL_OPTIONS, command_timeout=None)
+    db = AsyncDatabase(minconn=1, maxconn=1, dbname=cfg.dbname, user=cfg.user, password=cfg.password,
+                       host=settings.DB_HOST, port=settings.DB_PORT, **options)
+    await db.connect()
+    try:
+        return await import_stats(db, records)
+    finally:
+        await db.close_all_connections()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Импорт pnl/wr кошельков в data_wallet")
+    parser.add_argument('path', help="файл выгрузки")
+    parser.add_argument('--format', choices=['csv', 'sqlite'], default='csv')
+    parser.add_argument('--delimiter', default=',', help="разделитель CSV")
+    if not asyncio.run(main(parser.parse_args())):
+        raise SystemExit(1)
@@ -0,0 +1,105 @@
+import asyncio
+
+
+class InfluencerDirectory:
+    """Справочник sol_wallet в памяти процесса с индексами по кошельку и по имени инфла.
+
+    Таблица маленькая и меняется редко, поэтому поиск идёт без запросов в базу.
+    Снимок перезагружается целиком: по таймеру, по NOTIFY sol_wallet_changed
+    (триггер из миграции 0007) и после invalidate() (например, после add_row)"""
+
+    def __init__(self, db, refresh_interval=300, channel='sol_wallet_changed', retry_interval=60):
+        self.db = db
+        self.refresh_interval = refresh_interval
+        self.retry_interval = retry_interval
+        self.channel = channel
+        self._by_wallet = {}
+        self._by_user = {}
+        self._changed = asyncio.Event()
+        self._loaded = asyncio.Event()
+
+    async def load(self):
+        rows = await self.db.get_sol_wallets()
+        if rows is None:
+            # Ошибка запроса - оставляем прошлый снимок
+            return
+
+        by_wallet, by_user = {}, {}
+        for row in rows:
+            by_wallet[row['wallet']] = row
+            by_user.setdefault(row['user'], []).append(row)
+        self._by_wallet, self._by_user = by_wallet, by_user
+
+        # Будим всех, кто ждёт нового снимка, и заводим событие для следующего
+        loaded, self._loaded = self._loaded, asyncio.Event()
+        loaded.set()
+
+    async def wait_loaded(self):
+        """Ждём следующей успешной загрузки справочника"""
+        await self._loaded.wait()
+
+    def invalidate(self):
+        self._changed.set()
+
+    async def reload(self):
+        self._changed.clear()
+        await self.load()
+
+    async def _listen(self):
+        try:
+            return await self.db.listen(self.channel, lambda payload: self.invalidate(), on_close=self.invalidate)
+        except Exception as e:
+            print(f"Не удалось подписаться на {self.channel}, обновляем справочник раз в {self.retry_interval} сек: {e}")
+            return None
+
+    async def run(self):
+        """Фоновое обновление: LISTEN на изменения sol_wallet и перезагрузка раз в refresh_interval.
+        Пока подписки нет (не удалось подписаться или соединение оборвалось), справочник перезагружается
+        и подписка повторяется раз в retry_interval"""
+        listener = None
+        try:
+            while True:
+                if listener is not None and listener.is_closed():
+                    print(f"Соединение LISTEN {self.channel} оборвалось, переподписываемся")
+                    listener = None
+                    # Изменения, пока подписки не было, потеряны
+                    self.invalidate()
+                if listener is None:
+                    listener = await self._listen()
+
+                timeout = self.refresh_interval if listener is not None else min(self.refresh_interval, self.retry_interval)
+                try:
+                    await asyncio.wait_for(self._changed.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+                await self.reload()
+        finally:
+            if listener is not None:
+                await listener.close()
+
+    """Те же ответы, что у одноимённых методов Database"""
+
+    def get_wallets(self):
+        return list(self._by_wallet)
+
+    def check_row(self, wallet):
+        row = self._by_wallet.get(wallet)
+        return (row['user'], row['link']) if row else None
+
+    def get_influencer(self, wallet):
+        return self.check_row(wallet)
+
+    def count_wallets(self, user):
+        return len(self._by_user.get(user, []))
+
+    def get_user_wallets(self, user):
+        return [(row['wallet'],) for row in self._by_user.get(user, [])]
+
+    def check_infl(self, user):
+        wallets = self.get_user_wallets(user)
+        if len(wallets) == 0:
+            return False
+        return wallets
+
+    def get_influencers(self):
+        return list(self._by_user)
@@ -0,0 +1,13 @@
+-- +goose Up
+DELETE FROM token_data a
+USING token_data b
+WHERE a.wallet = b.wallet
+  AND a.token_address = b.token_address
+  AND a.id < b.id;
+
+ALTER TABLE token_data
+ADD CONSTRAINT token_data_wallet_token_address_key UNIQUE (wallet, token_address);
+
+-- +goose Down
+ALTER TABLE token_data
+DROP CONSTRAINT token_data_wallet_token_address_key;
@@ -0,0 +1,24 @@
+-- +goose Up
+CREATE TABLE IF NOT EXISTS wallet_cursors (
+    wallet VARCHAR(255) PRIMARY KEY,
+    last_signature TEXT NOT NULL,
+    last_slot BIGINT,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (wallet) REFERENCES sol_wallet (wallet) ON DELETE CASCADE
+);
+
+DELETE FROM infl_buys a
+USING infl_buys b
+WHERE a.wallet = b.wallet
+  AND a.token = b.token
+  AND a.timestamp = b.timestamp
+  AND a.ctid < b.ctid;
+
+ALTER TABLE infl_buys
+ADD CONSTRAINT infl_buys_wallet_token_timestamp_key UNIQUE (wallet, token, timestamp);
+
+-- +goose Down
+ALTER TABLE infl_buys
+DROP CONSTRAINT infl_buys_wallet_token_timestamp_key;
+
+DROP TABLE IF EXISTS wallet_cursors;
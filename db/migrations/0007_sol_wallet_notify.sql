@@ -0,0 +1,18 @@
+-- +goose Up
+-- +goose StatementBegin
+CREATE OR REPLACE FUNCTION notify_sol_wallet_changed() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('sol_wallet_changed', '');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+-- +goose StatementEnd
+
+CREATE TRIGGER sol_wallet_changed
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON sol_wallet
+FOR EACH STATEMENT EXECUTE FUNCTION notify_sol_wallet_changed();
+
+-- +goose Down
+DROP TRIGGER IF EXISTS sol_wallet_changed ON sol_wallet;
+
+DROP FUNCTION IF EXISTS notify_sol_wallet_changed();
@@ -0,0 +1,109 @@
+-- +goose Up
+CREATE TABLE IF NOT EXISTS token_buyers (
+    token TEXT NOT NULL,
+    wallet TEXT NOT NULL,
+    wallet_type wallet_type_enum,
+    first_buy TIMESTAMP NOT NULL,
+    last_buy TIMESTAMP NOT NULL,
+    PRIMARY KEY (token, wallet)
+);
+
+CREATE INDEX IF NOT EXISTS token_buyers_last_buy_idx ON token_buyers (last_buy);
+
+CREATE TABLE IF NOT EXISTS token_activity (
+    token TEXT PRIMARY KEY,
+    buyers INTEGER NOT NULL DEFAULT 0,
+    influencer_buyers INTEGER NOT NULL DEFAULT 0,
+    smart_buyers INTEGER NOT NULL DEFAULT 0,
+    whale_buyers INTEGER NOT NULL DEFAULT 0,
+    insider_buyers INTEGER NOT NULL DEFAULT 0,
+    first_buy TIMESTAMP,
+    last_buy TIMESTAMP,
+    dirty BOOLEAN NOT NULL DEFAULT TRUE
+);
+
+CREATE INDEX IF NOT EXISTS token_activity_dirty_idx ON token_activity (token) WHERE dirty;
+
+-- +goose StatementBegin
+CREATE OR REPLACE FUNCTION track_token_activity() RETURNS trigger AS $$
+DECLARE
+    buyer_type wallet_type_enum;
+    new_buyer INTEGER;
+BEGIN
+    SELECT wallet_type INTO buyer_type FROM sol_wallet WHERE wallet = NEW.wallet;
+
+    INSERT INTO token_buyers (token, wallet, wallet_type, first_buy, last_buy)
+    VALUES (NEW.token, NEW.wallet, buyer_type, NEW.timestamp, NEW.timestamp)
+    ON CONFLICT (token, wallet) DO UPDATE
+    SET first_buy = LEAST(token_buyers.first_buy, EXCLUDED.first_buy),
+        last_buy = GREATEST(token_buyers.last_buy, EXCLUDED.last_buy)
+    RETURNING (xmax = 0)::int INTO new_buyer;
+
+    INSERT INTO token_activity AS a (
+        token, buyers, influencer_buyers, smart_buyers, whale_buyers, insider_buyers, first_buy, last_buy, dirty
+    )
+    VALUES (
+        NEW.token,
+        new_buyer,
+        new_buyer * (buyer_type IS NOT DISTINCT FROM 'INFLUENCER')::int,
+        new_buyer * (buyer_type IS NOT DISTINCT FROM 'SMART')::int,
+        new_buyer * (buyer_type IS NOT DISTINCT FROM 'WHALE')::int,
+        new_buyer * (buyer_type IS NOT DISTINCT FROM 'INSIDER')::int,
+        NEW.timestamp,
+        NEW.timestamp,
+        TRUE
+    )
+    ON CONFLICT (token) DO UPDATE
+    SET buyers = a.buyers + EXCLUDED.buyers,
+        influencer_buyers = a.influencer_buyers + EXCLUDED.influencer_buyers,
+        smart_buyers = a.smart_buyers + EXCLUDED.smart_buyers,
+        whale_buyers = a.whale_buyers + EXCLUDED.whale_buyers,
+        insider_buyers = a.insider_buyers + EXCLUDED.insider_buyers,
+        first_buy = LEAST(a.first_buy, EXCLUDED.first_buy),
+        last_buy = GREATEST(a.last_buy, EXCLUDED.last_buy),
+        dirty = TRUE;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+-- +goose StatementEnd
+
+CREATE TRIGGER infl_buys_token_activity
+AFTER INSERT ON infl_buys
+FOR EACH ROW
+WHEN (NEW.token IS NOT NULL AND NEW.wallet IS NOT NULL AND NEW.timestamp IS NOT NULL)
+EXECUTE FUNCTION track_token_activity();
+
+INSERT INTO token_buyers (token, wallet, wallet_type, first_buy, last_buy)
+SELECT b.token, b.wallet, s.wallet_type, MIN(b.timestamp), MAX(b.timestamp)
+FROM infl_buys b
+LEFT JOIN sol_wallet s ON s.wallet = b.wallet
+WHERE b.token IS NOT NULL AND b.wallet IS NOT NULL AND b.timestamp IS NOT NULL
+GROUP BY b.token, b.wallet, s.wallet_type
+ON CONFLICT (token, wallet) DO NOTHING;
+
+INSERT INTO token_activity (
+    token, buyers, influencer_buyers, smart_buyers, whale_buyers, insider_buyers, first_buy, last_buy, dirty
+)
+SELECT
+    token,
+    COUNT(*),
+    COUNT(*) FILTER (WHERE wallet_type = 'INFLUENCER'),
+    COUNT(*) FILTER (WHERE wallet_type = 'SMART'),
+    COUNT(*) FILTER (WHERE wallet_type = 'WHALE'),
+    COUNT(*) FILTER (WHERE wallet_type = 'INSIDER'),
+    MIN(first_buy),
+    MAX(last_buy),
+    TRUE
+FROM token_buyers
+GROUP BY token
+ON CONFLICT (token) DO NOTHING;
+
+-- +goose Down
+DROP TRIGGER IF EXISTS infl_buys_token_activity ON infl_buys;
+
+DROP FUNCTION IF EXISTS track_token_activity();
+
+DROP TABLE IF EXISTS token_activity;
+
+DROP TABLE IF EXISTS token_buyers;
@@ -0,0 +1,91 @@
+-- +goose Up
+-- +goose StatementBegin
+CREATE OR REPLACE FUNCTION track_token_activity() RETURNS trigger AS $$
+DECLARE
+    buyer_type wallet_type_enum;
+    new_buyer INTEGER;
+BEGIN
+    SELECT wallet_type INTO buyer_type FROM sol_wallet WHERE wallet = NEW.wallet;
+
+    INSERT INTO token_buyers (token, wallet, wallet_type, first_buy, last_buy)
+    VALUES (NEW.token, NEW.wallet, buyer_type, NEW.timestamp, NEW.timestamp)
+    ON CONFLICT (token, wallet) DO UPDATE
+    SET first_buy = LEAST(token_buyers.first_buy, EXCLUDED.first_buy),
+        last_buy = GREATEST(token_buyers.last_buy, EXCLUDED.last_buy)
+    RETURNING (xmax = 0)::int INTO new_buyer;
+
+    INSERT INTO token_activity AS a (
+        token, buyers, influencer_buyers, smart_buyers, whale_buyers, insider_buyers, first_buy, last_buy, dirty
+    )
+    VALUES (
+        NEW.token,
+        new_buyer,
+        new_buyer * (buyer_type IS NOT DISTINCT FROM 'INFLUENCER')::int,
+        new_buyer * (buyer_type IS NOT DISTINCT FROM 'SMART')::int,
+        new_buyer * (buyer_type IS NOT DISTINCT FROM 'WHALE')::int,
+        new_buyer * (buyer_type IS NOT DISTINCT FROM 'INSIDER')::int,
+        NEW.timestamp,
+        NEW.timestamp,
+        TRUE
+    )
+    ON CONFLICT (token) DO UPDATE
+    SET buyers = a.buyers + EXCLUDED.buyers,
+        influencer_buyers = a.influencer_buyers + EXCLUDED.influencer_buyers,
+        smart_buyers = a.smart_buyers + EXCLUDED.smart_buyers,
+        whale_buyers = a.whale_buyers + EXCLUDED.whale_buyers,
+        insider_buyers = a.insider_buyers + EXCLUDED.insider_buyers,
+        first_buy = LEAST(a.first_buy, EXCLUDED.first_buy),
+        last_buy = GREATEST(a.last_buy, EXCLUDED.last_buy),
+        dirty = TRUE;
+
+    PERFORM pg_notify('token_activity', NEW.token);
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+-- +goose StatementEnd
+
+-- +goose Down
+-- +goose StatementBegin
+CREATE OR REPLACE FUNCTION track_token_activity() RETURNS trigger AS $$
+DECLARE
+    buyer_type wallet_type_enum;
+    new_buyer INTEGER;
+BEGIN
+    SELECT wallet_type INTO buyer_type FROM sol_wallet WHERE wallet = NEW.wallet;
+
+    INSERT INTO token_buyers (token, wallet, wallet_type, first_buy, last_buy)
+    VALUES (NEW.token, NEW.wallet, buyer_type, NEW.timestamp, NEW.timestamp)
+    ON CONFLICT (token, wallet) DO UPDATE
+    SET first_buy = LEAST(token_buyers.first_buy, EXCLUDED.first_buy),
+        last_buy = GREATEST(token_buyers.last_buy, EXCLUDED.last_buy)
+    RETURNING (xmax = 0)::int INTO new_buyer;
+
+    INSERT INTO token_activity AS a (
+        token, buyers, influencer_buyers, smart_buyers, whale_buyers, insider_buyers, first_buy, last_buy, dirty
+    )
+    VALUES (
+        NEW.token,
+        new_buyer,
+        new_buyer * (buyer_type IS NOT DISTINCT FROM 'INFLUENCER')::int,
+        new_buyer * (buyer_type IS NOT DISTINCT FROM 'SMART')::int,
+        new_buyer * (buyer_type IS NOT DISTINCT FROM 'WHALE')::int,
+        new_buyer * (buyer_type IS NOT DISTINCT FROM 'INSIDER')::int,
+        NEW.timestamp,
+        NEW.timestamp,
+        TRUE
+    )
+    ON CONFLICT (token) DO UPDATE
+    SET buyers = a.buyers + EXCLUDED.buyers,
+        influencer_buyers = a.influencer_buyers + EXCLUDED.influencer_buyers,
+        smart_buyers = a.smart_buyers + EXCLUDED.smart_buyers,
+        whale_buyers = a.whale_buyers + EXCLUDED.whale_buyers,
+        insider_buyers = a.insider_buyers + EXCLUDED.insider_buyers,
+        first_buy = LEAST(a.first_buy, EXCLUDED.first_buy),
+        last_buy = GREATEST(a.last_buy, EXCLUDED.last_buy),
+        dirty = TRUE;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+-- +goose StatementEnd
@@ -0,0 +1,45 @@
+-- +goose NO TRANSACTION
+-- Индексы строятся CONCURRENTLY, чтобы не блокировать запись в рабочие таблицы;
+-- CONCURRENTLY нельзя выполнять внутри транзакции, поэтому миграция идёт без неё,
+-- а все шаги идемпотентны и после сбоя её можно просто запустить снова
+
+-- +goose Up
+-- Уникальный (wallet, token_address) в token_data уже есть (0005), а (wallet, token, timestamp)
+-- в infl_buys (0006) покрывает поиск по кошельку
+CREATE INDEX CONCURRENTLY IF NOT EXISTS infl_buys_token_wallet_idx ON infl_buys (token, wallet);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS infl_buys_timestamp_idx ON infl_buys (timestamp);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS token_data_token_address_idx ON token_data (token_address);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS users_subscribed_idx ON users (user_id) INCLUDE (notify_infl, notify_smart)
+WHERE notify_infl OR notify_smart;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS users_payment_date_idx ON users (payment_date);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS token_activity_empty_idx ON token_activity (token) WHERE buyers <= 0;
+
+CREATE SEQUENCE IF NOT EXISTS data_wallet_id_seq OWNED BY data_wallet.id;
+
+SELECT setval('data_wallet_id_seq', COALESCE((SELECT MAX(id) FROM data_wallet), 0) + 1, false);
+
+ALTER TABLE data_wallet
+ALTER COLUMN id SET DEFAULT nextval('data_wallet_id_seq');
+
+-- +goose Down
+ALTER TABLE data_wallet
+ALTER COLUMN id DROP DEFAULT;
+
+DROP SEQUENCE IF EXISTS data_wallet_id_seq;
+
+DROP INDEX CONCURRENTLY IF EXISTS token_activity_empty_idx;
+
+DROP INDEX CONCURRENTLY IF EXISTS users_payment_date_idx;
+
+DROP INDEX CONCURRENTLY IF EXISTS users_subscribed_idx;
+
+DROP INDEX CONCURRENTLY IF EXISTS token_data_token_address_idx;
+
+DROP INDEX CONCURRENTLY IF EXISTS infl_buys_timestamp_idx;
+
+DROP INDEX CONCURRENTLY IF EXISTS infl_buys_token_wallet_idx;
@@ -0,0 +1,30 @@
+-- +goose Up
+-- +goose StatementBegin
+CREATE OR REPLACE FUNCTION parse_percent(value TEXT) RETURNS NUMERIC AS $$
+    SELECT CASE
+        WHEN btrim(replace(value, '%', '')) ~ '^[-+]?([0-9]+\.?[0-9]*|\.[0-9]+)$'
+        THEN btrim(replace(value, '%', ''))::NUMERIC
+    END
+$$ LANGUAGE sql IMMUTABLE;
+-- +goose StatementEnd
+
+ALTER TABLE data_wallet
+ALTER COLUMN pnl TYPE NUMERIC USING parse_percent(pnl),
+ALTER COLUMN wr TYPE NUMERIC USING parse_percent(wr);
+
+ALTER TABLE data_wallet
+ADD COLUMN IF NOT EXISTS pnl_positive BOOLEAN GENERATED ALWAYS AS (pnl > 0) STORED,
+ADD COLUMN IF NOT EXISTS wr_high BOOLEAN GENERATED ALWAYS AS (wr > 50) STORED,
+ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP;
+
+-- +goose Down
+ALTER TABLE data_wallet
+DROP COLUMN IF EXISTS updated_at,
+DROP COLUMN IF EXISTS wr_high,
+DROP COLUMN IF EXISTS pnl_positive;
+
+ALTER TABLE data_wallet
+ALTER COLUMN pnl TYPE TEXT USING pnl::TEXT || '%',
+ALTER COLUMN wr TYPE TEXT USING wr::TEXT || '%';
+
+DROP FUNCTION IF EXISTS parse_percent(TEXT);
@@ -0,0 +1,93 @@
+import asyncio
+import datetime
+import time
+
+DEFAULT_SETTINGS = {'payment_status': None, 'payment_date': None, 'notify_infl': True, 'notify_smart': True}
+
+
+class UserSettingsCache:
+    """Профили пользователей (статус оплаты и флаги уведомлений) в памяти с TTL.
+
+    Отметки оплаты из /start и /menu пишутся отложенно: повторные отметки одного пользователя
+    схлопываются, а накопившиеся сбрасываются в users одним запросом раз в flush_interval.
+    Флаги уведомлений переключаются сразу и атомарно в базе - по ним строится рассылка"""
+
+    def __init__(self, db, ttl=600, flush_interval=5):
+        self.db = db
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self._profiles = {}
+        self._pending_payments = {}
+
+    def _cached(self, user_id):
+        entry = self._profiles.get(user_id)
+        if entry is None:
+            return None
+        expires_at, profile = entry
+        if expires_at < time.monotonic():
+            del self._profiles[user_id]
+            return None
+        return profile
+
+    def _store(self, user_id, profile):
+        self._profiles[user_id] = (time.monotonic() + self.ttl, profile)
+
+    async def get(self, user_id):
+        profile = self._cached(user_id)
+        if profile is not None:
+            return profile
+
+        row = await self.db.get_user_settings(user_id)
+        profile = dict(row) if row else dict(DEFAULT_SETTINGS)
+        if user_id in self._pending_payments:
+            profile['payment_status'], profile['payment_date'] = self._pending_payments[user_id]
+        if row or user_id in self._pending_payments:
+            self._store(user_id, profile)
+        return profile
+
+    def touch_payment(self, user_id, status):
+        """Отложенная запись статуса оплаты (как update_payment_status)"""
+        payment_date = datetime.datetime.now()
+        self._pending_payments[user_id] = (status, payment_date)
+        profile = self._cached(user_id)
+        if profile is not None:
+            profile['payment_status'], profile['payment_date'] = status, payment_date
+
+    async def toggle_notify(self, user_id, flag):
+        """Атомарно переключаем flag ('notify_infl' или 'notify_smart') одним запросом
+        и обновляем профиль значениями, которые вернула база"""
+        if flag == 'notify_infl':
+            row = await self.db.toggle_notify_infl(user_id)
+        else:
+            row = await self.db.toggle_notify_smart(user_id)
+
+        profile = self._cached(user_id)
+        if profile is None:
+            profile = await self.get(user_id)
+        elif row:
+            profile['notify_infl'], profile['notify_smart'] = row['notify_infl'], row['notify_smart']
+        return profile
+
+    async def flush(self):
+        if not self._pending_payments:
+            return
+        pending, self._pending_payments = self._pending_payments, {}
+        statuses = [(user_id, status, payment_date) for user_id, (status, payment_date) in pending.items()]
+        if not await self.db.update_payment_statuses(statuses):
+            # Не записалось - вернём в очередь, не затирая более свежие отметки
+            for user_id, value in pending.items():
+                self._pending_payments.setdefault(user_id, value)
+
+    def _evict_expired(self):
+        now = time.monotonic()
+        for user_id in [user_id for user_id, (expires_at, _) in self._profiles.items() if expires_at < now]:
+            del self._profiles[user_id]
+
+    async def run(self):
+        try:
+            while True:
+                await asyncio.sleep(self.flush_interval)
+                await self.flush()
+                self._evict_expired()
+        finally:
+            await self.flush()
@@ -1,7 +1,11 @@
-import requests
+import asyncio
 import time
 import logging
 
+import aiohttp
+
+from app import metrics
+
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s - %(levelname)s - %(message)s",
@@ -11,52 +15,187 @@ logging.basicConfig(
     ]
 )
 
-def fetch_token_data(address, max_retries=5, retry_delay=1):
-    for attempt in range(max_retries):
-        try:
-            url = f"https://api.dexscreener.com/latest/dex/tokens/{address}"
-            logging.info(f"Requesting data for token: {address}, Attempt: {attempt + 1}")
+DEXSCREENER_TOKENS_URL = "https://api.dexscreener.com/latest/dex/tokens/"
+# Эндпоинт tokens принимает до 30 адресов через запятую
+MAX_ADDRESSES_PER_REQUEST = 30
+
 
-            response = requests.get(url)
+class DexScreenerClient:
+    """Асинхронный клиент DexScreener: одна aiohttp-сессия на всё время жизни,
+    TTL-кэш пар по адресу токена и пакетные запросы по нескольким адресам"""
 
-            logging.info(f"Sent GET request: {url}")
+    def __init__(self, session=None, ttl=60, empty_ttl=10, max_retries=5, retry_delay=1, base_url=DEXSCREENER_TOKENS_URL):
+        self._session = session
+        self._own_session = session is None
+        self.ttl = ttl
+        self.empty_ttl = empty_ttl
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.base_url = base_url
+        self._cache = {}
+        self._next_sweep = 0
 
-            if response.status_code != 200:
-                logging.error(
-                    f"HTTP Error {response.status_code}: {response.reason}. Response body: {response.text}"
-                )
-                raise requests.RequestException(f"API Error: {response.status_code} {response.reason}")
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+            self._own_session = True
+        return self._session
 
-            token_data = response.json()
+    async def close(self):
+        if self._own_session and self._session is not None and not self._session.closed:
+            await self._session.close()
 
-            if "pairs" in token_data and token_data["pairs"]:
-                pair = token_data["pairs"][0]
-                base_token = pair.get("baseToken", {})
-                market_cap = pair.get("marketCap", "Не указано")
+    def _cached(self, address):
+        entry = self._cache.get(address)
+        if entry is None:
+            return None
+        expires_at, pairs = entry
+        if expires_at < time.monotonic():
+            del self._cache[address]
+            return None
+        return pairs
 
-                address = base_token.get("address", "Не указано")
-                symbol = base_token.get("symbol", "Не указано")
+    def _store(self, address, pairs):
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self._evict_expired(now)
+        ttl = self.ttl if pairs else self.empty_ttl
+        self._cache[address] = (now + ttl, pairs)
 
-                logging.info(f"Success on attempt {attempt + 1}: Symbol: {symbol}, Market Cap: {market_cap}")
-                return symbol, str(market_cap)
+    def _evict_expired(self, now):
+        """Удаляем просроченные записи, даже если их адреса больше не запрашивают.
+        Проходим по кэшу не чаще раза в TTL, так что в памяти не больше двух TTL запрошенных адресов"""
+        for address in [address for address, (expires_at, _) in self._cache.items() if expires_at < now]:
+            del self._cache[address]
+        self._next_sweep = now + max(self.ttl, self.empty_ttl)
+
+    async def get_pairs(self, addresses):
+        """Пары DexScreener для каждого адреса: {address: [pair, ...]}.
+        Незакэшированные адреса запрашиваются пачками по MAX_ADDRESSES_PER_REQUEST"""
+        result = {}
+        missing = []
+        for address in dict.fromkeys(addresses):
+            pairs = self._cached(address)
+            if pairs is None:
+                missing.append(address)
             else:
-                logging.warning(f"No pairs data found. Retrying... Attempt: {attempt + 1}")
-                time.sleep(retry_delay)
-        except Exception as e:
-            logging.error(f"Attempt {attempt + 1}: Error while fetching data: {e}")
-            time.sleep(retry_delay)
+                result[address] = pairs
+
+        chunks = [missing[i:i + MAX_ADDRESSES_PER_REQUEST] for i in range(0, len(missing), MAX_ADDRESSES_PER_REQUEST)]
+        for fetched in await asyncio.gather(*(self._fetch_batch(chunk) for chunk in chunks)):
+            result.update(fetched)
+        return result
+
+    async def prefetch(self, addresses):
+        """Прогрев кэша одним пакетом перед поштучными вызовами"""
+        await self.get_pairs(addresses)
+
+    async def _fetch_batch(self, addresses):
+        url = self.base_url + ",".join(addresses)
+        retry_delay = self.retry_delay
+        session = await self._get_session()
+
+        for attempt in range(self.max_retries):
+            try:
+                logging.info(f"Requesting data for {len(addresses)} token(s), Attempt: {attempt + 1}")
+                with metrics.track_request('dexscreener'):
+                    async with session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as response:
+                        if response.status != 200:
+                            body = await response.text()
+                            logging.error(f"HTTP Error {response.status}: {response.reason}. Response body: {body}")
+                            raise aiohttp.ClientError(f"API Error: {response.status} {response.reason}")
+                        token_data = await response.json()
+
+                grouped = {address: [] for address in addresses}
+                for pair in token_data.get("pairs") or []:
+                    for side in ("baseToken", "quoteToken"):
+                        address = pair.get(side, {}).get("address")
+                        if address in grouped:
+                            grouped[address].append(pair)
+
+                for address, pairs in grouped.items():
+                    self._store(address, pairs)
+                return grouped
+            except Exception as e:
+                logging.error(f"Attempt {attempt + 1}: Error while fetching data: {e}")
+                await asyncio.sleep(retry_delay)
+                retry_delay *= 2
+
+        logging.error(f"Failed to fetch token data for {addresses}")
+        return {address: [] for address in addresses}
+
+    async def fetch_token_data(self, address):
+        """Символ и капитализация токена (market cap строкой), как раньше возвращал fetch_token_data"""
+        pairs = (await self.get_pairs([address])).get(address)
+        for pair in pairs or []:
+            base_token = pair.get("baseToken", {})
+            if base_token.get("address") != address:
+                continue
+            symbol = base_token.get("symbol", "Не указано")
+            market_cap = pair.get("marketCap", "Не указано")
+            return symbol, str(market_cap)
+
+        logging.warning(f"No pairs data found for {address}. Returning default values: Symbol = 'unknown', Market Cap = '0000'")
+        return 'unknown', '0000'
+
+    async def get_token_info(self, address):
+        """Название токена и его цена в SOL (None, если пары с SOL нет)"""
+        pairs = (await self.get_pairs([address])).get(address)
+        token_name = None
+        for pair in pairs or []:
+            base_token, quote_token = pair['baseToken'], pair['quoteToken']
+            is_base = base_token['address'] == address
+            token_name = token_name or (base_token['name'] if is_base else quote_token['name'])
+            other = quote_token if is_base else base_token
+            if other['symbol'] != "SOL":
+                continue
+            try:
+                price_native = float(pair.get('priceNative'))
+            except (TypeError, ValueError):
+                continue
+            # Нулевая цена ("0") - пара без ликвидности, и для котируемой стороны 1 / 0 уронил бы обработку кошелька
+            if price_native <= 0:
+                continue
+            token_price_in_sol = price_native if is_base else 1 / price_native
+            return token_name, token_price_in_sol
+        return token_name or "Неизвестно", None
+
+
+class TokenInfoCache:
+    """Названия и цены токенов на один цикл обновления поверх DexScreenerClient.
+
+    Каждый mint запрашивается не больше одного раза за цикл: параллельные запросы
+    одного и того же mint ждут общий запрос, а prefetch объединяет новые mint в пакет"""
+
+    def __init__(self, dex):
+        self.dex = dex
+        self._infos = {}
+
+    async def prefetch(self, addresses):
+        addresses = list(dict.fromkeys(addresses))
+        new = [address for address in addresses if address not in self._infos]
+        if new:
+            batch = asyncio.ensure_future(self.dex.prefetch(new))
+            for address in new:
+                self._infos[address] = asyncio.ensure_future(self._load(batch, address))
+        await asyncio.gather(*(asyncio.shield(self._infos[address]) for address in addresses))
 
-        retry_delay *= 2
+    async def _load(self, batch, address):
+        await batch
+        return await self.dex.get_token_info(address)
 
-    logging.error("Failed to fetch token data. Returning default values: Symbol = 'unknown', Market Cap = '0000'")
-    return 'unknown', '0000'
+    async def get_token_info(self, address):
+        if address not in self._infos:
+            await self.prefetch([address])
+        return await asyncio.shield(self._infos[address])
 
 
 # Пример вызова
 # if __name__ == "__main__":
-#     try:
-#         symbol, market_cap = fetch_token_data("FaefVP4DsPrudsbhVTThVqLckaSvqj175CsMPifhib2d")
+#     async def example():
+#         dex = DexScreenerClient()
+#         symbol, market_cap = await dex.fetch_token_data("FaefVP4DsPrudsbhVTThVqLckaSvqj175CsMPifhib2d")
 #         print(f"Token Symbol: {symbol}, Market Cap: {market_cap}")
-#     except ValueError as e:
-#         logging.critical(f"Final failure: {e}")
-#         print(e)
+#         await dex.close()
+#
+#     asyncio.run(example())
@@ -1,9 +1,12 @@
 import asyncio
 import aiohttp
-from db.database import Database
+from db.async_database import AsyncDatabase
 from app import config as cfg
+from app import metrics
+from app import settings
+from dex_parse import DexScreenerClient, TokenInfoCache
 
-RPC_URL = "https://api.mainnet-beta.solana.com"
+RPC_URL = settings.SOLANA_RPC_URL
 
 
 async def get_token_accounts(wallet_address, session):
@@ -20,68 +23,53 @@ async def get_token_accounts(wallet_address, session):
     }
 
     try:
-        async with session.post(RPC_URL, headers=headers, json=payload, timeout=10) as response:
-            response.raise_for_status()
-            data = await response.json()
-            if 'result' in data and 'value' in data['result']:
-                accounts = data['result']['value']
-                filtered_accounts = [
-                    account for account in accounts
-                    if account['account']['data']['parsed']['info']['tokenAmount']['uiAmount'] > 0.01
-                ]
-                return filtered_accounts
+        with metrics.track_request('solana_rpc'):
+            async with session.post(RPC_URL, headers=headers, json=payload, timeout=10) as response:
+                response.raise_for_status()
+                data = await response.json()
+        if 'result' in data and 'value' in data['result']:
+            accounts = data['result']['value']
+            filtered_accounts = [
+                account for account in accounts
+                if account['account']['data']['parsed']['info']['tokenAmount']['uiAmount'] > 0.01
+            ]
+            return filtered_accounts
     except Exception as e:
         print(f"Ошибка при запросе данных о токенах для кошелька {wallet_address}: {e}")
     return []
 
-async def get_token_info(token_address, session):
-    url = f"https://api.dexscreener.com/latest/dex/search?q={token_address}"
+async def get_token_info(token_address, prices):
+    return await prices.get_token_info(token_address)
 
-    try:
-        async with session.get(url, timeout=10) as response:
-            response.raise_for_status()
-            data = await response.json()
-            if "pairs" in data:
-                for pair in data["pairs"]:
-                    if pair['baseToken']['address'] == token_address or pair['quoteToken']['address'] == token_address:
-                        token_name = pair['baseToken']['name'] if pair['baseToken']['address'] == token_address else \
-                        pair['quoteToken']['name']
-                        token_price_in_sol = float(pair['priceNative']) if pair['baseToken']['symbol'] == "SOL" or \
-                                                                           pair['quoteToken'][
-                                                                               'symbol'] == "SOL" else None
-                        return token_name, token_price_in_sol
-    except Exception as e:
-        print(f"Ошибка при запросе данных о токене {token_address}: {e}")
-    return "Неизвестно", None
 
-
-async def process_wallets(db, session):
-    wallets = db.get_wallets()
+async def process_wallets(db, session, dex):
+    wallets = await db.get_wallets()
+    prices = TokenInfoCache(dex)
 
     tasks = []
     for wallet in wallets:
         print(f"\nОбрабатываю кошелек: {wallet}")
-        tasks.append(process_wallet(wallet, db, session))
+        tasks.append(process_wallet(wallet, db, session, prices))
 
     await asyncio.gather(*tasks)
 
 
-async def process_wallet(wallet, db, session):
+async def process_wallet(wallet, db, session, prices):
     accounts = await get_token_accounts(wallet, session)
 
     if accounts:
         try:
             print(f"Найдено {len(accounts)} токенов для кошелька {wallet}:\n")
 
-            existing_tokens = db.get_tokens_for_wallet(wallet)
-            updated_tokens = set()
+            await prices.prefetch(account['account']['data']['parsed']['info']['mint'] for account in accounts)
 
+            holdings = []
             for account in accounts:
                 token_info = account['account']['data']['parsed']['info']
                 token_address = token_info['mint']
                 token_balance = token_info['tokenAmount']['uiAmount']
 
-                token_name, token_price_in_sol = await get_token_info(token_address, session)
+                token_name, token_price_in_sol = await get_token_info(token_address, prices)
 
                 if token_price_in_sol is None:
                     continue
@@ -91,18 +79,10 @@ async def process_wallet(wallet, db, session):
                 if total_in_sol > 0.01:
                     print(
                         f"Токен: {token_name} (Адрес: {token_address}), Сумма в SOL: {total_in_sol:.4f}")
+                    holdings.append((token_address, token_name, token_balance, total_in_sol))
 
-                    if token_address in existing_tokens:
-                        db.update_token_info(wallet, token_address, token_name, token_balance, total_in_sol)
-                    else:
-                        db.save_new_token(wallet, token_address, token_name, token_balance, total_in_sol)
-
-                    updated_tokens.add(token_address)
-                await asyncio.sleep(0.5)
-            for token_address in existing_tokens:
-                if token_address not in updated_tokens:
-                    print(f"Удаляю токен {token_address} для кошелька {wallet}")
-                    db.remove_token(wallet, token_address)
+            for token_address in await db.sync_wallet_tokens(wallet, holdings):
+                print(f"Удаляю токен {token_address} для кошелька {wallet}")
 
         except KeyError:
             print(f"Не удалось извлечь данные из ответа для кошелька {wallet}.")
@@ -110,15 +90,25 @@ async def process_wallet(wallet, db, session):
         print(f"Не удалось получить данные о токенах для кошелька {wallet}.")
 
 
+async def run(db, session, dex, interval=settings.HOLDERS_INTERVAL):
+    """Обход всех кошельков раз в interval секунд; список кошельков берётся из базы на каждом круге"""
+    while True:
+        await process_wallets(db, session, dex)
+
+        print(f"Ожидаю {interval} сек перед следующим обновлением...")
+        await asyncio.sleep(interval)
+
+
 async def main():
-    db = Database(minconn=1, maxconn=25, dbname=cfg.dbname, user=cfg.user, password=cfg.password)
+    db = AsyncDatabase(minconn=settings.DB_MINCONN, maxconn=settings.HOLDERS_DB_MAXCONN,
+                       dbname=cfg.dbname, user=cfg.user, password=cfg.password,
+                       host=settings.DB_HOST, port=settings.DB_PORT, **settings.DB_POOL_OPTIONS)
+    await db.connect()
+    metrics.start_metrics_server(settings.HOLDERS_METRICS_PORT)
 
     async with aiohttp.ClientSession() as session:
-        while True:
-            await process_wallets(db, session)
-
-            print("Ожидаю 2 минут перед следующим обновлением...")
-            await asyncio.sleep(120)
+        dex = DexScreenerClient(session=session, base_url=settings.DEXSCREENER_API_URL)
+        await run(db, session, dex)
 
 
 if __name__ == "__main__":
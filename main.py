@@ -1,25 +1,58 @@
 import logging
 import asyncio
 import re
+from itertools import groupby
+
+from aiohttp import web
 
 from aiogram import Bot, Dispatcher, F
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, Message, FSInputFile, InlineKeyboardButton, InlineKeyboardMarkup
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from aiocryptopay import Networks, AioCryptoPay
 
-from db.database import Database
+from db.async_database import AsyncDatabase
+from db.influencer_directory import InfluencerDirectory
+from db.user_settings import UserSettingsCache
 from app import config as cfg
+from app import metrics
+from app import settings
+from app.alerts import HotTokenWatcher
+from app.broadcast import Broadcaster
+from app.storage import create_redis, create_fsm_storage, create_shared_state
+from app.webhook import create_app
 import app.keyboards as kb
-from dex_parse import fetch_token_data
-
-
-bot = Bot(token=cfg.token)
-dp = Dispatcher(bot=bot, storage=MemoryStorage())
-db = Database(minconn=1, maxconn=25, dbname=cfg.dbname, user=cfg.user, password=cfg.password)
+from dex_parse import DexScreenerClient
+
+
+bot_session = AiohttpSession(api=TelegramAPIServer.from_base(settings.TELEGRAM_API_URL)) if settings.TELEGRAM_API_URL else None
+bot = Bot(token=cfg.token, session=bot_session)
+redis = create_redis(settings.REDIS_URL)
+shared = create_shared_state(redis)
+dp = Dispatcher(
+    bot=bot,
+    storage=create_fsm_storage(redis, state_ttl=settings.FSM_STATE_TTL, data_ttl=settings.FSM_DATA_TTL)
+)
+dp.message.middleware(metrics.MetricsMiddleware())
+dp.callback_query.middleware(metrics.MetricsMiddleware())
+db = AsyncDatabase(minconn=settings.DB_MINCONN, maxconn=settings.BOT_DB_MAXCONN,
+                   dbname=cfg.dbname, user=cfg.user, password=cfg.password,
+                   host=settings.DB_HOST, port=settings.DB_PORT, **settings.DB_POOL_OPTIONS)
+directory = InfluencerDirectory(db, refresh_interval=settings.DIRECTORY_REFRESH_INTERVAL)
+users = UserSettingsCache(db, ttl=settings.USER_CACHE_TTL, flush_interval=settings.USER_FLUSH_INTERVAL)
+dex = DexScreenerClient(base_url=settings.DEXSCREENER_API_URL)
+broadcaster = Broadcaster(
+    bot,
+    rate=settings.BROADCAST_RATE,
+    workers=settings.BROADCAST_WORKERS,
+    chat_interval=settings.BROADCAST_CHAT_INTERVAL,
+    group_interval=settings.BROADCAST_GROUP_INTERVAL,
+    max_retries=settings.BROADCAST_MAX_RETRIES
+)
 
 
 client = AioCryptoPay(token=cfg.TOKEN_CRYPTO_BOT, network=Networks.MAIN_NET)
@@ -39,7 +72,7 @@ class Form(StatesGroup):
 # <<<------------------------------------------------------------------------------------------------>>>
 # Функция для проверки статуса платежа
 async def check_payment(user_id: int):
-    payment_status = db.get_payment_status(user_id)  # Здесь проверяется статус оплаты в базе данных
+    payment_status = (await users.get(user_id))['payment_status']  # Здесь проверяется статус оплаты в базе данных
     return payment_status == "paid"  # Возвращает True, если оплачено
 
 # async def check_user_access(message: Message, database, check_payment_func):
@@ -60,7 +93,7 @@ async def check_payment(user_id: int):
 @dp.message(Command("start"))
 async def cmd_start(message: Message):
     user_id = message.from_user.id
-    db.update_payment_status(user_id, "paid")
+    users.touch_payment(user_id, "paid")
     fabu_img_path = 'img/fabu.png'
     fabu_img = FSInputFile(fabu_img_path)
 
@@ -80,7 +113,8 @@ async def cmd_start(message: Message):
 
 @dp.message(Command("pay"))
 async def pay_command(message: Message):
-    invoice = await client.create_invoice(asset='USDT', amount=0.05)
+    with metrics.track_request('cryptopay'):
+        invoice = await client.create_invoice(asset='USDT', amount=0.05)
     builder = InlineKeyboardBuilder()
     builder.add(InlineKeyboardButton(text="Payment Link", url=invoice.bot_invoice_url))
     builder.add(InlineKeyboardButton(text="Check Payment", callback_data=f"CHECK|{invoice.invoice_id}"))
@@ -91,11 +125,18 @@ async def pay_command(message: Message):
 @dp.callback_query(lambda c: c.data.startswith("CHECK|"))
 async def check_invoice(call: CallbackQuery):
     invoice_id = int(call.data.split("|")[1])
-    invoice = await client.get_invoices(invoice_ids=invoice_id)
+    with metrics.track_request('cryptopay'):
+        invoice = await client.get_invoices(invoice_ids=invoice_id)
 
     if invoice.status == "paid":
+        # Один оплаченный счёт продлевает подписку один раз, даже если Check Payment нажали
+        # повторно или на разных репликах
+        if not await shared.claim(f"paid_invoice:{invoice_id}", ttl=settings.PAID_INVOICE_TTL):
+            await call.answer("✅ This payment has already been applied")
+            return
         user_id = call.from_user.id
-        db.update_payment_status(user_id, "paid")  # Обновляем статус оплаты в базе данных
+        users.touch_payment(user_id, "paid")  # Обновляем статус оплаты в базе данных
+        await users.flush()
         await call.message.delete()
         await call.message.answer("🎉 Order paid! Now you’ve got <b>30 days</b> ⏳ to use my abilities. Use them wisely 🕵️‍♂️.", parse_mode='HTML')
     else:
@@ -112,7 +153,7 @@ async def menu(message_or_callback):
     # if not await check_user_access(message_or_callback, db, check_payment):
     #     return
     user_id = message_or_callback.from_user.id
-    db.update_payment_status(user_id, "paid")
+    users.touch_payment(user_id, "paid")
 
     if isinstance(message_or_callback, Message):
         await message_or_callback.answer("🤖 What would you like to explore next? Your turn, thinker 🧠... The choice is yours! ✨", reply_markup=kb.menu)
@@ -147,9 +188,8 @@ def generate_notify_keyboard(status1, status2):
 async def spy(message_or_callback):
     user_id = message_or_callback.from_user.id
 
-    notify_infl = db.get_notify_infl(user_id)
-    notify_smart = db.get_notify_smart(user_id)
-    keyboard = generate_notify_keyboard(notify_infl, notify_smart)
+    profile = await users.get(user_id)
+    keyboard = generate_notify_keyboard(profile['notify_infl'], profile['notify_smart'])
 
     message = "🤖 Ah, keeping track of the influencers’ moves, are we? 😏 Just enable this feature, and I’ll notify you whenever I spot a token catching the attention of influencers! 🚀👀 Always here to keep you informed."
 
@@ -169,18 +209,13 @@ async def cmd_spy(message: Message):
 @dp.callback_query(lambda c: c.data == "infl_notify")
 async def toggle_notify_infl(callback_query: CallbackQuery):
     user_id = callback_query.from_user.id
-    current_status = db.get_notify_infl(user_id)
-    new_status = not current_status
-
-    db.update_notify_infl_status(user_id, new_status)
-
-    notify_infl = db.get_notify_infl(user_id)
-    notify_smart = db.get_notify_smart(user_id)
+    profile = await users.toggle_notify(user_id, 'notify_infl')
+    new_status = profile['notify_infl']
 
     status_message = "Influencer notifications " + ("enabled!" if new_status else "disabled!")
     await callback_query.answer(status_message, show_alert=True)
 
-    keyboard = generate_notify_keyboard(notify_infl, notify_smart)
+    keyboard = generate_notify_keyboard(profile['notify_infl'], profile['notify_smart'])
     await bot.edit_message_reply_markup(
         chat_id=callback_query.message.chat.id,
         message_id=callback_query.message.message_id,
@@ -190,18 +225,13 @@ async def toggle_notify_infl(callback_query: CallbackQuery):
 @dp.callback_query(lambda c: c.data == "smart_notify")
 async def toggle_notify_smart(callback_query: CallbackQuery):
     user_id = callback_query.from_user.id
-    current_status = db.get_notify_smart(user_id)
-    new_status = not current_status
-
-    db.update_notify_smart_status(user_id, new_status)
-
-    notify_infl = db.get_notify_infl(user_id)
-    notify_smart = db.get_notify_smart(user_id)
+    profile = await users.toggle_notify(user_id, 'notify_smart')
+    new_status = profile['notify_smart']
 
     status_message = "Smart notifications " + ("enabled!" if new_status else "disabled!")
     await callback_query.answer(status_message, show_alert=True)
 
-    keyboard = generate_notify_keyboard(notify_infl, notify_smart)
+    keyboard = generate_notify_keyboard(profile['notify_infl'], profile['notify_smart'])
     await bot.edit_message_reply_markup(
         chat_id=callback_query.message.chat.id,
         message_id=callback_query.message.message_id,
@@ -209,146 +239,95 @@ async def toggle_notify_smart(callback_query: CallbackQuery):
     )
 
 
-async def background_task():
-    try:
-        while True:
-
-            retry_attempts = 5
-            tokens = None
-            for attempt in range(retry_attempts):
-                try:
-                    tokens = db.get_tokens_with_more_than_5_unique_wallets()
-                    if tokens:
-                        break
-                    else:
-                        print("Нет токенов, повторяю попытку.")
-                except Exception as e:
-                    print(f"Ошибка при получении токенов, попытка {attempt + 1}: {e}")
-                    if attempt == retry_attempts - 1:
-                        print("Превышено количество попыток для получения токенов.")
-                        raise
-
-            for token in tokens:
-                infl_count, all_count, degen_count = 0, 0, 0
-
-                if not db.is_token_notified(token):
-
-                    retry_attempts_wallets = 5
-                    wallets = None
-                    for attempt in range(retry_attempts_wallets):
-                        try:
-                            wallets = db.get_unique_wallets_for_token(token)
-                            if wallets:
-                                break
-                            else:
-                                print(f"Нет кошельков для токена {token}, повторяю попытку.")
-                        except Exception as e:
-                            print(f"Ошибка при получении кошельков для токена {token}, попытка {attempt + 1}: {e}")
-                            if attempt == retry_attempts_wallets - 1:
-                                print(f"Превышено количество попыток для получения кошельков для токена {token}.")
-                                raise
-
-                    try:
-                        symbol, market_cap = fetch_token_data(token)
-                    except ValueError as e:
-                        symbol, market_cap = 'unknown', '0000'
-
-                    if len(market_cap) < 7:
-                        market_cap = f"{market_cap[:-3]}K"
-
-                    elif 7 <= len(market_cap) < 10:
-                        market_cap = f"{market_cap[:-6]}.{market_cap[-6:-4]}M"
+def format_wallet_stats(stats):
+    """Строка PNL/WR кошелька: числа и признаки pnl_positive/wr_high приходят из data_wallet готовыми"""
+    pnl_emoji = "🟢" if stats['pnl_positive'] else "🔴"
+    wr_emoji = "🟢" if stats['wr_high'] else "🔴"
+    return f"{pnl_emoji} PNL: {float(stats['pnl']):g}%, {wr_emoji} WR(7d): {float(stats['wr']):g}%"
 
-                    else:
-                        market_cap = f"{market_cap[:-9]}.{market_cap[-9:-7]}B"
-
-                    message = (f"🔔 <b>${symbol}</b> <code>{token}</code> is being actively bought!"
-                               f"\nMC: <i>{market_cap}</i> 💲"
-                               f"\nHere's the list:\n\n")
-                    message_smart = (f"🔔 <b>${symbol}</b> <code>{token}</code> is being actively bought!"
-                               f"\nMC: <i>{market_cap}</i> 💲"
-                               f"\nHere's the list:\n\n")
-                    message_infl = (f"🔔 <b>${symbol}</b> <code>{token}</code> is being actively bought!"
-                               f"\nMC: <i>{market_cap}</i> 💲"
-                               f"\nHere's the list:\n\n")
-
-                    for wallet in wallets:
-                        retry_attempts_wallet = 5
-                        for attempt in range(retry_attempts_wallet):
-                            try:
-                                result = db.get_data(wallet)
-                                if result is not None:
-                                    try:
-                                        pnl, wr = result
-                                    except (ValueError, TypeError):
-                                        pnl, wr = 25, 30
-                                    pnl_emoji = "🟢" if float(pnl.strip('%')) > 0 else "🔴"
-                                    wr_emoji = "🟢" if float(wr.strip('%')) > 50 else "🔴"
-                                    infl, link = db.get_influencer(wallet)
-
-                                    all_count += 1
-                                    message += (
-                                        f"{pnl_emoji} PNL: {pnl}, {wr_emoji} WR(7d): {wr}, <b><a href='{link}'>{infl}</a></b>\n"
-                                        f"<code>{wallet}</code>\n\n"
-                                    )
-
-                                    if infl == 'smart_degen':
-                                        degen_count += 1
-                                        message_smart += (
-                                            f"{pnl_emoji} PNL: {pnl}, {wr_emoji} WR(7d): {wr}, <b><a href='{link}'>{infl}</a></b>\n"
-                                            f"<code>{wallet}</code>\n\n"
-                                        )
-                                    else:
-                                        infl_count += 1
-                                        message_infl += (
-                                            f"{pnl_emoji} PNL: {pnl}, {wr_emoji} WR(7d): {wr}, <b><a href='{link}'>{infl}</a></b>\n"
-                                            f"<code>{wallet}</code>\n\n"
-                                        )
-                                else:
-                                    continue
-                                break
-                            except Exception as e:
-                                print(f"Ошибка при обработке кошелька {wallet}, попытка {attempt + 1}: {e}")
-                                if attempt == retry_attempts_wallet - 1:
-                                    print(f"Превышено количество попыток для кошелька {wallet}.")
-                                    continue
-
-                    if all_count > 2 or infl_count > 2 or degen_count > 1:
-                        print('захожу в нотифай юзерс')
-                        db.add_notified_token(token)
-                        await notify_users(message, message_smart, message_infl, infl_count, all_count, degen_count)
-
-            await asyncio.sleep(60)
-    except Exception as e:
-        print(f"Общая ошибка в background_task: {e}")
-        print("Произошла ошибка, будет попытка повторить выполнение через 60 секунд.")
-        await asyncio.sleep(60)
 
-async def notify_users(message, message_smart, message_infl, infl_count, all_count, degen_count):
-    users_with_notifications = db.get_users_with_notifications()
-    print(users_with_notifications)
+async def process_hot_token(token, wallets):
+    """Сборка и рассылка оповещения по токену из строк get_hot_tokens_with_wallets"""
+    infl_count, all_count, degen_count = 0, 0, 0
+
+    symbol, market_cap = await dex.fetch_token_data(token)
+
+    if len(market_cap) < 7:
+        market_cap = f"{market_cap[:-3]}K"
+
+    elif 7 <= len(market_cap) < 10:
+        market_cap = f"{market_cap[:-6]}.{market_cap[-6:-4]}M"
 
-    for user_id in users_with_notifications:
+    else:
+        market_cap = f"{market_cap[:-9]}.{market_cap[-9:-7]}B"
+
+    header = (f"🔔 <b>${symbol}</b> <code>{token}</code> is being actively bought!"
+              f"\nMC: <i>{market_cap}</i> 💲"
+              f"\nHere's the list:\n\n")
+    message, message_smart, message_infl = header, header, header
+
+    for row in wallets:
+        wallet, infl, link = row['wallet'], row['user'], row['link']
+        line = (
+            f"{format_wallet_stats(row)}, <b><a href='{link}'>{infl}</a></b>\n"
+            f"<code>{wallet}</code>\n\n"
+        )
+        all_count += 1
+        message += line
+
+        if infl == 'smart_degen':
+            degen_count += 1
+            message_smart += line
+        else:
+            infl_count += 1
+            message_infl += line
+
+    if all_count > 2 or infl_count > 2 or degen_count > 1:
+        # Решение о рассылке и пометка токена - один INSERT: при нескольких репликах
+        # и параллельных проверках оповещение по токену рассылается ровно один раз
+        if not await db.claim_notified_token(token):
+            return
+        print('захожу в нотифай юзерс')
+        await notify_users(message, message_smart, message_infl, infl_count, all_count, degen_count)
+
+
+async def process_hot_tokens(rows):
+    """Оповещения по строкам get_hot_tokens_with_wallets; возвращает токены, которые обработать не удалось"""
+    failed = []
+    await dex.prefetch({row['token'] for row in rows})
+    for token, wallets in groupby(rows, key=lambda row: row['token']):
         try:
-            notify_infl = db.get_notify_infl(user_id)
-            notify_smart = db.get_notify_smart(user_id)
+            await process_hot_token(token, list(wallets))
+        except Exception as e:
+            print(f"Ошибка при обработке токена {token}: {e}")
+            failed.append(token)
+    return failed
 
-            if notify_infl and notify_smart and all_count > 2:
-                await bot.send_message(user_id, message, parse_mode='HTML', disable_web_page_preview=True)
-                continue
 
-            elif notify_infl and infl_count > 2:
-                await bot.send_message(user_id, message_infl, parse_mode='HTML', disable_web_page_preview=True)
-                continue
+hot_tokens = HotTokenWatcher(
+    db,
+    process_hot_tokens,
+    window=settings.BUYS_WINDOW,
+    reconcile_interval=settings.ALERT_RECONCILE_INTERVAL,
+    poll_interval=settings.ALERT_POLL_INTERVAL
+)
 
-            elif notify_smart and degen_count > 1:
-                await bot.send_message(user_id, message_smart, parse_mode='HTML', disable_web_page_preview=True)
-                continue
+async def notify_users(message, message_smart, message_infl, infl_count, all_count, degen_count):
+    subscribers = await db.get_users_notify_flags()
 
-            else:
-                continue
-        except Exception as e:
-            print(f"Ошибка при отправке уведомления пользователю {user_id}: {e}")
+    messages = []
+    for user_id, notify_infl, notify_smart in subscribers:
+        if notify_infl and notify_smart and all_count > 2:
+            messages.append((user_id, message))
+
+        elif notify_infl and infl_count > 2:
+            messages.append((user_id, message_infl))
+
+        elif notify_smart and degen_count > 1:
+            messages.append((user_id, message_smart))
+
+    stats = await broadcaster.broadcast(messages, parse_mode='HTML', disable_web_page_preview=True)
+    print(f"Рассылка завершена: {stats}")
 # <<<------------------------------------------------------------------------------------------------>>>
 
 
@@ -376,7 +355,7 @@ async def check(message_or_callback, state: FSMContext):
 async def process_tip(callback_query: CallbackQuery, state: FSMContext):
     message_text = "That's who I know about... Looks around cautiously You know, top secret stuff 🤐: "
 
-    influencers = db.get_influencers()
+    influencers = directory.get_influencers()
     excluded_names = {"smart_degen", "fabu"}
     filtered_influencers = [influencer for influencer in influencers if influencer not in excluded_names]
 
@@ -412,7 +391,7 @@ async def process_check_end(message: Message, state: FSMContext):
         return
 
     if re.match(SOLANA_ADDRESS_REGEX, message.text):
-        result = db.check_row(query)
+        result = directory.check_row(query)
 
         if result:
             if len(result) == 2:  # Проверяем, что результат состоит из 2 элементов
@@ -420,26 +399,24 @@ async def process_check_end(message: Message, state: FSMContext):
             else:
                 await message.reply("Sorry, no valid data found for this wallet.")
                 return
-            count_wallets = db.count_wallets(user)
+            count_wallets = directory.count_wallets(user)
 
 
             await message.reply(f"Yes, I know the owner of this wallet 😏. "
                                 f"This is 🤵 <b><a href='{link}'>{user}</a></b>. 🕵️‍ Don't tell anyone! ️",
                                 parse_mode='HTML', disable_web_page_preview=True)
             if count_wallets > 1:
-                user_wallets = db.get_user_wallets(user)
+                user_wallets = directory.get_user_wallets(user)
                 list_wallets = ''
+                wallets_data = await db.get_wallets_data([user_wallet[0] for user_wallet in user_wallets])
                 for user_wallet in user_wallets:
                     wallet_address = user_wallet[0]
-                    pnl, wr = db.get_data(wallet_address)
-
-                    if pnl is not None and wr is not None:
-                        pnl_emoji = "🟢" if float(pnl.strip('%')) > 0 else "🔴"
-                        wr_emoji = "🟢" if float(wr.strip('%')) > 50 else "🔴"
+                    stats = wallets_data.get(wallet_address)
 
+                    if stats is not None:
                         # Формируем строку для кошелька
                         list_wallets += (
-                            f"{pnl_emoji} PNL: {pnl}, {wr_emoji} WR(7d): {wr}\n"
+                            f"{format_wallet_stats(stats)}\n"
                             f"<code>{wallet_address}</code>\n\n"
                         )
                     else:
@@ -457,21 +434,19 @@ async def process_check_end(message: Message, state: FSMContext):
         else:
             await message.reply("Unfortunately 😭, I don't know anything about this wallet. This one is a mystery!")
     else:
-        wallets = db.check_infl(message.text.lower())
+        wallets = directory.check_infl(message.text.lower())
         if wallets:
             response = "Yeah 🤔, I remember it now... Here are all of their 💼 wallets:\n\n"
 
+            wallets_data = await db.get_wallets_data([wallet[0] for wallet in wallets])
             for wallet in wallets:
                 wallet_address = wallet[0]
-                pnl, wr = db.get_data(wallet_address)
-
-                if pnl is not None and wr is not None:
-                    pnl_emoji = "🟢" if float(pnl.strip('%')) > 0 else "🔴"
-                    wr_emoji = "🟢" if float(wr.strip('%')) > 50 else "🔴"
+                stats = wallets_data.get(wallet_address)
 
+                if stats is not None:
                     # Формируем строку для каждого кошелька
                     response += (
-                        f"{pnl_emoji} PNL: {pnl}, {wr_emoji} WR(7d): {wr}\n"
+                        f"{format_wallet_stats(stats)}\n"
                         f"<code>{wallet_address}</code>\n\n"
                     )
                 else:
@@ -513,17 +488,16 @@ async def process_holders_end(message: Message, state: FSMContext):
         await cmd_check(message, state)
         return
 
-    token_name = db.get_token_name_by_address(token_address)
-    wallets = db.get_wallets_by_token(token_address)
+    token_name = await db.get_token_name_by_address(token_address)
+    wallets = await db.get_wallets_by_token(token_address)
 
     if re.match(SOLANA_ADDRESS_REGEX, message.text):
         if wallets:
             response = f"Here are the 🤵 influencers who own 💵 <b>{token_name}</b>:\n<code>{token_address}</code>:\n\n"
             for wallet, total_in_sol in wallets:
-                wallet_info = db.check_row(wallet)
-                if isinstance(wallet_info, dict):  # Проверяем, что вернулся словарь
-                    user = wallet_info.get('user', 'Unknown User')  # Используем безопасное извлечение
-                    link = wallet_info.get('link', '#')  # Ссылка по умолчанию
+                wallet_info = directory.check_row(wallet)
+                if wallet_info:
+                    user, link = wallet_info
                     response += f"Here 💰 <code>{wallet}</code> holds the token, which is owned by 👨 <b><a href='{link}'>{user}</a></b>, and it has tokens worth 💲 <b>{total_in_sol} SOL</b>\n\n"
                 else:
                     response += f"So {wallet}, Balance: {total_in_sol} SOL. Owner information not found.\n\n"
@@ -568,24 +542,67 @@ async def process_add_end(message: Message):
         await message.reply('См. образец!')
         return
 
-    if not db.add_row(data[0], data[1], data[2], data[3]):
+    if not await db.add_row(data[0], data[1], data[2], data[3]):
         await message.reply("Ошибка!")
         return
+    await directory.reload()
 
     await message.reply("Занесено!")
 # <<<------------------------------------------------------------------------------------------------>>>
 
 
 
+background_tasks = set()
+
+
+@dp.startup()
+async def on_startup(bot: Bot):
+    await db.connect()
+    await db.remove_expired_users()
+    await directory.load()
+    background_tasks.add(asyncio.create_task(directory.run()))
+    background_tasks.add(asyncio.create_task(users.run()))
+    background_tasks.add(asyncio.create_task(hot_tokens.run()))
+    if settings.WEBHOOK_URL:
+        await bot.set_webhook(
+            settings.WEBHOOK_URL + settings.WEBHOOK_PATH,
+            secret_token=settings.WEBHOOK_SECRET,
+            allowed_updates=dp.resolve_used_update_types()
+        )
+
+
+@dp.shutdown()
+async def on_shutdown():
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    await dex.close()
+    await db.close_all_connections()
+    await dp.storage.close()
+
+
 async def main():
-    db.remove_expired_users()
-    asyncio.create_task(background_task())
+    metrics.start_metrics_server(settings.METRICS_PORT)
+    await bot.delete_webhook()
     await dp.start_polling(bot)
 
 
+def main_webhook():
+    app = create_app(dp, bot, path=settings.WEBHOOK_PATH, secret_token=settings.WEBHOOK_SECRET)
+    web.run_app(
+        app,
+        host=settings.WEBHOOK_HOST,
+        port=settings.WEBHOOK_PORT,
+        shutdown_timeout=settings.WEBHOOK_SHUTDOWN_TIMEOUT
+    )
+
+
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
     try:
-        asyncio.run(main())
+        if settings.WEBHOOK_URL:
+            main_webhook()
+        else:
+            asyncio.run(main())
     except KeyboardInterrupt:
-        print("Exit")
\ No newline at end of file
+        print("Exit")
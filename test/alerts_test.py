@@ -0,0 +1,123 @@
+import asyncio
+import datetime
+import unittest
+
+from app.alerts import HotTokenWatcher
+
+
+class FakeListener:
+    def __init__(self, callback, on_close):
+        self.callback = callback
+        self.on_close = on_close
+        self.closed = False
+
+    def is_closed(self):
+        return self.closed
+
+    def notify(self, payload=''):
+        self.callback(payload)
+
+    def drop(self):
+        """Обрыв соединения со стороны сервера"""
+        self.closed = True
+        self.on_close()
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeDatabase:
+    """token_activity в памяти: dirty-токены отдаются changed-проходом и сбрасываются"""
+
+    def __init__(self):
+        self.hot = {}
+        self.dirty = set()
+        self.scans = []
+        self.listeners = []
+
+    async def listen(self, channel, callback, on_close=None):
+        listener = FakeListener(callback, on_close)
+        self.listeners.append(listener)
+        return listener
+
+    def rows(self, tokens):
+        return [{'token': token, 'wallet': wallet} for token in sorted(tokens) for wallet in self.hot[token]]
+
+    async def get_hot_tokens_with_wallets(self, window):
+        self.scans.append('reconcile')
+        return self.rows(self.hot)
+
+    async def get_changed_hot_tokens_with_wallets(self, window):
+        self.scans.append('changed')
+        changed, self.dirty = self.dirty & set(self.hot), set()
+        return self.rows(changed)
+
+    async def mark_tokens_dirty(self, tokens):
+        self.dirty.update(tokens)
+        return True
+
+    def buy(self, token, wallet, listener):
+        self.hot.setdefault(token, []).append(wallet)
+        self.dirty.add(token)
+        listener.notify(token)
+
+
+async def until(condition):
+    while not condition():
+        await asyncio.sleep(0)
+
+
+class HotTokenWatcherTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.db = FakeDatabase()
+        self.processed = []
+        self.failures = {}
+        self.watcher = HotTokenWatcher(self.db, self.process, window=datetime.timedelta(hours=12),
+                                       reconcile_interval=3600, poll_interval=0.05)
+        self.task = asyncio.create_task(self.watcher.run())
+        await asyncio.wait_for(until(lambda: self.db.scans), timeout=1)
+
+    async def asyncTearDown(self):
+        self.task.cancel()
+        await asyncio.gather(self.task, return_exceptions=True)
+
+    async def process(self, rows):
+        failed = []
+        for token in dict.fromkeys(row['token'] for row in rows):
+            if self.failures.get(token):
+                self.failures[token] -= 1
+                failed.append(token)
+            else:
+                self.processed.append(token)
+        return failed
+
+    async def test_notification_triggers_changed_scan(self):
+        self.assertEqual(['reconcile'], self.db.scans)
+
+        self.db.buy('TOKEN_A', 'wallet-1', self.db.listeners[0])
+        await asyncio.wait_for(until(lambda: self.processed), timeout=1)
+
+        self.assertEqual(['reconcile', 'changed'], self.db.scans)
+        self.assertEqual(['TOKEN_A'], self.processed)
+
+    async def test_failed_token_is_retried(self):
+        self.failures['TOKEN_A'] = 1
+
+        self.db.buy('TOKEN_A', 'wallet-1', self.db.listeners[0])
+        # Без новых уведомлений токен проверяется снова через poll_interval, а не через reconcile_interval
+        await asyncio.wait_for(until(lambda: self.processed), timeout=1)
+
+        self.assertEqual(['TOKEN_A'], self.processed)
+        self.assertEqual(['reconcile', 'changed', 'changed'], self.db.scans)
+
+    async def test_resubscribes_and_reconciles_after_listen_drop(self):
+        self.db.listeners[0].drop()
+        await asyncio.wait_for(until(lambda: len(self.db.listeners) == 2), timeout=1)
+        await asyncio.wait_for(until(lambda: self.db.scans.count('reconcile') == 2), timeout=1)
+
+        self.db.buy('TOKEN_B', 'wallet-2', self.db.listeners[1])
+        await asyncio.wait_for(until(lambda: 'TOKEN_B' in self.processed), timeout=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
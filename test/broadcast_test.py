@@ -0,0 +1,65 @@
+import asyncio
+import unittest
+
+from aiogram.exceptions import TelegramRetryAfter, TelegramForbiddenError
+
+from app.broadcast import Broadcaster
+
+
+class FakeBot:
+    def __init__(self, errors=None):
+        self.sent = []
+        self.errors = errors or {}
+
+    async def send_message(self, chat_id, text, **kwargs):
+        errors = self.errors.get(chat_id)
+        if errors:
+            raise errors.pop(0)
+        self.sent.append((chat_id, text))
+
+
+class BroadcasterTestCase(unittest.IsolatedAsyncioTestCase):
+    async def test_delivers_to_every_chat(self):
+        bot = FakeBot()
+        broadcaster = Broadcaster(bot, rate=1000, workers=5)
+
+        stats = await broadcaster.broadcast([(user_id, f"msg {user_id}") for user_id in range(1, 51)])
+
+        self.assertEqual(50, stats.delivered)
+        self.assertEqual(0, stats.failed)
+        self.assertEqual(50, len(bot.sent))
+
+    async def test_retry_after_is_retried_and_counted(self):
+        bot = FakeBot(errors={1: [TelegramRetryAfter(method=None, message="Flood control", retry_after=0)]})
+        broadcaster = Broadcaster(bot, rate=1000, workers=2, chat_interval=0)
+
+        stats = await broadcaster.broadcast([(1, "msg"), (2, "msg")])
+
+        self.assertEqual(2, stats.delivered)
+        self.assertEqual(1, stats.throttled)
+        self.assertIn((1, "msg"), bot.sent)
+
+    async def test_blocked_user_is_failed(self):
+        bot = FakeBot(errors={1: [TelegramForbiddenError(method=None, message="bot was blocked by the user")]})
+        broadcaster = Broadcaster(bot, rate=1000, workers=2)
+
+        stats = await broadcaster.broadcast([(1, "msg"), (2, "msg")])
+
+        self.assertEqual(1, stats.delivered)
+        self.assertEqual(1, stats.failed)
+        self.assertEqual([(2, "msg")], bot.sent)
+
+
+    async def test_idle_chats_are_forgotten(self):
+        bot = FakeBot()
+        broadcaster = Broadcaster(bot, rate=1000, workers=5, chat_interval=0.01, group_interval=0.05)
+
+        await broadcaster.broadcast([(user_id, "msg") for user_id in range(1, 11)])
+        await asyncio.sleep(0.1)
+        await broadcaster.broadcast([(100, "msg")])
+
+        self.assertEqual([100], list(broadcaster._chat_last_sent))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+import datetime
+import json
+import time
+import unittest
+
+from db.async_database import AsyncDatabase
+from support import TEST_DSN, requires_db
+
+WINDOW = datetime.timedelta(hours=12)
+
+
+class ExplainDatabase(AsyncDatabase):
+    """Вместо выполнения запросов собирает их планы. EXPLAIN без ANALYZE ничего не меняет в базе,
+    а enable_seqscan = off оставляет Seq Scan только там, где подходящего индекса нет"""
+
+    def __init__(self, dsn):
+        super().__init__(minconn=1, maxconn=2, dbname=None, user=None, password=None)
+        self.dsn = dsn
+        self.plans = []
+
+    def _connect_kwargs(self):
+        return dict(dsn=self.dsn, server_settings={'enable_seqscan': 'off'})
+
+    async def _explain(self, query, *params):
+        async with self.connection_pool.acquire() as conn:
+            plan = await conn.fetchval("EXPLAIN (FORMAT JSON) " + query, *params)
+        self.plans.append((query, json.loads(plan)[0]['Plan']))
+
+    async def execute_read_many_query(self, query, *params):
+        await self._explain(query, *params)
+        return []
+
+    async def execute_read_one_query(self, query, *params):
+        await self._explain(query, *params)
+        return None
+
+    async def execute_write_query(self, query, *params):
+        await self._explain(query, *params)
+        return True
+
+
+def full_scans(plan, partial_indexes):
+    """Таблицы, которые план читает целиком: Seq Scan или проход по всему индексу без условия
+    (у частичного индекса условие уже в его предикате)"""
+    scans = []
+    if plan['Node Type'] == 'Seq Scan':
+        scans.append(plan['Relation Name'])
+    elif 'Index Name' in plan and 'Index Cond' not in plan and plan['Index Name'] not in partial_indexes:
+        scans.append(plan['Index Name'])
+    for subplan in plan.get('Plans', []):
+        scans.extend(full_scans(subplan, partial_indexes))
+    return scans
+
+
+SEED_QUERIES = [
+    """
+    INSERT INTO sol_wallet (wallet, "user", link, wallet_type)
+    SELECT 'explain-wallet-' || i, 'explain-user-' || (i % 50), 'link', 'INFLUENCER'
+    FROM generate_series(1, 500) AS i
+    """,
+    """
+    INSERT INTO data_wallet (wallet, pnl, wr)
+    SELECT 'explain-wallet-' || i, i % 200 - 100, i % 100
+    FROM generate_series(1, 500) AS i
+    """,
+    """
+    INSERT INTO token_data (wallet, token_address, token_name, token_amount, total_in_sol)
+    SELECT 'explain-wallet-' || (i % 500 + 1), 'explain-token-' || i, 'TOKEN', 1, 1
+    FROM generate_series(1, 5000) AS i
+    """,
+    """
+    INSERT INTO infl_buys (wallet, token, amount_token, timestamp, operation_type)
+    SELECT 'explain-wallet-' || (i % 500 + 1), 'explain-token-' || (i % 1000), 1000,
+           NOW() - (i % 1440) * INTERVAL '1 minute', 'SWAP'
+    FROM generate_series(1, 20000) AS i
+    """,
+    """
+    INSERT INTO notified_tokens (token)
+    SELECT 'explain-notified-' || i
+    FROM generate_series(1, 5000) AS i
+    """,
+    """
+    INSERT INTO users (user_id, payment_status, payment_date, notify_infl, notify_smart)
+    SELECT -i, 'paid', NOW(), i % 3 = 0, i % 5 = 0
+    FROM generate_series(1, 5000) AS i
+    """,
+    "UPDATE token_activity SET dirty = token IN ('explain-token-1', 'explain-token-2') WHERE token LIKE 'explain-%'",
+    "ANALYZE",
+]
+
+CLEANUP_QUERIES = [
+    "DELETE FROM users WHERE user_id < 0",
+    "DELETE FROM notified_tokens WHERE token LIKE 'explain-%'",
+    "DELETE FROM token_activity WHERE token LIKE 'explain-%'",
+    "DELETE FROM token_buyers WHERE token LIKE 'explain-%'",
+    "DELETE FROM infl_buys WHERE wallet LIKE 'explain-%'",
+    "DELETE FROM data_wallet WHERE wallet LIKE 'explain-%'",
+    "DELETE FROM sol_wallet WHERE wallet LIKE 'explain-%'",
+]
+
+
+@requires_db
+class QueryIndexesTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.seed = await ExplainDatabase(TEST_DSN).connect()
+        async with self.seed.connection_pool.acquire() as conn:
+            for query in CLEANUP_QUERIES + SEED_QUERIES:
+                await conn.execute(query)
+            rows = await conn.fetch("SELECT indexrelid::regclass::text FROM pg_index WHERE indpred IS NOT NULL")
+        self.partial_indexes = {row[0] for row in rows}
+        self.db = await ExplainDatabase(TEST_DSN).connect()
+
+    async def asyncTearDown(self):
+        await self.db.close_all_connections()
+        async with self.seed.connection_pool.acquire() as conn:
+            for query in CLEANUP_QUERIES:
+                await conn.execute(query)
+        await self.seed.close_all_connections()
+
+    async def test_hot_path_queries_use_indexes(self):
+        wallet, token, user_id = 'explain-wallet-1', 'explain-token-1', -3
+        calls = {
+            'check_row': lambda: self.db.check_row(wallet),
+            'get_tokens_for_wallet': lambda: self.db.get_tokens_for_wallet(wallet),
+            'get_wallets_by_token': lambda: self.db.get_wallets_by_token(token),
+            'get_token_name_by_address': lambda: self.db.get_token_name_by_address(token),
+            'remove_token': lambda: self.db.remove_token(wallet, token),
+            'sync_wallet_tokens': lambda: self.db.sync_wallet_tokens(wallet, [(token, 'TOKEN', 1.0, 1.0)]),
+            'get_payment_status': lambda: self.db.get_payment_status(user_id),
+            'get_user_settings': lambda: self.db.get_user_settings(user_id),
+            'toggle_notify_infl': lambda: self.db.toggle_notify_infl(user_id),
+            'get_users_notify_flags': lambda: self.db.get_users_notify_flags(),
+            'remove_expired_users': lambda: self.db.remove_expired_users(),
+            'add_transaction': lambda: self.db.add_transaction(wallet, token, 1000, time.time(), 'SWAP'),
+            'get_wallet_cursor': lambda: self.db.get_wallet_cursor(wallet),
+            'delete_old_transaction': lambda: self.db.delete_old_transaction(WINDOW),
+            'get_tokens_with_time_for_wallet': lambda: self.db.get_tokens_with_time_for_wallet(wallet),
+            'get_unique_wallets_for_token': lambda: self.db.get_unique_wallets_for_token(token),
+            'is_token_notified': lambda: self.db.is_token_notified(token),
+            'get_changed_hot_tokens_with_wallets': lambda: self.db.get_changed_hot_tokens_with_wallets(WINDOW),
+            'add_or_update_row': lambda: self.db.add_or_update_row(wallet, '10%', '50%'),
+            'get_wallets_data': lambda: self.db.get_wallets_data([wallet, 'explain-wallet-2']),
+        }
+
+        for name, call in calls.items():
+            with self.subTest(method=name):
+                self.db.plans.clear()
+                await call()
+                self.assertTrue(self.db.plans)
+                for query, plan in self.db.plans:
+                    self.assertEqual([], full_scans(plan, self.partial_indexes), query)
+
+
+if __name__ == '__main__':
+    unittest.main()
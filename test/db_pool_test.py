@@ -0,0 +1,99 @@
+import time
+import unittest
+
+import asyncpg
+from prometheus_client import REGISTRY
+from psycopg2 import pool
+
+from support import TEST_DSN, DsnDatabase, requires_db, sync_database
+
+BACKEND_PID_QUERY = "SELECT pg_backend_pid()"
+NOOP_WRITE_QUERY = "UPDATE users SET notify_infl = notify_infl WHERE user_id = -1"
+# Запрос, который обрывает собственное соединение
+SUICIDE_WRITE_QUERY = "DO $$ BEGIN PERFORM pg_terminate_backend(pg_backend_pid()); END $$"
+
+
+@requires_db
+class AsyncPoolTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.admin = await asyncpg.connect(TEST_DSN)
+
+    async def asyncTearDown(self):
+        await self.admin.close()
+
+    async def terminate(self, pid):
+        await self.admin.execute("SELECT pg_terminate_backend($1)", pid)
+
+    async def test_idle_connection_is_checked_and_replaced(self):
+        db = await DsnDatabase(maxconn=1, healthcheck_idle=0).connect()
+        try:
+            pid = (await db.execute_read_one_query(BACKEND_PID_QUERY))[0]
+            await self.terminate(pid)
+            row = await db.execute_read_one_query(BACKEND_PID_QUERY)
+            self.assertIsNotNone(row)
+            self.assertNotEqual(pid, row[0])
+        finally:
+            await db.close_all_connections()
+
+    async def test_select_is_retried_after_connection_loss(self):
+        db = await DsnDatabase(maxconn=1, healthcheck_idle=3600).connect()
+        try:
+            pid = (await db.execute_read_one_query(BACKEND_PID_QUERY))[0]
+            await self.terminate(pid)
+            row = await db.execute_read_one_query(BACKEND_PID_QUERY)
+            self.assertIsNotNone(row)
+            self.assertNotEqual(pid, row[0])
+        finally:
+            await db.close_all_connections()
+
+    async def test_write_is_not_retried(self):
+        db = await DsnDatabase(maxconn=1, healthcheck_idle=3600).connect()
+        try:
+            broken = REGISTRY.get_sample_value('db_broken_connections_total')
+            self.assertFalse(await db.execute_write_query(SUICIDE_WRITE_QUERY))
+            # Повтор оборвал бы ещё одно соединение
+            self.assertEqual(broken + 1, REGISTRY.get_sample_value('db_broken_connections_total'))
+            self.assertTrue(await db.execute_write_query(NOOP_WRITE_QUERY))
+        finally:
+            await db.close_all_connections()
+
+    async def test_acquire_timeout(self):
+        db = await DsnDatabase(maxconn=1, acquire_timeout=0.2).connect()
+        try:
+            async with db._acquire():
+                started = time.monotonic()
+                self.assertIsNone(await db.execute_read_one_query("SELECT 1"))
+                self.assertLess(time.monotonic() - started, 2)
+        finally:
+            await db.close_all_connections()
+
+
+@requires_db
+class SyncPoolTestCase(unittest.TestCase):
+    def test_broken_connection_is_discarded(self):
+        db = sync_database(maxconn=1)
+        admin = sync_database(maxconn=1)
+        try:
+            pid = db.execute_read_one_query(BACKEND_PID_QUERY)[0]
+            admin.execute_write_query("SELECT pg_terminate_backend(%s)", (pid,))
+            self.assertIsNone(db.execute_read_one_query(BACKEND_PID_QUERY))
+            row = db.execute_read_one_query(BACKEND_PID_QUERY)
+            self.assertIsNotNone(row)
+            self.assertNotEqual(pid, row[0])
+        finally:
+            db.close_all_connections()
+            admin.close_all_connections()
+
+    def test_checkout_timeout(self):
+        db = sync_database(maxconn=1, acquire_timeout=0.2)
+        conn = db.get_connection()
+        try:
+            with self.assertRaises(pool.PoolError):
+                db.get_connection()
+        finally:
+            db.release_connection(conn)
+            db.close_all_connections()
+
+
+if __name__ == '__main__':
+    unittest.main()
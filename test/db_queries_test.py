@@ -0,0 +1,133 @@
+import datetime
+import time
+import unittest
+
+import asyncpg
+
+from support import TEST_DSN, DsnDatabase, requires_db
+
+CLEANUP_QUERIES = [
+    "DELETE FROM token_activity WHERE token LIKE 'query-%'",
+    "DELETE FROM token_buyers WHERE token LIKE 'query-%'",
+    "DELETE FROM infl_buys WHERE wallet LIKE 'query-%'",
+    "DELETE FROM token_data WHERE wallet LIKE 'query-%'",
+    "DELETE FROM data_wallet WHERE wallet LIKE 'query-%'",
+    "DELETE FROM sol_wallet WHERE wallet LIKE 'query-%'",
+]
+
+
+@requires_db
+class AsyncQueriesTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.admin = await asyncpg.connect(TEST_DSN)
+        for query in CLEANUP_QUERIES:
+            await self.admin.execute(query)
+        self.db = await DsnDatabase().connect()
+
+    async def asyncTearDown(self):
+        await self.db.close_all_connections()
+        for query in CLEANUP_QUERIES:
+            await self.admin.execute(query)
+        await self.admin.close()
+
+    async def test_sync_wallet_tokens_merges_accounts_of_one_mint(self):
+        await self.db.add_row('query-wallet-1', 'alice', 'link', 'INFLUENCER')
+        await self.db.sync_wallet_tokens('query-wallet-1', [('query-mint-old', 'OLD', 1, 1)])
+
+        # Два токен-аккаунта одного минта
+        removed = await self.db.sync_wallet_tokens('query-wallet-1', [
+            ('query-mint-1', 'ONE', 100, 0.5),
+            ('query-mint-1', 'ONE', 50, 0.25),
+            ('query-mint-2', 'TWO', 10, 1),
+        ])
+
+        self.assertEqual(['query-mint-old'], removed)
+        rows = await self.admin.fetch(
+            "SELECT token_address, token_amount, total_in_sol FROM token_data WHERE wallet = 'query-wallet-1' ORDER BY 1"
+        )
+        self.assertEqual([('query-mint-1', 150, 0.75), ('query-mint-2', 10, 1)],
+                         [(row[0], float(row[1]), float(row[2])) for row in rows])
+
+
+    async def activity(self):
+        rows = await self.admin.fetch(
+            "SELECT token, buyers, influencer_buyers, smart_buyers FROM token_activity WHERE token LIKE 'query-%' ORDER BY 1"
+        )
+        return [tuple(row) for row in rows]
+
+    async def test_token_activity_counters_and_pruning(self):
+        await self.db.add_row('query-wallet-1', 'alice', 'link', 'INFLUENCER')
+        await self.db.add_row('query-wallet-2', 'bob', 'link', 'SMART')
+        await self.db.add_row('query-wallet-3', 'carol', 'link', 'INFLUENCER')
+        now = time.time()
+        old = now - 40 * 86400
+        await self.db.add_transactions([
+            ('query-wallet-1', 'query-token-1', 1000, old, 'SWAP'),
+            ('query-wallet-2', 'query-token-1', 1000, now - 20, 'SWAP'),
+            # Повторная покупка того же кошелька не добавляет покупателя
+            ('query-wallet-2', 'query-token-1', 1000, now - 10, 'SWAP'),
+            ('query-wallet-3', 'query-token-1', 1000, now, 'SWAP'),
+            ('query-wallet-1', 'query-token-2', 1000, old, 'SWAP'),
+            # Старая и свежая покупка: покупатель остаётся в окне
+            ('query-wallet-1', 'query-token-3', 1000, old, 'SWAP'),
+            ('query-wallet-1', 'query-token-3', 1000, now, 'SWAP'),
+        ])
+        self.assertEqual([
+            ('query-token-1', 3, 2, 1),
+            ('query-token-2', 1, 1, 0),
+            ('query-token-3', 1, 1, 0),
+        ], await self.activity())
+
+        await self.db.delete_old_transaction(datetime.timedelta(days=30))
+
+        self.assertEqual([
+            ('query-token-1', 2, 1, 1),
+            ('query-token-3', 1, 1, 0),
+        ], await self.activity())
+        self.assertEqual(0, await self.admin.fetchval(
+            "SELECT count(*) FROM infl_buys WHERE wallet LIKE 'query-%' AND timestamp < NOW() - interval '30 days'"
+        ))
+        self.assertEqual(0, await self.admin.fetchval("SELECT count(*) FROM token_buyers WHERE token = 'query-token-2'"))
+
+
+    async def test_failed_token_returns_to_changed_scan(self):
+        now = time.time()
+        for number in range(3):
+            await self.db.add_row(f'query-wallet-{number}', 'alice', 'link', 'INFLUENCER')
+            await self.db.add_or_update_row(f'query-wallet-{number}', '10%', '60%')
+        await self.db.add_transactions([(f'query-wallet-{number}', 'query-token-1', 1000, now, 'SWAP') for number in range(3)])
+        window = datetime.timedelta(hours=1)
+
+        self.assertIn('query-token-1', {row['token'] for row in await self.db.get_changed_hot_tokens_with_wallets(window)})
+        self.assertNotIn('query-token-1', {row['token'] for row in await self.db.get_changed_hot_tokens_with_wallets(window)})
+
+        self.assertTrue(await self.db.mark_tokens_dirty(['query-token-1']))
+        self.assertIn('query-token-1', {row['token'] for row in await self.db.get_changed_hot_tokens_with_wallets(window)})
+
+    async def test_wallet_stats_percent_parsing_and_flags(self):
+        cases = {
+            'query-stats-1': ('10%', '60%', (10, 60, True, True)),
+            'query-stats-2': ('-5.5%', ' 50 % ', (-5.5, 50, False, False)),
+            'query-stats-3': (0, 50.5, (0, 50.5, False, True)),
+            'query-stats-4': ('', 'n/a', (None, None, None, None)),
+            'query-stats-5': ('12.5.1%', '--3', (None, None, None, None)),
+        }
+        for wallet, (pnl, wr, _) in cases.items():
+            await self.db.add_or_update_row(wallet, pnl, wr)
+
+        rows = await self.admin.fetch(
+            "SELECT wallet, pnl, wr, pnl_positive, wr_high FROM data_wallet WHERE wallet LIKE 'query-stats-%'"
+        )
+        self.assertEqual({wallet: expected for wallet, (_, _, expected) in cases.items()},
+                         {row['wallet']: (None if row['pnl'] is None else float(row['pnl']),
+                                          None if row['wr'] is None else float(row['wr']),
+                                          row['pnl_positive'], row['wr_high']) for row in rows})
+
+        # Кошельки без распознанной статистики get_data не отдаёт
+        self.assertIsNone(await self.db.get_data('query-stats-4'))
+        record = await self.db.get_data('query-stats-1')
+        self.assertEqual((True, True), (record['pnl_positive'], record['wr_high']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import asyncio
+import time
+import unittest
+
+import asyncpg
+
+from support import TEST_DSN, DsnDatabase, requires_db, sync_database
+
+CLEANUP_QUERIES = [
+    "DELETE FROM notified_tokens WHERE token LIKE 'uow-%'",
+    "DELETE FROM token_activity WHERE token LIKE 'uow-%'",
+    "DELETE FROM token_buyers WHERE token LIKE 'uow-%'",
+    "DELETE FROM infl_buys WHERE wallet LIKE 'uow-%'",
+    "DELETE FROM wallet_cursors WHERE wallet LIKE 'uow-%'",
+    "DELETE FROM data_wallet WHERE wallet LIKE 'uow-%'",
+    "DELETE FROM sol_wallet WHERE wallet LIKE 'uow-%'",
+]
+
+
+@requires_db
+class AsyncTransactionTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.admin = await asyncpg.connect(TEST_DSN)
+        for query in CLEANUP_QUERIES:
+            await self.admin.execute(query)
+        self.db = await DsnDatabase().connect()
+
+    async def asyncTearDown(self):
+        await self.db.close_all_connections()
+        for query in CLEANUP_QUERIES:
+            await self.admin.execute(query)
+        await self.admin.close()
+
+    async def test_commit(self):
+        async with self.db.transaction() as tx:
+            await tx.add_row('uow-wallet-1', 'alice', 'link', 'INFLUENCER')
+            await tx.add_or_update_row('uow-wallet-1', '10%', '50%')
+            await tx.update_wallet_cursor('uow-wallet-1', 'signature', 1)
+        self.assertTrue(await self.db.check_row('uow-wallet-1'))
+        self.assertIsNotNone(await self.db.get_data('uow-wallet-1'))
+        self.assertIsNotNone(await self.db.get_wallet_cursor('uow-wallet-1'))
+
+    async def test_error_rolls_back_everything(self):
+        with self.assertRaises(asyncpg.PostgresError):
+            async with self.db.transaction() as tx:
+                await tx.add_row('uow-wallet-1', 'alice', 'link', 'INFLUENCER')
+                await tx.add_row('uow-wallet-2', 'alice', 'link', 'NOT_A_TYPE')
+        self.assertFalse(await self.db.check_row('uow-wallet-1'))
+
+    async def test_nested_transaction_is_savepoint(self):
+        async with self.db.transaction() as tx:
+            await tx.add_row('uow-wallet-1', 'alice', 'link', 'INFLUENCER')
+            with self.assertRaises(asyncpg.PostgresError):
+                async with tx.transaction() as nested:
+                    await nested.add_row('uow-wallet-2', 'alice', 'link', 'NOT_A_TYPE')
+        self.assertTrue(await self.db.check_row('uow-wallet-1'))
+
+    async def test_add_row_is_atomic(self):
+        results = await asyncio.gather(*(self.db.add_row('uow-wallet-1', 'alice', 'link', 'INFLUENCER') for _ in range(5)))
+        self.assertEqual([True], [result for result in results if result])
+
+    async def test_claim_notified_token_once(self):
+        results = await asyncio.gather(*(self.db.claim_notified_token('uow-token-1') for _ in range(5)))
+        self.assertEqual(1, results.count(True))
+        self.assertTrue(await self.db.is_token_notified('uow-token-1'))
+
+    async def test_add_transactions(self):
+        now = time.time()
+        buys = [('uow-wallet-1', 'uow-token-1', '1000.5', now, 'SWAP'), ('uow-wallet-2', 'uow-token-1', 2000, now, 'SWAP')]
+        self.assertTrue(await self.db.add_transactions(buys))
+        self.assertTrue(await self.db.add_transactions(buys))
+        self.assertEqual(2, len(await self.db.get_unique_wallets_for_token('uow-token-1')))
+
+
+@requires_db
+class SyncTransactionTestCase(unittest.TestCase):
+    def setUp(self):
+        self.db = sync_database()
+        for query in CLEANUP_QUERIES:
+            self.db.execute_write_query(query)
+
+    def tearDown(self):
+        for query in CLEANUP_QUERIES:
+            self.db.execute_write_query(query)
+        self.db.close_all_connections()
+
+    def test_commit_and_rollback(self):
+        with self.db.transaction() as tx:
+            self.assertTrue(tx.add_row('uow-wallet-1', 'alice', 'link', 'INFLUENCER'))
+            tx.add_or_update_row('uow-wallet-1', '10%', '50%')
+        self.assertTrue(self.db.check_row('uow-wallet-1'))
+        self.assertFalse(self.db.add_row('uow-wallet-1', 'alice', 'link', 'INFLUENCER'))
+
+        with self.assertRaises(Exception):
+            with self.db.transaction() as tx:
+                tx.add_row('uow-wallet-2', 'alice', 'link', 'INFLUENCER')
+                tx.add_row('uow-wallet-3', 'alice', 'link', 'NOT_A_TYPE')
+        self.assertFalse(self.db.check_row('uow-wallet-2'))
+
+    def test_claim_and_batch(self):
+        self.assertTrue(self.db.claim_notified_token('uow-token-1'))
+        self.assertFalse(self.db.claim_notified_token('uow-token-1'))
+
+        now = time.time()
+        self.db.add_transactions([('uow-wallet-1', 'uow-token-1', 1000, now, 'SWAP'),
+                                  ('uow-wallet-2', 'uow-token-1', 2000, now, 'SWAP')])
+        self.assertEqual(2, len(self.db.get_unique_wallets_for_token('uow-token-1')))
+
+
+if __name__ == '__main__':
+    unittest.main()
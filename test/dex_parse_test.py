@@ -0,0 +1,91 @@
+import asyncio
+import unittest
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from dex_parse import DexScreenerClient, TokenInfoCache
+
+SOL = {"address": "So11111111111111111111111111111111111111112", "name": "Wrapped SOL", "symbol": "SOL"}
+TOKEN_A = {"address": "TokenA1111111111111111111111111111111111111", "name": "Token A", "symbol": "AAA"}
+TOKEN_B = {"address": "TokenB1111111111111111111111111111111111111", "name": "Token B", "symbol": "BBB"}
+TOKEN_C = {"address": "TokenC1111111111111111111111111111111111111", "name": "Token C", "symbol": "CCC"}
+
+PAIRS = [
+    {"baseToken": TOKEN_A, "quoteToken": SOL, "priceNative": "0.5", "marketCap": 1234567},
+    {"baseToken": SOL, "quoteToken": TOKEN_B, "priceNative": "4", "marketCap": 7654321},
+    # Пары без цены: нулевая пропускается, берётся следующая
+    {"baseToken": SOL, "quoteToken": TOKEN_C, "priceNative": "0", "marketCap": 0},
+    {"baseToken": TOKEN_C, "quoteToken": SOL, "priceNative": "0.0", "marketCap": 0},
+    {"baseToken": SOL, "quoteToken": TOKEN_C, "priceNative": "8", "marketCap": 100},
+]
+
+
+class DexScreenerClientTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.requests = []
+
+        async def tokens(request):
+            addresses = request.match_info['addresses'].split(',')
+            self.requests.append(addresses)
+            pairs = [pair for pair in PAIRS
+                     if pair['baseToken']['address'] in addresses or pair['quoteToken']['address'] in addresses]
+            return web.json_response({"pairs": pairs})
+
+        app = web.Application()
+        app.router.add_get('/latest/dex/tokens/{addresses}', tokens)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        self.dex = DexScreenerClient(base_url=str(self.server.make_url('/latest/dex/tokens/')))
+
+    async def asyncTearDown(self):
+        await self.dex.close()
+        await self.server.close()
+
+    async def test_batch_and_cache(self):
+        await self.dex.prefetch([TOKEN_A['address'], TOKEN_B['address']])
+        symbol, market_cap = await self.dex.fetch_token_data(TOKEN_A['address'])
+        await self.dex.get_token_info(TOKEN_B['address'])
+
+        self.assertEqual(1, len(self.requests))
+        self.assertEqual(2, len(self.requests[0]))
+        self.assertEqual(('AAA', '1234567'), (symbol, market_cap))
+
+    async def test_price_in_sol(self):
+        self.assertEqual(('Token A', 0.5), await self.dex.get_token_info(TOKEN_A['address']))
+        self.assertEqual(('Token B', 0.25), await self.dex.get_token_info(TOKEN_B['address']))
+
+    async def test_zero_price_pairs_are_skipped(self):
+        self.assertEqual(('Token C', 0.125), await self.dex.get_token_info(TOKEN_C['address']))
+
+    async def test_unknown_token(self):
+        self.assertEqual(('unknown', '0000'), await self.dex.fetch_token_data('Unknown111111111111111111111111111111111111'))
+        self.assertEqual(('Неизвестно', None), await self.dex.get_token_info('Unknown111111111111111111111111111111111111'))
+
+    async def test_expired_entries_are_evicted(self):
+        self.dex.ttl = self.dex.empty_ttl = 0.05
+        await self.dex.prefetch([TOKEN_A['address'], TOKEN_B['address']])
+        self.assertEqual(2, len(self.dex._cache))
+
+        await asyncio.sleep(0.1)
+        await self.dex.prefetch(['Unknown111111111111111111111111111111111111'])
+
+        self.assertEqual(['Unknown111111111111111111111111111111111111'], list(self.dex._cache))
+
+    async def test_cycle_cache_coalesces_concurrent_wallets(self):
+        prices = TokenInfoCache(self.dex)
+
+        await asyncio.gather(
+            prices.prefetch([TOKEN_A['address'], TOKEN_B['address']]),
+            prices.prefetch([TOKEN_B['address'], TOKEN_A['address']]),
+            prices.get_token_info(TOKEN_A['address']),
+        )
+        self.dex._cache.clear()
+        info = await prices.get_token_info(TOKEN_B['address'])
+
+        self.assertEqual(1, len(self.requests))
+        self.assertEqual(('Token B', 0.25), info)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import contextlib
+import io
+import os
+import sqlite3
+import tempfile
+import unittest
+
+import asyncpg
+
+from support import TEST_DSN, DsnDatabase, ensure_config, requires_db
+
+ensure_config(dbname=None, user=None, password=None)
+
+from db import import_stats  # noqa: E402
+
+CLEANUP_QUERY = "DELETE FROM data_wallet WHERE wallet LIKE 'import-%'"
+
+
+@requires_db
+class ImportStatsTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.admin = await asyncpg.connect(TEST_DSN)
+        await self.admin.execute(CLEANUP_QUERY)
+        await self.admin.execute("""
+            INSERT INTO data_wallet (wallet, pnl, wr) VALUES
+                ('import-same', 10, 60),
+                ('import-changed', 10, 60),
+                ('import-kept', 10, 60)
+        """)
+        self.db = await DsnDatabase().connect()
+        self.tmp = tempfile.TemporaryDirectory()
+
+    async def asyncTearDown(self):
+        self.tmp.cleanup()
+        await self.db.close_all_connections()
+        await self.admin.execute(CLEANUP_QUERY)
+        await self.admin.close()
+
+    async def stats(self):
+        rows = await self.admin.fetch("SELECT wallet, pnl, wr FROM data_wallet WHERE wallet LIKE 'import-%' ORDER BY 1")
+        return {row['wallet']: (float(row['pnl']), float(row['wr'])) for row in rows}
+
+    def path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    async def test_csv_import_counts(self):
+        with open(self.path('stats.csv'), 'w', encoding='utf-8') as f:
+            f.write("wallet,pnl,wr\n"
+                    "import-new,12.5%,55%\n"
+                    "import-same,10%,60%\n"
+                    "import-changed,1%,1%\n"
+                    # Повтор кошелька: берётся последняя строка
+                    "import-changed,-5.5%,40%\n"
+                    # Нечитаемые значения не затирают сохранённую статистику
+                    "import-kept,n/a,60%\n"
+                    "import-kept,,\n"
+                    ",1%,1%\n")
+
+        result = await self.db.import_wallets_stats(import_stats.read_csv(self.path('stats.csv')))
+
+        # загружено, добавлено, обновлено, без изменений, пропущено
+        self.assertEqual((7, 1, 1, 1, 3), result)
+        self.assertEqual({
+            'import-new': (12.5, 55),
+            'import-same': (10, 60),
+            'import-changed': (-5.5, 40),
+            'import-kept': (10, 60),
+        }, await self.stats())
+
+    async def test_sqlite_import_via_cli_helper(self):
+        connection = sqlite3.connect(self.path('stats.db'))
+        connection.execute("CREATE TABLE data_wallet (wallet TEXT, pnl TEXT, wr TEXT)")
+        connection.executemany("INSERT INTO data_wallet VALUES (?, ?, ?)", [
+            ('import-new', '3%', '70%'),
+            ('import-same', '10', '60'),
+        ])
+        connection.commit()
+        connection.close()
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.assertTrue(await import_stats.import_stats(self.db, import_stats.read_sqlite(self.path('stats.db'))))
+
+        self.assertIn("добавлено: 1, обновлено: 0, без изменений: 1, пропущено: 0", output.getvalue())
+        self.assertEqual((3, 70), (await self.stats())['import-new'])
+
+
+if __name__ == '__main__':
+    unittest.main()
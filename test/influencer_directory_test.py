@@ -0,0 +1,109 @@
+import asyncio
+import unittest
+
+from db.influencer_directory import InfluencerDirectory
+
+
+class FakeListener:
+    def __init__(self, on_close):
+        self.on_close = on_close
+        self.closed = False
+
+    def is_closed(self):
+        return self.closed
+
+    def drop(self):
+        """Обрыв соединения со стороны сервера"""
+        self.closed = True
+        self.on_close()
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeDatabase:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = 0
+        self.listeners = []
+
+    async def get_sol_wallets(self):
+        self.queries += 1
+        return list(self.rows)
+
+    async def listen(self, channel, callback, on_close=None):
+        listener = FakeListener(on_close)
+        self.listeners.append(listener)
+        return listener
+
+
+def make_row(wallet, user, link, wallet_type='INFLUENCER'):
+    return {'wallet': wallet, 'user': user, 'link': link, 'wallet_type': wallet_type}
+
+
+class InfluencerDirectoryTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.db = FakeDatabase([
+            make_row('0xWALLET_ADDRESS_0', 'alice', 'USER_LINK_0'),
+            make_row('0xWALLET_ADDRESS_1', 'alice', 'USER_LINK_0'),
+            make_row('0xWALLET_ADDRESS_2', 'smart_degen', 'USER_LINK_2', 'SMART'),
+        ])
+        self.directory = InfluencerDirectory(self.db)
+        await self.directory.load()
+
+    async def test_lookups_without_queries(self):
+        self.assertEqual(('alice', 'USER_LINK_0'), self.directory.check_row('0xWALLET_ADDRESS_1'))
+        self.assertIsNone(self.directory.check_row('0xUNKNOWN'))
+        self.assertEqual(2, self.directory.count_wallets('alice'))
+        self.assertEqual([('0xWALLET_ADDRESS_0',), ('0xWALLET_ADDRESS_1',)], self.directory.check_infl('alice'))
+        self.assertFalse(self.directory.check_infl('bob'))
+        self.assertEqual(['alice', 'smart_degen'], self.directory.get_influencers())
+        self.assertEqual(1, self.db.queries)
+
+    async def test_reload_picks_up_new_rows(self):
+        self.db.rows.append(make_row('0xWALLET_ADDRESS_3', 'bob', 'USER_LINK_3'))
+        await self.directory.reload()
+
+        self.assertEqual(('bob', 'USER_LINK_3'), self.directory.check_row('0xWALLET_ADDRESS_3'))
+
+    async def test_failed_reload_keeps_snapshot(self):
+        async def broken():
+            return None
+        self.db.get_sol_wallets = broken
+        await self.directory.reload()
+
+        self.assertEqual(2, self.directory.count_wallets('alice'))
+
+    async def test_wait_loaded_wakes_after_reload(self):
+        waiter = asyncio.create_task(self.directory.wait_loaded())
+        await asyncio.sleep(0)
+        self.assertFalse(waiter.done())
+
+        await self.directory.reload()
+        await asyncio.wait_for(waiter, timeout=1)
+
+
+    @staticmethod
+    async def until(condition):
+        while not condition():
+            await asyncio.sleep(0)
+
+    async def test_resubscribes_after_listen_connection_drop(self):
+        task = asyncio.create_task(self.directory.run())
+        try:
+            await asyncio.wait_for(self.until(lambda: self.db.listeners), timeout=1)
+
+            self.db.rows.append(make_row('0xWALLET_ADDRESS_3', 'bob', 'USER_LINK_3'))
+            self.db.listeners[0].drop()
+            await asyncio.wait_for(self.until(lambda: len(self.db.listeners) == 2), timeout=1)
+            await asyncio.wait_for(self.until(lambda: self.directory.check_row('0xWALLET_ADDRESS_3')), timeout=1)
+
+            self.assertFalse(self.db.listeners[1].is_closed())
+            self.assertEqual(('bob', 'USER_LINK_3'), self.directory.check_row('0xWALLET_ADDRESS_3'))
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
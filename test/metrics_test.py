@@ -0,0 +1,68 @@
+import unittest
+
+from prometheus_client import CollectorRegistry, Counter, Histogram
+
+from app import metrics
+
+
+def sample(registry, name, **labels):
+    return registry.get_sample_value(name, labels) or 0
+
+
+class MetricsTestCase(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.registry = CollectorRegistry()
+
+    async def test_timed_methods_label_public_coroutines(self):
+        latency = Histogram('test_method_seconds', 'test', ['method'], registry=self.registry)
+
+        @metrics.timed_methods(latency)
+        class Service:
+            async def get_data(self):
+                return 42
+
+            async def _private(self):
+                return 0
+
+        self.assertEqual(42, await Service().get_data())
+        await Service()._private()
+
+        self.assertEqual(1, sample(self.registry, 'test_method_seconds_count', method='get_data'))
+        self.assertEqual(0, sample(self.registry, 'test_method_seconds_count', method='_private'))
+
+    async def test_timed_methods_skip_excluded_helpers(self):
+        latency = Histogram('test_helper_seconds', 'test', ['method'], registry=self.registry)
+
+        @metrics.timed_methods(latency, exclude=('execute_query',))
+        class Service:
+            async def execute_query(self):
+                return 42
+
+            async def get_data(self):
+                return await self.execute_query()
+
+        self.assertEqual(42, await Service().get_data())
+
+        self.assertEqual(1, sample(self.registry, 'test_helper_seconds_count', method='get_data'))
+        self.assertEqual(0, sample(self.registry, 'test_helper_seconds_count', method='execute_query'))
+
+    def test_track_request_counts_errors(self):
+        errors = Counter('test_errors_total', 'test', ['service'], registry=self.registry)
+        latency = Histogram('test_request_seconds', 'test', ['service'], registry=self.registry)
+        saved = metrics.EXTERNAL_ERRORS, metrics.EXTERNAL_LATENCY
+        metrics.EXTERNAL_ERRORS, metrics.EXTERNAL_LATENCY = errors, latency
+        try:
+            with metrics.track_request('helius'):
+                pass
+            with self.assertRaises(ValueError):
+                with metrics.track_request('helius'):
+                    raise ValueError
+        finally:
+            metrics.EXTERNAL_ERRORS, metrics.EXTERNAL_LATENCY = saved
+
+        self.assertEqual(2, sample(self.registry, 'test_request_seconds_count', service='helius'))
+        self.assertEqual(1, sample(self.registry, 'test_errors_total', service='helius'))
+
+
+if __name__ == '__main__':
+    unittest.main()
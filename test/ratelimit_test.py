@@ -0,0 +1,37 @@
+import time
+import unittest
+
+from app.ratelimit import TokenBucket
+
+
+class TokenBucketTestCase(unittest.IsolatedAsyncioTestCase):
+    async def test_burst_up_to_capacity(self):
+        bucket = TokenBucket(rate=10, capacity=5)
+
+        start = time.monotonic()
+        for _ in range(5):
+            await bucket.acquire()
+
+        self.assertLess(time.monotonic() - start, 0.05)
+
+    async def test_waits_for_refill(self):
+        bucket = TokenBucket(rate=20, capacity=1)
+
+        start = time.monotonic()
+        for _ in range(3):
+            await bucket.acquire()
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+    async def test_penalize_pauses_refill(self):
+        bucket = TokenBucket(rate=1000, capacity=1)
+        bucket.penalize(0.1)
+
+        start = time.monotonic()
+        await bucket.acquire()
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+
+if __name__ == '__main__':
+    unittest.main()
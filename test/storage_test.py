@@ -0,0 +1,63 @@
+import unittest
+
+from aiogram.fsm.storage.base import StorageKey
+
+from app.storage import create_fsm_storage, MemorySharedState, RedisSharedState
+
+try:
+    from fakeredis.aioredis import FakeRedis
+except ImportError:
+    FakeRedis = None
+
+
+@unittest.skipIf(FakeRedis is None, "fakeredis is not installed")
+class RedisFsmStorageTestCase(unittest.IsolatedAsyncioTestCase):
+    async def test_state_shared_between_replicas_with_ttl(self):
+        redis = FakeRedis()
+        key = StorageKey(bot_id=42, chat_id=1, user_id=1)
+
+        storage = create_fsm_storage(redis, state_ttl=60, data_ttl=60)
+        await storage.set_state(key, "Form:check_sol_wallet")
+        other_replica = create_fsm_storage(redis, state_ttl=60, data_ttl=60)
+
+        self.assertEqual("Form:check_sol_wallet", await other_replica.get_state(key))
+        ttl = await redis.ttl(storage.key_builder.build(key, "state"))
+        self.assertTrue(0 < ttl <= 60)
+
+
+class SharedStateMixin:
+    def make_state(self):
+        raise NotImplementedError
+
+    async def test_claim_only_once(self):
+        replica_a, replica_b = self.make_state()
+
+        self.assertTrue(await replica_a.claim("paid_invoice:1", ttl=60))
+        self.assertFalse(await replica_b.claim("paid_invoice:1", ttl=60))
+
+    async def test_cache_and_dedup_set(self):
+        replica_a, replica_b = self.make_state()
+
+        await replica_a.set("price:TOKEN", {"price": 1.5}, ttl=60)
+        self.assertEqual({"price": 1.5}, await replica_b.get("price:TOKEN"))
+
+        self.assertEqual(2, await replica_a.add_to_set("seen", "sig1", "sig2", ttl=60))
+        self.assertEqual(1, await replica_b.add_to_set("seen", "sig2", "sig3", ttl=60))
+        self.assertTrue(await replica_b.is_member("seen", "sig1"))
+
+
+@unittest.skipIf(FakeRedis is None, "fakeredis is not installed")
+class RedisSharedStateTestCase(SharedStateMixin, unittest.IsolatedAsyncioTestCase):
+    def make_state(self):
+        redis = FakeRedis()
+        return RedisSharedState(redis), RedisSharedState(redis)
+
+
+class MemorySharedStateTestCase(SharedStateMixin, unittest.IsolatedAsyncioTestCase):
+    def make_state(self):
+        state = MemorySharedState()
+        return state, state
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import asyncio
+import contextlib
+import io
+import unittest
+
+from prometheus_client import REGISTRY
+
+from app.supervisor import supervise
+
+
+class SuperviseTestCase(unittest.IsolatedAsyncioTestCase):
+    async def run_supervised(self, name, factory, until, **kwargs):
+        task = asyncio.create_task(supervise(name, factory, **kwargs))
+        with contextlib.redirect_stdout(io.StringIO()):
+            await asyncio.wait_for(until.wait(), timeout=2)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+    async def test_restarts_after_failure(self):
+        calls = []
+        done = asyncio.Event()
+
+        async def flaky():
+            calls.append(asyncio.get_running_loop().time())
+            if len(calls) < 3:
+                raise RuntimeError('boom')
+            done.set()
+            await asyncio.Event().wait()
+
+        restarts = REGISTRY.get_sample_value('worker_task_restarts_total', {'task': 'flaky'}) or 0
+        await self.run_supervised('flaky', flaky, done, delay=0.05, max_delay=1)
+
+        self.assertEqual(3, len(calls))
+        # Пауза удваивается: 0.05, затем 0.1
+        self.assertGreaterEqual(calls[2] - calls[1], 0.09)
+        self.assertEqual(restarts + 2, REGISTRY.get_sample_value('worker_task_restarts_total', {'task': 'flaky'}))
+
+    async def test_backoff_is_capped(self):
+        calls = []
+        done = asyncio.Event()
+
+        async def failing():
+            calls.append(asyncio.get_running_loop().time())
+            if len(calls) == 5:
+                done.set()
+            raise RuntimeError('boom')
+
+        await self.run_supervised('failing', failing, done, delay=0.02, max_delay=0.04)
+
+        self.assertLess(calls[4] - calls[3], 0.2)
+
+    async def test_cancel_stops_task(self):
+        started = asyncio.Event()
+        cancelled = []
+
+        async def forever():
+            started.set()
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        await self.run_supervised('forever', forever, started)
+
+        self.assertEqual([True], cancelled)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+"""Общее для тестов.
+
+Тесты на живой базе идут против отдельной (одноразовой) базы с применёнными миграциями, например
+FABU_TEST_DSN=postgresql://postgres@localhost:5432/fabu_test; без FABU_TEST_DSN они пропускаются"""
+import os
+import sys
+import types
+import unittest
+
+from psycopg2 import extensions
+
+from db.async_database import AsyncDatabase
+from db.database import Database
+
+TEST_DSN = os.environ.get('FABU_TEST_DSN')
+
+requires_db = unittest.skipIf(TEST_DSN is None, "FABU_TEST_DSN is not set")
+
+
+def ensure_config(**values):
+    """app/config.py с ключами в репозиторий не входит: если его нет, подкладываем модуль
+    только с нужными тестам полями (остальное app/settings.py берёт по умолчанию).
+    Поля, которые просят следующие тесты, дописываются в уже подложенный модуль"""
+    try:
+        from app import config
+    except ImportError:
+        config = types.ModuleType('app.config')
+        config.test_stub = True
+        sys.modules['app.config'] = config
+    if getattr(config, 'test_stub', False):
+        for name, value in values.items():
+            config.__dict__.setdefault(name, value)
+
+
+class DsnDatabase(AsyncDatabase):
+    """AsyncDatabase, подключённая к FABU_TEST_DSN"""
+
+    def __init__(self, minconn=1, maxconn=5, **kwargs):
+        super().__init__(minconn=minconn, maxconn=maxconn, dbname=None, user=None, password=None, **kwargs)
+
+    def _connect_kwargs(self):
+        return dict(dsn=TEST_DSN)
+
+
+def sync_database(minconn=1, maxconn=2, **kwargs):
+    params = extensions.parse_dsn(TEST_DSN)
+    return Database(minconn, maxconn, dbname=params['dbname'], user=params.get('user'), password=params.get('password'),
+                    host=params.get('host'), port=params.get('port', '5432'), **kwargs)
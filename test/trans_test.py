@@ -0,0 +1,147 @@
+import asyncio
+import time
+import unittest
+from contextlib import asynccontextmanager
+
+import aiohttp
+
+from support import ensure_config
+
+ensure_config(HELIUM_API='test')
+
+from trans import HeliusPoller  # noqa: E402
+
+WALLET = 'Wa11et1111111111111111111111111111111111111'
+MINT = 'Mint111111111111111111111111111111111111111'
+
+
+def make_swap(number):
+    return {
+        'signature': f'sig-{number}',
+        'slot': number,
+        'timestamp': int(time.time()) - 100 + number,
+        'type': 'SWAP',
+        'description': f'{WALLET} swapped 1.5 SOL for 125000.55 {MINT}{number}',
+    }
+
+
+class FakeResponse:
+    def __init__(self, status, body=None):
+        self.status = status
+        self.headers = {}
+        self.body = body
+
+    async def json(self):
+        return self.body
+
+
+class FakeHelius:
+    """aiohttp-сессия с ответами Helius: транзакции от новых к старым, until/before/limit как в API"""
+
+    def __init__(self, transactions, fail_on_request=None, error=None):
+        self.transactions = transactions
+        self.fail_on_request = fail_on_request
+        self.error = error
+        self.requests = []
+
+    @asynccontextmanager
+    async def get(self, url, params):
+        self.requests.append({key: value for key, value in params.items() if key in ('until', 'before')})
+        if len(self.requests) == self.fail_on_request:
+            if self.error is not None:
+                raise self.error
+            yield FakeResponse(500)
+            return
+
+        signatures = [tx['signature'] for tx in self.transactions]
+        start, end = 0, len(self.transactions)
+        if 'until' in params:
+            end = signatures.index(params['until'])
+        if 'before' in params:
+            start = signatures.index(params['before']) + 1
+        yield FakeResponse(200, self.transactions[start:end][:params['limit']])
+
+
+class FakeDatabase:
+    def __init__(self, cursor=None):
+        self.cursor = cursor
+        self.buys = []
+
+    async def get_wallet_cursor(self, wallet):
+        return {'last_signature': self.cursor} if self.cursor else None
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield self
+
+    async def add_transactions(self, buys):
+        self.buys.extend(buys)
+        return True
+
+    async def update_wallet_cursor(self, wallet, signature, slot):
+        self.cursor = signature
+
+
+class PollWalletTestCase(unittest.IsolatedAsyncioTestCase):
+    def make_poller(self, db, session, max_pages=10):
+        return HeliusPoller(db, session, 'test', rate=1000, concurrency=1, interval=1,
+                            base_url='http://helius.test', page_limit=2, max_pages=max_pages)
+
+    @staticmethod
+    def bought(db):
+        return [buy[1][len(MINT):] for buy in db.buys]
+
+    async def test_fetches_only_transactions_after_cursor(self):
+        db = FakeDatabase(cursor='sig-3')
+        session = FakeHelius([make_swap(number) for number in range(6, 0, -1)])
+
+        await self.make_poller(db, session).poll_wallet(WALLET)
+
+        self.assertEqual([{'until': 'sig-3'}, {'until': 'sig-3', 'before': 'sig-5'}], session.requests)
+        self.assertEqual(['6', '5', '4'], self.bought(db))
+        self.assertEqual('sig-6', db.cursor)
+
+    async def test_first_poll_reads_one_page(self):
+        db = FakeDatabase()
+        session = FakeHelius([make_swap(number) for number in range(6, 0, -1)])
+
+        await self.make_poller(db, session).poll_wallet(WALLET)
+
+        self.assertEqual([{}], session.requests)
+        self.assertEqual(['6', '5'], self.bought(db))
+        self.assertEqual('sig-6', db.cursor)
+
+    async def test_failed_page_keeps_buys_and_cursor(self):
+        db = FakeDatabase(cursor='sig-1')
+        session = FakeHelius([make_swap(number) for number in range(6, 0, -1)], fail_on_request=2)
+
+        await self.make_poller(db, session).poll_wallet(WALLET)
+
+        self.assertEqual(['6', '5'], self.bought(db))
+        self.assertEqual('sig-1', db.cursor)
+
+    async def test_network_error_keeps_buys_and_cursor(self):
+        for error in (aiohttp.ClientConnectionError('connection reset'), asyncio.TimeoutError()):
+            with self.subTest(error=type(error).__name__):
+                db = FakeDatabase(cursor='sig-1')
+                session = FakeHelius([make_swap(number) for number in range(6, 0, -1)], fail_on_request=2, error=error)
+
+                await self.make_poller(db, session).poll_wallet(WALLET)
+
+                self.assertEqual(['6', '5'], self.bought(db))
+                self.assertEqual('sig-1', db.cursor)
+
+    async def test_max_pages_moves_cursor_past_the_gap(self):
+        db = FakeDatabase(cursor='sig-1')
+        session = FakeHelius([make_swap(number) for number in range(8, 0, -1)])
+
+        await self.make_poller(db, session, max_pages=2).poll_wallet(WALLET)
+
+        self.assertEqual(2, len(session.requests))
+        self.assertEqual(['8', '7', '6', '5'], self.bought(db))
+        # sig-4..sig-2 пропущены: курсор уже на самой новой транзакции
+        self.assertEqual('sig-8', db.cursor)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+
+from db.user_settings import UserSettingsCache
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.users = {}
+        self.calls = []
+
+    async def get_user_settings(self, user_id):
+        self.calls.append(('get_user_settings', user_id))
+        return self.users.get(user_id)
+
+    async def update_payment_statuses(self, statuses):
+        self.calls.append(('update_payment_statuses', len(statuses)))
+        for user_id, status, payment_date in statuses:
+            row = self.users.setdefault(user_id, {'notify_infl': True, 'notify_smart': True})
+            row.update(payment_status=status, payment_date=payment_date)
+        return True
+
+    async def toggle_notify_infl(self, user_id):
+        self.calls.append(('toggle_notify_infl', user_id))
+        row = self.users.setdefault(user_id, {'payment_status': None, 'payment_date': None,
+                                              'notify_infl': True, 'notify_smart': True})
+        row['notify_infl'] = not row['notify_infl']
+        return {'notify_infl': row['notify_infl'], 'notify_smart': row['notify_smart']}
+
+
+class UserSettingsCacheTestCase(unittest.IsolatedAsyncioTestCase):
+    async def test_payment_touches_are_coalesced(self):
+        db = FakeDatabase()
+        users = UserSettingsCache(db)
+
+        for _ in range(3):
+            users.touch_payment(1, "paid")
+        users.touch_payment(2, "paid")
+        await users.flush()
+        await users.flush()
+
+        self.assertEqual([('update_payment_statuses', 2)], db.calls)
+        self.assertEqual("paid", db.users[1]['payment_status'])
+
+    async def test_profile_is_read_once(self):
+        db = FakeDatabase()
+        db.users[1] = {'payment_status': 'paid', 'payment_date': None, 'notify_infl': True, 'notify_smart': False}
+        users = UserSettingsCache(db)
+
+        await users.get(1)
+        profile = await users.get(1)
+
+        self.assertFalse(profile['notify_smart'])
+        self.assertEqual([('get_user_settings', 1)], db.calls)
+
+    async def test_toggle_is_one_query_and_updates_profile(self):
+        db = FakeDatabase()
+        db.users[1] = {'payment_status': 'paid', 'payment_date': None, 'notify_infl': True, 'notify_smart': True}
+        users = UserSettingsCache(db)
+        await users.get(1)
+
+        profile = await users.toggle_notify(1, 'notify_infl')
+
+        self.assertFalse(profile['notify_infl'])
+        self.assertFalse((await users.get(1))['notify_infl'])
+        self.assertEqual([('get_user_settings', 1), ('toggle_notify_infl', 1)], db.calls)
+
+    async def test_toggle_of_unflushed_user_is_not_lost(self):
+        db = FakeDatabase()
+        users = UserSettingsCache(db)
+
+        users.touch_payment(1, "paid")
+        profile = await users.toggle_notify(1, 'notify_infl')
+        await users.flush()
+
+        self.assertFalse(profile['notify_infl'])
+        self.assertEqual("paid", profile['payment_status'])
+        self.assertFalse(db.users[1]['notify_infl'])
+
+
+if __name__ == '__main__':
+    unittest.main()
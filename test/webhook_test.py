@@ -0,0 +1,114 @@
+import asyncio
+import unittest
+
+from aiogram import Bot, Dispatcher
+from aiogram.filters import Command
+from aiogram.types import Message
+from aiohttp.test_utils import TestClient, TestServer
+
+from app.webhook import create_app
+
+SECRET = "test-secret"
+
+
+def make_update(update_id, text):
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 1700000000,
+            "chat": {"id": 1000 + update_id, "type": "private"},
+            "from": {"id": 1000 + update_id, "is_bot": False, "first_name": "Test"},
+            "text": text,
+            "entities": [{"type": "bot_command", "offset": 0, "length": len(text)}],
+        },
+    }
+
+
+class WebhookShutdownTestCase(unittest.IsolatedAsyncioTestCase):
+    async def test_shutdown_waits_for_inflight_update(self):
+        events = []
+        started = asyncio.Event()
+        dp = Dispatcher()
+
+        @dp.message(Command("start"))
+        async def slow_start(message: Message):
+            events.append('handler start')
+            started.set()
+            await asyncio.sleep(0.5)
+            events.append('handler end')
+
+        @dp.shutdown()
+        async def on_shutdown():
+            events.append('dispatcher shutdown')
+
+        bot = Bot(token="42:TEST")
+        client = TestClient(TestServer(create_app(dp, bot, path="/webhook", secret_token=SECRET)))
+        await client.start_server()
+        try:
+            request = asyncio.create_task(client.post(
+                "/webhook",
+                json=make_update(3, "/start"),
+                headers={"X-Telegram-Bot-Api-Secret-Token": SECRET}
+            ))
+            await asyncio.wait_for(started.wait(), timeout=2)
+            await client.server.runner.cleanup()
+
+            self.assertEqual(['handler start', 'handler end', 'dispatcher shutdown'], events)
+            self.assertTrue(bot.session._session is None or bot.session._session.closed)
+            self.assertEqual(200, (await request).status)
+        finally:
+            await client.close()
+
+
+class WebhookTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.handled = []
+        dp = Dispatcher()
+
+        @dp.message(Command("start"))
+        async def cmd_start(message: Message):
+            self.handled.append(message.from_user.id)
+
+        bot = Bot(token="42:TEST")
+        self.client = TestClient(TestServer(create_app(dp, bot, path="/webhook", secret_token=SECRET)))
+        await self.client.start_server()
+
+    async def asyncTearDown(self):
+        await self.client.close()
+
+    async def test_update_is_handled_before_response(self):
+        response = await self.client.post(
+            "/webhook",
+            json=make_update(1, "/start"),
+            headers={"X-Telegram-Bot-Api-Secret-Token": SECRET}
+        )
+
+        self.assertEqual(200, response.status)
+        self.assertEqual([1001], self.handled)
+
+    async def test_wrong_secret_is_rejected(self):
+        response = await self.client.post(
+            "/webhook",
+            json=make_update(2, "/start"),
+            headers={"X-Telegram-Bot-Api-Secret-Token": "wrong"}
+        )
+
+        self.assertEqual(401, response.status)
+        self.assertEqual([], self.handled)
+
+    async def test_health(self):
+        response = await self.client.get("/healthz")
+
+        self.assertEqual(200, response.status)
+        self.assertEqual({"status": "ok"}, await response.json())
+
+    async def test_metrics(self):
+        response = await self.client.get("/metrics")
+
+        self.assertEqual(200, response.status)
+        self.assertIn("db_pool_wait_seconds", await response.text())
+
+
+if __name__ == '__main__':
+    unittest.main()
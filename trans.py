@@ -2,20 +2,15 @@ import aiohttp
 import asyncio
 import re
 from app import config as cfg
-from datetime import datetime, timezone
-from db.database import Database
+from app import metrics
+from app import settings
+from app.ratelimit import TokenBucket
+from db.async_database import AsyncDatabase
 import time
 
 
-db = Database(minconn=1, maxconn=25, dbname=cfg.dbname, user=cfg.user, password=cfg.password)
 api_key = cfg.HELIUM_API
-current_timestamp = datetime.now(timezone.utc).timestamp()
-day_timestamp = 86400
 SOLANA_ADDRESS_REGEX = r'^[1-9A-HJ-NP-Za-km-z]{32,44}$'
-sleep_interval = 60
-
-wallets = db.get_wallets()
-print(wallets)
 
 # Список кошельков
 # wallets = ["AZzEApuBNjzewryE6gU4F76nLwWANpnCZ2DXShsdmbpF", "3kebnKw7cPdSkLRfiMEALyZJGZ4wdiSRvmoN4rD1yPzV"]
@@ -27,73 +22,217 @@ def has_one_decimal_place(number_str):
         return len(fractional_part) > 1
     return False
 
-async def fetch_wallet_transactions(wallet):
-    base_url = f"https://api.helius.xyz/v0/addresses/{wallet}/transactions"
-    url = f"{base_url}?api-key={api_key}"
-
-    while True:
-        start_time = time.time()
-        # Выполнение асинхронного запроса
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                # Проверка статуса ответа
-                if response.status == 200:
-                    transactions = await response.json()
-
-                    if transactions:
-                        for tx in transactions:
-                            # Получаем описание токена, если доступно
-                            description = tx.get("description", "No description").split(" ")
-                            operation_type = tx.get("type", "Unknown")
-                            timestamp = tx.get("timestamp")
-
-                            # Проверка корректности описания
-                            if not re.match(SOLANA_ADDRESS_REGEX, description[-1][:-1]):
-                                continue
-
-                            if timestamp + day_timestamp > current_timestamp:
-                                if operation_type == 'SWAP':
-                                    existing_tokens = db.get_tokens_for_wallet(description[0])
-                                    if (description[-1], timestamp) in existing_tokens or not has_one_decimal_place(description[-2]) or float(description[-2]) < 1000:
-                                        continue
-                                    print(f"Description: {description}")
-                                    print(f"Wallet: {description[0]}")
-                                    print(f"Token: {description[-1]}")
-                                    print(f"Token_am: {description[-2]}")
-                                    print(f"Time: {timestamp}")
-                                    print(f"Type: {operation_type}\n")
-                                    db.add_transaction(description[0], description[-1], description[-2], timestamp, 'SWAP')
-
-
-                                # elif operation_type == "TRANSFER" and wallet == description[-1][:-1] and description[-3] != "SOL":
-                                #     existing_tokens = db.get_tokens_for_wallet(description[-1])
-                                #     if (description[-3], timestamp) in existing_tokens or not has_one_decimal_place(description[2]) or float(description[2]) < 1000:
-                                #         continue
-                                #     print(f"Description: {description}")
-                                #     print(f"Wallet: {description[-1][:-1]}")
-                                #     print(f"Token: {description[-3]}")
-                                #     print(f"Token_am: {description[2]}")
-                                #     print(f"Time: {timestamp}")
-                                #     print(f"Type: {operation_type}\n")
-                                #     db.add_transaction(description[-1][:-1], description[-3], description[2], timestamp, 'TRANSFER')
-                    db.delete_old_transaction()
-                    print('удаляем старые токены')
-
-                    # Ожидаем 1 минуту перед следующим запросом
-                    end_time = time.time()
-                    print(f'Времени заняло: {end_time - start_time}')
-                    print(f"\nSleeping for {sleep_interval // 60} minutes...")
-                    await asyncio.sleep(sleep_interval)
 
+class HeliusPoller:
+    """Опрос транзакций кошельков через Helius.
+
+    Одна aiohttp-сессия на все кошельки, не больше concurrency запросов одновременно,
+    общий token bucket под лимит тарифа и старты кошельков, равномерно разнесённые по interval"""
+
+    def __init__(self, db, session, api_key, rate, concurrency, interval, window=settings.BUYS_WINDOW,
+                 base_url=settings.HELIUS_API_URL, page_limit=settings.HELIUS_PAGE_LIMIT, max_pages=settings.HELIUS_MAX_PAGES):
+        self.db = db
+        self.session = session
+        self.api_key = api_key
+        self.interval = interval
+        self.window = window
+        self.base_url = base_url
+        self.page_limit = page_limit
+        self.max_pages = max_pages
+        self.limiter = TokenBucket(rate)
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self._wallet_tasks = {}
+
+    async def fetch_transactions(self, wallet, **params):
+        url = f"{self.base_url}/addresses/{wallet}/transactions"
+        async with self.semaphore:
+            await self.limiter.acquire()
+            params = {"api-key": self.api_key, "limit": self.page_limit, **params}
+            try:
+                with metrics.track_request('helius'):
+                    async with self.session.get(url, params=params) as response:
+                        if response.status == 429:
+                            retry_after = float(response.headers.get("Retry-After", 1))
+                            self.limiter.penalize(retry_after)
+                            metrics.EXTERNAL_ERRORS.labels('helius').inc()
+                            print(f"Helius 429 для кошелька {wallet}, пауза {retry_after} сек")
+                            return None
+                        if response.status != 200:
+                            metrics.EXTERNAL_ERRORS.labels('helius').inc()
+                            print(f"Helius вернул {response.status} для кошелька {wallet}")
+                            return None
+                        return await response.json()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                # Сетевая ошибка - как ответ не 200: страницы нет, курсор не двигаем (ошибку уже посчитал track_request)
+                print(f"Ошибка запроса к Helius для кошелька {wallet}: {e!r}")
+                return None
+
+    def window_start(self):
+        """Начало скользящего окна (unix time): всё, что старше, не загружаем и удаляем"""
+        return time.time() - self.window.total_seconds()
+
+    def parse_transactions(self, transactions):
+        """Покупки из страницы транзакций Helius: список (wallet, token, amount_token, timestamp, operation_type)"""
+        window_start = self.window_start()
+        buys = []
+        for tx in transactions:
+            # Получаем описание токена, если доступно
+            description = tx.get("description", "No description").split(" ")
+            operation_type = tx.get("type", "Unknown")
+            timestamp = tx.get("timestamp")
+
+            # Проверка корректности описания
+            if not re.match(SOLANA_ADDRESS_REGEX, description[-1][:-1]):
+                continue
+
+            if timestamp > window_start:
+                if operation_type == 'SWAP':
+                    if not has_one_decimal_place(description[-2]) or float(description[-2]) < 1000:
+                        continue
+                    print(f"Description: {description}")
+                    print(f"Wallet: {description[0]}")
+                    print(f"Token: {description[-1]}")
+                    print(f"Token_am: {description[-2]}")
+                    print(f"Time: {timestamp}")
+                    print(f"Type: {operation_type}\n")
+                    buys.append((description[0], description[-1], description[-2], timestamp, 'SWAP'))
+
+                # elif operation_type == "TRANSFER" and wallet == description[-1][:-1] and description[-3] != "SOL":
+                #     existing_tokens = db.get_tokens_for_wallet(description[-1])
+                #     if (description[-3], timestamp) in existing_tokens or not has_one_decimal_place(description[2]) or float(description[2]) < 1000:
+                #         continue
+                #     print(f"Description: {description}")
+                #     print(f"Wallet: {description[-1][:-1]}")
+                #     print(f"Token: {description[-3]}")
+                #     print(f"Token_am: {description[2]}")
+                #     print(f"Time: {timestamp}")
+                #     print(f"Type: {operation_type}\n")
+                #     db.add_transaction(description[-1][:-1], description[-3], description[2], timestamp, 'TRANSFER')
+        return buys
+
+    async def poll_wallet(self, wallet):
+        """Забираем только транзакции новее курсора кошелька, листая страницы назад через before.
+        Покупки со всех полученных страниц и новый курсор записываются одной транзакцией.
+
+        Если страница не получена (сетевая ошибка, таймаут, ответ не 200), покупки с уже полученных страниц сохраняются,
+        а курсор не двигается - недостающее заберём в следующий раз. Если новых транзакций больше
+        max_pages страниц, курсор всё равно сдвигается на самую новую: транзакции между последней
+        полученной страницей и старым курсором пропускаются насовсем, зато кошелёк с большим хвостом
+        не застревает, перечитывая одни и те же страницы"""
+        cursor = await self.db.get_wallet_cursor(wallet)
+        until = cursor['last_signature'] if cursor else None
+        newest = None
+        before = None
+        buys = []
+
+        for page in range(self.max_pages):
+            params = {}
+            if until:
+                params['until'] = until
+            if before:
+                params['before'] = before
+
+            transactions = await self.fetch_transactions(wallet, **params)
+            if transactions is None:
+                # Уже полученные покупки сохраняем, курсор не трогаем - остальное заберём в следующий раз
+                newest = None
+                break
+            if not transactions:
+                break
+
+            newest = newest or transactions[0]
+            buys.extend(self.parse_transactions(transactions))
+
+            # Без курсора (первый запуск) хватает последней страницы, и дальше окна листать незачем
+            if until is None or len(transactions) < self.page_limit or transactions[-1]['timestamp'] <= self.window_start():
+                break
+            before = transactions[-1]['signature']
+        else:
+            print(f"Кошелёк {wallet}: больше {self.max_pages} страниц новых транзакций, часть пропущена")
+
+        if not buys and not newest:
+            return
+        async with self.db.transaction() as tx:
+            await tx.add_transactions(buys)
+            if newest:
+                await tx.update_wallet_cursor(wallet, newest['signature'], newest.get('slot'))
+
+    async def _wallet_loop(self, wallet, delay):
+        await asyncio.sleep(delay)
+        while True:
+            start_time = time.monotonic()
+            try:
+                await self.poll_wallet(wallet)
+            except Exception as e:
+                print(f"Ошибка при опросе кошелька {wallet}: {e}")
+            await asyncio.sleep(max(0.0, self.interval - (time.monotonic() - start_time)))
+
+    async def _cleanup_loop(self):
+        while True:
+            await self.db.delete_old_transaction(self.window)
+            print('удаляем старые токены')
+            await asyncio.sleep(self.interval)
+
+    def sync_wallets(self, wallets):
+        """Запускаем циклы опроса новых кошельков и останавливаем циклы кошельков, которых больше нет.
+        Старты новых кошельков разносятся по interval, уже работающие циклы не трогаем"""
+        wallets = list(dict.fromkeys(wallets))
+        for wallet in set(self._wallet_tasks) - set(wallets):
+            self._wallet_tasks.pop(wallet).cancel()
+            print(f"Кошелёк {wallet} удалён, опрос остановлен")
+
+        new_wallets = [wallet for wallet in wallets if wallet not in self._wallet_tasks]
+        step = self.interval / len(new_wallets) if new_wallets else 0
+        for i, wallet in enumerate(new_wallets):
+            self._wallet_tasks[wallet] = asyncio.create_task(self._wallet_loop(wallet, i * step))
+
+    async def stop(self):
+        tasks = list(self._wallet_tasks.values())
+        self._wallet_tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def run(self, wallets=None, directory=None):
+        """Опрос кошельков и чистка старых транзакций до отмены.
+        Со справочником (InfluencerDirectory) список кошельков берётся из него заново после каждой перезагрузки,
+        иначе опрашивается статический список wallets"""
+        cleanup = asyncio.create_task(self._cleanup_loop())
+        try:
+            if directory is None:
+                self.sync_wallets(wallets)
+                await cleanup
+            else:
+                while True:
+                    self.sync_wallets(directory.get_wallets())
+                    await directory.wait_loaded()
+        finally:
+            cleanup.cancel()
+            await asyncio.gather(cleanup, return_exceptions=True)
+            await self.stop()
 
-async def fetch_and_parse_transactions():
-    # Создаем задачи для всех кошельков
-    tasks = [fetch_wallet_transactions(wallet) for wallet in wallets]
 
-    # Запускаем все задачи одновременно
-    await asyncio.gather(*tasks)
+async def fetch_and_parse_transactions():
+    db = AsyncDatabase(minconn=settings.DB_MINCONN, maxconn=settings.TRANS_DB_MAXCONN,
+                       dbname=cfg.dbname, user=cfg.user, password=cfg.password,
+                       host=settings.DB_HOST, port=settings.DB_PORT, **settings.DB_POOL_OPTIONS)
+    await db.connect()
+    metrics.start_metrics_server(settings.TRANS_METRICS_PORT)
+    wallets = await db.get_wallets()
+    print(wallets)
+
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30)) as session:
+        poller = HeliusPoller(
+            db,
+            session,
+            api_key,
+            rate=settings.HELIUS_RPS,
+            concurrency=settings.HELIUS_CONCURRENCY,
+            interval=settings.HELIUS_POLL_INTERVAL
+        )
+        await poller.run(wallets)
 
 
 # Запуск асинхронной функции
 if __name__ == "__main__":
-    asyncio.run(fetch_and_parse_transactions())
\ No newline at end of file
+    asyncio.run(fetch_and_parse_transactions())
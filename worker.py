@@ -0,0 +1,80 @@
+"""Процесс воркеров: загрузка свапов из Helius (trans.py) и холдинги кошельков (holders_1.py)
+как задачи одного asyncio-цикла с общим пулом базы и общей aiohttp-сессией.
+
+    python worker.py
+
+Каждая задача работает под supervise: после падения она перезапускается с растущей паузой.
+Список опрашиваемых кошельков берётся из InfluencerDirectory и обновляется по NOTIFY sol_wallet_changed.
+По SIGINT/SIGTERM задачи отменяются, после чего закрываются сессия и пул."""
+import asyncio
+import signal
+
+import aiohttp
+
+import holders_1
+from app import config as cfg
+from app import metrics
+from app import settings
+from app.supervisor import supervise
+from db.async_database import AsyncDatabase
+from db.influencer_directory import InfluencerDirectory
+from dex_parse import DexScreenerClient
+from trans import HeliusPoller
+
+
+def create_database():
+    return AsyncDatabase(minconn=settings.DB_MINCONN, maxconn=settings.WORKER_DB_MAXCONN,
+                         dbname=cfg.dbname, user=cfg.user, password=cfg.password,
+                         host=settings.DB_HOST, port=settings.DB_PORT, **settings.DB_POOL_OPTIONS)
+
+
+def supervised(name, factory):
+    return asyncio.create_task(supervise(
+        name, factory,
+        delay=settings.WORKER_RESTART_DELAY,
+        max_delay=settings.WORKER_RESTART_MAX_DELAY,
+        stable_run=settings.WORKER_STABLE_RUN,
+    ), name=name)
+
+
+async def main():
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    db = await create_database().connect()
+    metrics.start_metrics_server(settings.WORKER_METRICS_PORT)
+    directory = InfluencerDirectory(db, refresh_interval=settings.DIRECTORY_REFRESH_INTERVAL)
+    await directory.load()
+
+    try:
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30)) as session:
+            dex = DexScreenerClient(session=session, base_url=settings.DEXSCREENER_API_URL)
+            poller = HeliusPoller(
+                db,
+                session,
+                cfg.HELIUM_API,
+                rate=settings.HELIUS_RPS,
+                concurrency=settings.HELIUS_CONCURRENCY,
+                interval=settings.HELIUS_POLL_INTERVAL
+            )
+            tasks = [
+                supervised('directory', directory.run),
+                supervised('helius', lambda: poller.run(directory=directory)),
+                supervised('holders', lambda: holders_1.run(db, session, dex)),
+            ]
+            try:
+                await stop.wait()
+                print("Останавливаю воркер...")
+            finally:
+                # Задачи останавливаем до закрытия сессии и пула, которыми они пользуются
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        await db.close_all_connections()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())